@@ -0,0 +1,60 @@
+"""
+Add category_norm column to employees table
+
+This is a generated column holding the upper-cased category with 'UNBILLED'
+folded into 'UN-BILLED', plus a partial (team, category_norm) index on active
+employees, so the calendar views filter by category with an index lookup
+instead of upper-casing every row at query time.
+"""
+
+import sys
+
+# Fix Unicode output on Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from sqlalchemy import text
+from database import engine
+
+
+def add_employee_category_norm():
+    """Add generated category_norm column and team/category index to employees table"""
+    try:
+        with engine.connect() as conn:
+            check_query = text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'employees' 
+                AND column_name = 'category_norm'
+            """)
+            result = conn.execute(check_query)
+            if result.fetchone():
+                print("[OK] Column 'category_norm' already exists")
+            else:
+                # Existing rows are backfilled automatically by the generated column
+                conn.execute(text("""
+                    ALTER TABLE employees 
+                    ADD COLUMN category_norm VARCHAR(50)
+                    GENERATED ALWAYS AS (
+                        CASE WHEN upper(trim(category)) = 'UNBILLED' THEN 'UN-BILLED'
+                             ELSE upper(trim(category)) END
+                    ) STORED
+                """))
+                print("[OK] Added 'category_norm' column")
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_employees_team_category_active
+                ON employees (team, category_norm) WHERE is_active
+            """))
+            print("[OK] Index 'ix_employees_team_category_active' ready")
+            
+            conn.commit()
+            
+    except Exception as e:
+        print(f"[ERROR] Error adding column: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    print("Adding normalized category column to employees table...")
+    add_employee_category_norm()
+    print("Done!")
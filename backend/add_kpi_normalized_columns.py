@@ -0,0 +1,63 @@
+"""
+Add role_norm and team_norm columns to kpis table
+
+These are generated columns holding upper(trim(role)) and upper(trim(team)),
+indexed so the employee KPI endpoints can match roles/teams with an index
+lookup instead of normalizing every row at query time.
+"""
+
+import sys
+
+# Fix Unicode output on Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from sqlalchemy import text
+from database import engine
+
+NORMALIZED_COLUMNS = [
+    # (column name, source column, type)
+    ('role_norm', 'role', 'VARCHAR(100)'),
+    ('team_norm', 'team', 'VARCHAR(50)'),
+]
+
+
+def add_kpi_normalized_columns():
+    """Add generated role_norm/team_norm columns and indexes to kpis table"""
+    try:
+        with engine.connect() as conn:
+            for column_name, source_column, column_type in NORMALIZED_COLUMNS:
+                check_query = text("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'kpis' 
+                    AND column_name = :column_name
+                """)
+                result = conn.execute(check_query, {"column_name": column_name})
+                if result.fetchone():
+                    print(f"[OK] Column '{column_name}' already exists")
+                else:
+                    # Existing rows are backfilled automatically by the generated column
+                    alter_query = text(f"""
+                        ALTER TABLE kpis 
+                        ADD COLUMN {column_name} {column_type}
+                        GENERATED ALWAYS AS (upper(trim({source_column}))) STORED
+                    """)
+                    conn.execute(alter_query)
+                    print(f"[OK] Added '{column_name}' column")
+                
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_kpis_{column_name} ON kpis ({column_name})"
+                ))
+                print(f"[OK] Index 'ix_kpis_{column_name}' ready")
+            
+            conn.commit()
+            
+    except Exception as e:
+        print(f"[ERROR] Error adding columns: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    print("Adding normalized role/team columns to kpis table...")
+    add_kpi_normalized_columns()
+    print("Done!")
@@ -0,0 +1,101 @@
+"""
+Add composite indexes matching the hot query predicates
+
+Creates any indexes declared in models.py that are missing from an existing
+database (create_tables.py only creates them for new tables).
+"""
+
+import sys
+
+# Fix Unicode output on Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from sqlalchemy import text
+from database import engine
+
+# (index name, table, columns)
+QUERY_INDEXES = [
+    ('ix_rating_emp_quarter', 'kpi_ratings', 'employee_id, quarter'),
+    ('ix_tshist_status_changed', 'ticket_status_history', 'new_status, changed_on'),
+    ('ix_tshist_ticket_changed', 'ticket_status_history', 'ticket_id, changed_on'),
+    ('ix_bshist_status_changed', 'bug_status_history', 'new_status, changed_on'),
+    ('ix_test_results_run_status', 'test_results', 'run_id, status_name'),
+    ('ix_ets_emp_date', 'enhanced_timesheets', 'employee_name, date'),
+    ('ix_ets_ticket_date', 'enhanced_timesheets', 'ticket_id, date'),
+    ('ix_planned_date_emp', 'planned_tasks', 'planned_date, employee_name'),
+]
+
+# (index name, table, key columns, INCLUDE columns) - covering indexes that let the
+# grouped aggregates run as index-only scans (Postgres 11+)
+COVERING_INDEXES = [
+    ('ix_ets_name_cover', 'enhanced_timesheets', 'employee_name', 'date, team'),
+    ('ix_ets_date_cover', 'enhanced_timesheets', 'date', 'team, hours_logged'),
+    ('ix_planned_date_cover', 'planned_tasks', 'planned_date', 'team, planned_hours'),
+]
+
+# (index name, table, columns, WHERE predicate) - partial indexes covering only the rows hot queries select
+PARTIAL_INDEXES = [
+    ('ix_kpi_role_active', 'kpis', 'role_norm', 'is_active'),
+    ('ix_bugs_open_ticket', 'bugs', 'ticket_id', "status IN ('New', 'Reopened', 'Fixed', 'Assigned to Dev')"),
+]
+
+# (index name, table, column) - BRIN indexes for created_on range filters on append-mostly tables
+BRIN_INDEXES = [
+    ('ix_bugs_created_brin', 'bugs', 'created_on'),
+    ('ix_test_results_created_brin', 'test_results', 'created_on'),
+]
+
+
+# Single-column indexes superseded by a composite above
+DROPPED_INDEXES = [
+    'ix_test_results_status_name',
+    'ix_kpi_active_role',
+]
+
+
+def add_query_indexes():
+    """Create the composite query indexes if they don't exist"""
+    try:
+        with engine.connect() as conn:
+            for index_name, table_name, columns in QUERY_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"
+                ))
+                print(f"[OK] Index '{index_name}' on {table_name} ({columns}) ready")
+            for index_name, table_name, columns, include in COVERING_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns}) INCLUDE ({include})"
+                ))
+                print(f"[OK] Index '{index_name}' on {table_name} ({columns}) INCLUDE ({include}) ready")
+            for index_name, table_name, columns, where in PARTIAL_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns}) WHERE {where}"
+                ))
+                print(f"[OK] Partial index '{index_name}' on {table_name} ({columns}) WHERE {where} ready")
+            for index_name, table_name, column in BRIN_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} "
+                    f"USING brin ({column}) WITH (pages_per_range = 32)"
+                ))
+                print(f"[OK] BRIN index '{index_name}' on {table_name} ({column}) ready")
+            for index_name in DROPPED_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                print(f"[OK] Index '{index_name}' dropped")
+            conn.commit()
+            
+            # VACUUM refreshes the visibility map so the covering indexes are used for index-only scans;
+            # it cannot run inside a transaction
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            for table_name in sorted({table for _, table, _, _ in COVERING_INDEXES}):
+                conn.execute(text(f"VACUUM ANALYZE {table_name}"))
+                print(f"[OK] Vacuumed {table_name}")
+            
+    except Exception as e:
+        print(f"[ERROR] Error creating indexes: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    print("Adding composite query indexes...")
+    add_query_indexes()
+    print("Done!")
@@ -118,7 +118,6 @@ def add_sample_data():
             if entry_date.weekday() < 5:  # Only weekdays
                 hours = random.uniform(6, 9)
                 minutes = int(hours * 60)
-                time_str = f"{int(hours)}:{int((hours % 1) * 60):02d}:00"
                 
                 existing = db.query(Timesheet).filter(
                     Timesheet.employee_name == employee.name,
@@ -130,7 +129,6 @@ def add_sample_data():
                         employee_name=employee.name,
                         ticket_id=random.choice([12345, 12346, 12347]),
                         date=entry_date,
-                        time_logged=time_str,
                         time_logged_minutes=minutes,
                         team=employee.team
                     )
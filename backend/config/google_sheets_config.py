@@ -42,6 +42,12 @@ GOOGLE_SHEETS_CONFIG = {
     "sync_interval_minutes": int(os.getenv("SHEETS_SYNC_INTERVAL", "5")),  # Default 5 minutes
     "auto_sync_enabled": os.getenv("SHEETS_AUTO_SYNC", "true").lower() == "true",  # Enabled by default
     "realtime_sync": os.getenv("SHEETS_REALTIME_SYNC", "true").lower() == "true",  # Real-time mode (2-min intervals)
+    
+    # Push notifications: public HTTPS URL of the /sync/google-sheets/webhook endpoint.
+    # When set, real-time mode registers Drive watch channels on the sheets and syncs a team only
+    # when its sheet changes, polling at the fallback interval as a safety net.
+    "webhook_url": os.getenv("SHEETS_WEBHOOK_URL", ""),
+    "fallback_sync_interval_minutes": int(os.getenv("SHEETS_FALLBACK_SYNC_INTERVAL", "60")),
 }
 
 # Scopes required for Google Sheets API
@@ -49,6 +55,10 @@ GOOGLE_SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets.readonly'
 ]
 
+# Drive metadata access is needed to register push-notification channels on the sheets
+if GOOGLE_SHEETS_CONFIG["webhook_url"]:
+    GOOGLE_SCOPES.append('https://www.googleapis.com/auth/drive.metadata.readonly')
+
 # Authentication method: 'service_account' or 'oauth2'
 # Use 'service_account' if you have a service account JSON
 # Use 'oauth2' if sheets are shared with your personal Google account
@@ -0,0 +1,52 @@
+"""
+Migration script to drop the time_logged string column from the timesheets table.
+time_logged_minutes holds the same value and is what every aggregation sums.
+Run this once to update the database schema.
+"""
+from database import engine
+from sqlalchemy import text
+
+def drop_timesheet_time_logged():
+    """Drop time_logged column from timesheets table if it exists."""
+    with engine.connect() as conn:
+        try:
+            # Check if column exists
+            check_query = text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name='timesheets' AND column_name='time_logged'
+            """)
+            result = conn.execute(check_query)
+            if not result.fetchone():
+                print("Column 'time_logged' already dropped. Skipping migration.")
+                return
+
+            # Backfill minutes for any rows that only have the string form
+            backfill_query = text("""
+                UPDATE timesheets
+                SET time_logged_minutes = (
+                    split_part(time_logged, ':', 1)::int * 60
+                    + split_part(time_logged, ':', 2)::int
+                    + CASE WHEN coalesce(nullif(split_part(time_logged, ':', 3), ''), '0')::int >= 30 THEN 1 ELSE 0 END
+                )
+                WHERE time_logged_minutes IS NULL
+                  AND time_logged ~ '^\\d+:\\d{1,2}(:\\d{1,2})?$'
+            """)
+            backfilled = conn.execute(backfill_query).rowcount
+
+            # Drop the column
+            drop_query = text("""
+                ALTER TABLE timesheets
+                DROP COLUMN time_logged
+            """)
+            conn.execute(drop_query)
+            conn.commit()
+            print(f"Backfilled time_logged_minutes on {backfilled} rows.")
+            print("Successfully dropped 'time_logged' column from timesheets table.")
+        except Exception as e:
+            print(f"Error dropping column: {e}")
+            conn.rollback()
+            raise
+
+if __name__ == "__main__":
+    drop_timesheet_time_logged()
@@ -8,7 +8,7 @@ This script:
 
 from database import engine, SessionLocal
 from models import Employee, EnhancedTimesheet, LeaveEntry, EmployeeNameMapping
-from sqlalchemy import text
+from sqlalchemy import text, update, select
 
 # Known name mappings: {alternate_name: (canonical_name, employee_id)}
 NAME_MAPPINGS = {
@@ -108,23 +108,21 @@ def update_timesheet_names():
             return
         
         total_updated = 0
+        # Core UPDATEs on the session's connection skip the ORM bulk-update path entirely
+        conn = db.connection()
         
         for mapping in mappings:
+            renamed = {'employee_name': mapping.canonical_name, 'employee_id': mapping.employee_id}
+            
             # Update EnhancedTimesheet
-            ts_count = db.query(EnhancedTimesheet).filter(
+            ts_count = conn.execute(update(EnhancedTimesheet).where(
                 EnhancedTimesheet.employee_name == mapping.alternate_name
-            ).update({
-                'employee_name': mapping.canonical_name,
-                'employee_id': mapping.employee_id
-            }, synchronize_session=False)
+            ).values(renamed)).rowcount
             
             # Update LeaveEntry
-            leave_count = db.query(LeaveEntry).filter(
+            leave_count = conn.execute(update(LeaveEntry).where(
                 LeaveEntry.employee_name == mapping.alternate_name
-            ).update({
-                'employee_name': mapping.canonical_name,
-                'employee_id': mapping.employee_id
-            }, synchronize_session=False)
+            ).values(renamed)).rowcount
             
             if ts_count or leave_count:
                 print(f"Updated '{mapping.alternate_name}' -> '{mapping.canonical_name}': "
@@ -145,12 +143,10 @@ def show_remaining_unmatched():
     db = SessionLocal()
     try:
         # Get all employee names
-        employees = db.query(Employee.name).all()
-        emp_names = set(e[0] for e in employees)
+        emp_names = frozenset(db.execute(select(Employee.name)).scalars())
         
         # Get all timesheet names
-        ts_names = db.query(EnhancedTimesheet.employee_name).distinct().all()
-        ts_names = set(n[0] for n in ts_names)
+        ts_names = frozenset(db.execute(select(EnhancedTimesheet.employee_name).distinct()).scalars())
         
         # Find unmatched
         unmatched = ts_names - emp_names
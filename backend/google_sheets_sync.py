@@ -40,6 +40,7 @@ except ImportError:
     GOOGLE_API_AVAILABLE = False
     logger.warning("Google API libraries not installed. Run: pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
 
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter, before_sleep_log
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from database import SessionLocal, engine
@@ -55,6 +56,32 @@ from config.google_sheets_config import (
 )
 
 
+# Quota (429) and transient server errors are retried with exponential backoff
+RETRYABLE_HTTP_STATUSES = (429, 500, 503)
+_exponential_backoff = wait_exponential_jitter(initial=1, max=64)
+
+
+def _is_retryable_http_error(exc: BaseException) -> bool:
+    return GOOGLE_API_AVAILABLE and isinstance(exc, HttpError) and exc.resp.status in RETRYABLE_HTTP_STATUSES
+
+
+def _retry_after_or_backoff(retry_state) -> float:
+    """Wait as long as Google's Retry-After header asks, otherwise back off exponentially with jitter."""
+    retry_after = retry_state.outcome.exception().resp.get('retry-after')
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return _exponential_backoff(retry_state)
+
+
+google_api_retry = retry(
+    reraise=True,
+    retry=retry_if_exception(_is_retryable_http_error),
+    wait=_retry_after_or_backoff,
+    stop=stop_after_attempt(8),
+    before_sleep=before_sleep_log(logger, logging.WARNING)
+)
+
+
 class GoogleSheetsSync:
     """
     Service class for syncing Google Sheets timesheet data to the database.
@@ -157,6 +184,34 @@ class GoogleSheetsSync:
             self.service = build('sheets', 'v4', credentials=credentials)
         return self.service
     
+    @staticmethod
+    @google_api_retry
+    def _execute(request) -> Dict[str, Any]:
+        """Execute a Google API request, retrying quota and transient server errors."""
+        return request.execute()
+    
+    def watch_sheet(self, team: str, channel_id: str, webhook_url: str, token: str) -> Dict[str, Any]:
+        """
+        Register a Drive push-notification channel on a team's spreadsheet.
+        Google POSTs to webhook_url whenever the file changes, echoing token in the
+        X-Goog-Channel-Token header. Returns the channel (resourceId, expiration).
+        """
+        drive = build('drive', 'v3', credentials=self._get_credentials())
+        return self._execute(drive.files().watch(
+            fileId=get_sheet_id(team),
+            body={
+                'id': channel_id,
+                'type': 'web_hook',
+                'address': webhook_url,
+                'token': token
+            }
+        ))
+    
+    def stop_watch(self, channel_id: str, resource_id: str):
+        """Stop a Drive push-notification channel registered by watch_sheet."""
+        drive = build('drive', 'v3', credentials=self._get_credentials())
+        self._execute(drive.channels().stop(body={'id': channel_id, 'resourceId': resource_id}))
+    
     def _parse_date(self, date_value: Any) -> Optional[date]:
         """Parse various date formats from the sheet."""
         if not date_value:
@@ -287,13 +342,44 @@ class GoogleSheetsSync:
         
         return ''
     
-    def fetch_sheet_data(self, team: str, months_back: int = 6) -> List[Dict]:
+    def fetch_sheet_values(self, teams: List[str]) -> Dict[str, List[List[Any]]]:
+        """
+        Read the raw cell values of several teams' sheets.
+        
+        Teams whose tabs live in the same spreadsheet are read with a single
+        values.batchGet request, so each spreadsheet costs one API read.
+        
+        Returns:
+            Dictionary mapping team to its list of rows
+        """
+        ranges_by_sheet = {}
+        for team in teams:
+            sheet_id = get_sheet_id(team)
+            if not sheet_id:
+                raise ValueError(f"Sheet ID not configured for team: {team}")
+            ranges_by_sheet.setdefault(sheet_id, []).append((team, f"'{get_sheet_name(team)}'"))
+        
+        service = self._get_service()
+        values_by_team = {}
+        for sheet_id, team_ranges in ranges_by_sheet.items():
+            result = self._execute(service.spreadsheets().values().batchGet(
+                spreadsheetId=sheet_id,
+                ranges=[range_name for _, range_name in team_ranges]
+            ))
+            # valueRanges come back in the order the ranges were requested
+            for (team, _), value_range in zip(team_ranges, result.get('valueRanges', [])):
+                values_by_team[team] = value_range.get('values', [])
+        
+        return values_by_team
+    
+    def fetch_sheet_data(self, team: str, months_back: int = 6, values: Optional[List[List[Any]]] = None) -> List[Dict]:
         """
         Fetch data from the Google Sheet for a specific team.
         
         Args:
             team: 'QA' or 'DEV'
             months_back: Only fetch data from the last N months (default 6)
+            values: Raw sheet values already read via fetch_sheet_values (skips the API call)
             
         Returns:
             List of dictionaries containing row data
@@ -304,23 +390,11 @@ class GoogleSheetsSync:
         cutoff_date = date.today() - relativedelta(months=months_back)
         logger.info(f"Fetching data from {cutoff_date} onwards (last {months_back} months)")
         
-        service = self._get_service()
-        sheet_id = get_sheet_id(team)
-        sheet_name = get_sheet_name(team)
-        
-        if not sheet_id:
-            raise ValueError(f"Sheet ID not configured for team: {team}")
+        if values is None:
+            # Read the entire sheet
+            values = self.fetch_sheet_values([team])[team]
         
         try:
-            # Read the entire sheet
-            range_name = f"'{sheet_name}'"
-            result = service.spreadsheets().values().get(
-                spreadsheetId=sheet_id,
-                range=range_name
-            ).execute()
-            
-            values = result.get('values', [])
-            
             if not values or len(values) < 2:
                 logger.warning(f"No data found in {team} sheet")
                 return []
@@ -434,7 +508,13 @@ class GoogleSheetsSync:
             logger.error(f"Google Sheets API error: {e}")
             raise
     
-    def sync_team(self, team: str, db: Optional[Session] = None, months_back: int = 6) -> Dict[str, int]:
+    def sync_team(
+        self,
+        team: str,
+        db: Optional[Session] = None,
+        months_back: int = 6,
+        values: Optional[List[List[Any]]] = None
+    ) -> Dict[str, int]:
         """
         Sync timesheet data for a specific team from Google Sheets to the database.
         
@@ -442,6 +522,7 @@ class GoogleSheetsSync:
             team: 'QA' or 'DEV'
             db: Optional database session (creates one if not provided)
             months_back: Only sync data from the last N months (default 6)
+            values: Raw sheet values already read via fetch_sheet_values
             
         Returns:
             Dictionary with sync statistics
@@ -465,7 +546,7 @@ class GoogleSheetsSync:
         
         try:
             # Fetch data from Google Sheets (only last N months)
-            rows = self.fetch_sheet_data(team, months_back=months_back)
+            rows = self.fetch_sheet_data(team, months_back=months_back, values=values)
             stats['rows_processed'] = len(rows)
             
             # Load name mappings for automatic name normalization
@@ -630,10 +711,22 @@ class GoogleSheetsSync:
             'synced_at': datetime.utcnow().isoformat(),
             'teams': {}
         }
+        teams = ['QA', 'DEV']
+        
+        # Read every team's sheet up front: one batchGet per spreadsheet
+        try:
+            values_by_team = self.fetch_sheet_values(teams)
+        except Exception as e:
+            for team in teams:
+                results['teams'][team] = {
+                    'error': str(e),
+                    'synced_at': datetime.utcnow().isoformat()
+                }
+            return results
         
-        for team in ['QA', 'DEV']:
+        for team in teams:
             try:
-                stats = self.sync_team(team, db)
+                stats = self.sync_team(team, db, values=values_by_team.get(team, []))
                 results['teams'][team] = stats
             except Exception as e:
                 results['teams'][team] = {
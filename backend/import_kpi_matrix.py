@@ -17,8 +17,10 @@ from models import KPI
 def import_kpi_matrix(file_path):
     """Import KPI matrix from Excel file"""
     db = SessionLocal()
+    workbook = None
     try:
-        workbook = openpyxl.load_workbook(file_path)
+        # Read-only mode streams rows instead of building the whole workbook in memory
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
         
         # Map sheet names to role names (normalize to match database)
         role_mapping = {
@@ -181,6 +183,8 @@ def import_kpi_matrix(file_path):
         print(traceback.format_exc())
         raise
     finally:
+        if workbook is not None:
+            workbook.close()
         db.close()
 
 
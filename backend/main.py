@@ -1,18 +1,31 @@
-from fastapi import FastAPI, Query, HTTPException, UploadFile, File, Body, Request
+from fastapi import FastAPI, Query, HTTPException, UploadFile, File, Body, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, selectinload, undefer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import func, or_, and_, case, distinct, select, update, bindparam
 from datetime import datetime, timedelta, date
 from typing import Optional, List, Dict, Any
-from collections import defaultdict
+from collections import defaultdict, Counter
+from dataclasses import dataclass, field
 from pydantic import BaseModel
 import tempfile
 import os
 import shutil
-
-from database import SessionLocal
+import hashlib
+import re
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bisect
+import numpy as np
+import orjson
+import threading
+import uuid
+from functools import lru_cache
+from cachetools import TTLCache
+
+from database import SessionLocal, get_db
 from models import (
     Bug, TestPlan, TestRun, TestCase, TestResult, TicketTracking,
     Employee, Timesheet, EmployeeGoal, EmployeeReview, KPI, KPIRating,
@@ -20,8 +33,9 @@ from models import (
     EnhancedTimesheet, LeaveEntry, PlannedTask, WeeklyPlan,
     EmployeeNameMapping, Holiday
 )
-from google_sheets_sync import GoogleSheetsSync, get_sheets_sync_status
+from google_sheets_sync import get_sheets_sync_status
 from sheets_scheduler import get_scheduler, start_auto_sync, stop_auto_sync
+from config.google_sheets_config import get_sheet_id
 
 
 # ===== PYDANTIC MODELS =====
@@ -129,6 +143,10 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     """Start the Google Sheets auto-sync scheduler on application startup."""
+    get_scheduler().add_sync_listener(clear_calendar_cache)
+    global SHEETS_SYNC_QUEUE, SHEETS_SYNC_WORKER
+    SHEETS_SYNC_QUEUE = asyncio.Queue()
+    SHEETS_SYNC_WORKER = asyncio.create_task(sheets_sync_worker())
     try:
         if start_auto_sync():
             print("[OK] Google Sheets auto-sync started")
@@ -145,6 +163,10 @@ async def shutdown_event():
         print("[OK] Google Sheets auto-sync stopped")
     except Exception as e:
         print(f"[WARNING] Error stopping auto-sync: {e}")
+    REPORT_POOL.shutdown(wait=False, cancel_futures=True)
+    QUERY_POOL.shutdown(wait=False, cancel_futures=True)
+    if SHEETS_SYNC_WORKER:
+        SHEETS_SYNC_WORKER.cancel()
 
 
 # ===== TEAM CLASSIFICATION HELPER =====
@@ -185,19 +207,44 @@ def classify_person(name: str, team_map: dict) -> str:
     return "BIS Team"
 
 
+def find_employee(db: Session, employee_id: str) -> Optional[Employee]:
+    """
+    Look up an employee by database id (numeric path values) or employee code (e.g. TV0539).
+    Numeric values fall back to an employee code match so purely numeric codes still resolve.
+    """
+    if employee_id.isdigit():
+        employee = db.query(Employee).filter(Employee.id == int(employee_id)).first()
+        if employee:
+            return employee
+    return db.query(Employee).filter(Employee.employee_id == employee_id).first()
+
+
+def find_employee_id_by_name(db: Session, name: str) -> Optional[str]:
+    """
+    Resolve an employee code from a name. Tries an exact match on the indexed name column first
+    and only falls back to a (full-scan) partial, case-insensitive match when that finds nothing.
+    """
+    employee_id = db.query(Employee.employee_id).filter(Employee.name == name).limit(1).scalar()
+    if employee_id is None:
+        employee_id = db.query(Employee.employee_id).filter(Employee.name.ilike(f"%{name}%")).limit(1).scalar()
+    return employee_id
+
+
 @app.get("/")
 def root():
     return {"status": "FastAPI is running"}
 
+# Redmine statuses counted as open; ix_bugs_open_ticket is a partial index over exactly this list
+OPEN_BUG_STATUSES = ["New", "Reopened", "Fixed", "Assigned to Dev"]
+
 @app.get("/bugs")
 def get_bugs(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
     platform: str = Query("All"),
-    only_open: bool = Query(False)
+    only_open: bool = Query(False),
+    db: Session = Depends(get_db)
 ):
-    db: Session = SessionLocal()
-
     query = db.query(Bug)
     
     # Only filter by ticket_id if provided and not 0 (0 is used as placeholder for "all")
@@ -212,21 +259,19 @@ def get_bugs(
 
     if only_open:
         query = query.filter(
-            Bug.status.in_(["New", "Reopened", "Fixed", "Assigned to Dev"])
+            Bug.status.in_(OPEN_BUG_STATUSES)
         )
 
     bugs = query.all()
-    db.close()
     return bugs
 
 @app.get("/bugs/summary")
 def bug_summary(
     ticket_id: int = Query(...),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
-    db: Session = SessionLocal()
-
     query = db.query(Bug).filter(Bug.ticket_id == ticket_id)
 
     if environment != "All":
@@ -238,14 +283,12 @@ def bug_summary(
     bugs = query.all()
 
     total = len(bugs)
-    open_bugs = len([b for b in bugs if b.status in ["New", "Reopened", "Fixed", "Assigned to Dev"]])
+    open_bugs = len([b for b in bugs if b.status in OPEN_BUG_STATUSES])
     pending = len([b for b in bugs if b.status == "Released to QA"])
     closed = len([b for b in bugs if b.status == "Closed"])
     deferred = len([b for b in bugs if b.status == "Deferred"])
     rejected = len([b for b in bugs if b.status == "Rejected"])
 
-    db.close()
-
     return {
         "ticket_id": ticket_id,
         "environment": environment,
@@ -259,11 +302,9 @@ def bug_summary(
 
 
 @app.get("/bugs/ticket-info")
-def get_ticket_info(ticket_id: int = Query(...)):
+def get_ticket_info(ticket_id: int = Query(...), db: Session = Depends(get_db)):
     """Get ticket title and platform info"""
-    db: Session = SessionLocal()
     bug = db.query(Bug).filter(Bug.ticket_id == ticket_id).first()
-    db.close()
     
     if bug:
         return {
@@ -282,10 +323,10 @@ def get_ticket_info(ticket_id: int = Query(...)):
 def severity_breakdown(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug counts by status and severity for the bar chart"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
     
@@ -299,7 +340,6 @@ def severity_breakdown(
         query = query.filter(Bug.platform == platform)
 
     bugs = query.all()
-    db.close()
 
     # Define statuses and severities
     statuses = ["New", "Assigned to Dev", "Fixed", "Released to QA", "Reopened", "Closed"]
@@ -324,10 +364,10 @@ def severity_breakdown(
 def priority_breakdown(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug counts by priority for the pie chart"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
     
@@ -341,7 +381,6 @@ def priority_breakdown(
         query = query.filter(Bug.platform == platform)
 
     bugs = query.all()
-    db.close()
 
     priorities = ["High", "Medium", "Low", "Low Bug"]
     result = {}
@@ -355,10 +394,10 @@ def priority_breakdown(
 def bug_metrics(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get closure rate and critical bugs percentage"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
     
@@ -369,7 +408,6 @@ def bug_metrics(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     total = len(bugs)
     closed = len([b for b in bugs if b.status == "Closed"])
@@ -388,9 +426,8 @@ def bug_metrics(
 
 
 @app.get("/bugs/all-summary")
-def all_bugs_summary(environment: str = Query("All")):
+def all_bugs_summary(environment: str = Query("All"), db: Session = Depends(get_db)):
     """Get summary for all bugs across all tickets"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -398,10 +435,9 @@ def all_bugs_summary(environment: str = Query("All")):
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     total = len(bugs)
-    open_bugs = len([b for b in bugs if b.status in ["New", "Reopened", "Fixed", "Assigned to Dev"]])
+    open_bugs = len([b for b in bugs if b.status in OPEN_BUG_STATUSES])
     pending = len([b for b in bugs if b.status == "Released to QA"])
     closed = len([b for b in bugs if b.status == "Closed"])
     deferred = len([b for b in bugs if b.status == "Deferred"])
@@ -422,155 +458,143 @@ def all_bugs_summary(environment: str = Query("All")):
 def assignee_breakdown(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by assignee with team classification"""
-    db: Session = SessionLocal()
-
-    try:
-        # Get team classification map
-        team_map = get_team_classification(db)
-        
-        query = db.query(Bug)
+    # Get team classification map
+    team_map = get_team_classification(db)
+    
+    query = db.query(Bug)
 
-        if ticket_id is not None:
-            query = query.filter(Bug.ticket_id == ticket_id)
+    if ticket_id is not None:
+        query = query.filter(Bug.ticket_id == ticket_id)
 
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
 
-        if platform != "All":
-            query = query.filter(Bug.platform == platform)
+    if platform != "All":
+        query = query.filter(Bug.platform == platform)
 
-        bugs = query.all()
+    bugs = query.all()
 
-        assignee_data = defaultdict(lambda: {"open": 0, "closed": 0, "total": 0, "team": "Unknown"})
-        
-        for bug in bugs:
-            assignee = bug.assignee or "Unassigned"
-            assignee_data[assignee]["total"] += 1
-            assignee_data[assignee]["team"] = classify_person(assignee, team_map)
-            if bug.status == "Closed":
-                assignee_data[assignee]["closed"] += 1
-            else:
-                assignee_data[assignee]["open"] += 1
+    assignee_data = defaultdict(lambda: {"open": 0, "closed": 0, "total": 0, "team": "Unknown"})
+    
+    for bug in bugs:
+        assignee = bug.assignee or "Unassigned"
+        assignee_data[assignee]["total"] += 1
+        assignee_data[assignee]["team"] = classify_person(assignee, team_map)
+        if bug.status == "Closed":
+            assignee_data[assignee]["closed"] += 1
+        else:
+            assignee_data[assignee]["open"] += 1
 
-        result = {assignee: data for assignee, data in assignee_data.items()}
-        return result
-    finally:
-        db.close()
+    result = {assignee: data for assignee, data in assignee_data.items()}
+    return result
 
 
 @app.get("/bugs/author-breakdown")
 def author_breakdown(
     ticket_id: Optional[int] = Query(None),
     environment: str = Query("All"),
-    platform: str = Query("All")
+    platform: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by author (who reported bugs) with team classification"""
-    db: Session = SessionLocal()
+    # Get team classification map
+    team_map = get_team_classification(db)
+    
+    query = db.query(Bug)
 
-    try:
-        # Get team classification map
-        team_map = get_team_classification(db)
-        
-        query = db.query(Bug)
+    if ticket_id is not None:
+        query = query.filter(Bug.ticket_id == ticket_id)
 
-        if ticket_id is not None:
-            query = query.filter(Bug.ticket_id == ticket_id)
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
 
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
+    if platform != "All":
+        query = query.filter(Bug.platform == platform)
 
-        if platform != "All":
-            query = query.filter(Bug.platform == platform)
+    bugs = query.all()
 
-        bugs = query.all()
+    author_data = defaultdict(lambda: {"total": 0, "by_severity": defaultdict(int), "team": "Unknown"})
+    
+    for bug in bugs:
+        author = bug.author or "Unknown"
+        author_data[author]["total"] += 1
+        author_data[author]["team"] = classify_person(author, team_map)
+        if bug.severity:
+            author_data[author]["by_severity"][bug.severity] += 1
 
-        author_data = defaultdict(lambda: {"total": 0, "by_severity": defaultdict(int), "team": "Unknown"})
-        
-        for bug in bugs:
-            author = bug.author or "Unknown"
-            author_data[author]["total"] += 1
-            author_data[author]["team"] = classify_person(author, team_map)
-            if bug.severity:
-                author_data[author]["by_severity"][bug.severity] += 1
-
-        result = {}
-        for author, data in author_data.items():
-            result[author] = {
-                "total": data["total"],
-                "by_severity": dict(data["by_severity"]),
-                "team": data["team"]
-            }
-        
-        return result
-    finally:
-        db.close()
+    result = {}
+    for author, data in author_data.items():
+        result[author] = {
+            "total": data["total"],
+            "by_severity": dict(data["by_severity"]),
+            "team": data["team"]
+        }
+    
+    return result
 
 
 @app.get("/bugs/team-summary")
 def bug_team_summary(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug summary grouped by team (DEV, QA, BIS Team)"""
-    db: Session = SessionLocal()
-
-    try:
-        # Get team classification map
-        team_map = get_team_classification(db)
-        
-        query = db.query(Bug)
+    # Get team classification map
+    team_map = get_team_classification(db)
+    
+    query = db.query(Bug)
 
-        if ticket_id is not None and ticket_id != 0:
-            query = query.filter(Bug.ticket_id == ticket_id)
+    if ticket_id is not None and ticket_id != 0:
+        query = query.filter(Bug.ticket_id == ticket_id)
 
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
 
-        bugs = query.all()
+    bugs = query.all()
 
-        team_data = {
-            "DEV": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0},
-            "QA": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0},
-            "BIS Team": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0}
-        }
+    team_data = {
+        "DEV": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0},
+        "QA": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0},
+        "BIS Team": {"assignees": {}, "total_bugs": 0, "open": 0, "closed": 0}
+    }
+    
+    for bug in bugs:
+        assignee = bug.assignee or "Unassigned"
+        team = classify_person(assignee, team_map)
         
-        for bug in bugs:
-            assignee = bug.assignee or "Unassigned"
-            team = classify_person(assignee, team_map)
-            
-            if team not in team_data:
-                team = "BIS Team"  # Default fallback
-            
-            team_data[team]["total_bugs"] += 1
-            if bug.status == "Closed":
-                team_data[team]["closed"] += 1
-            else:
-                team_data[team]["open"] += 1
-            
-            if assignee not in team_data[team]["assignees"]:
-                team_data[team]["assignees"][assignee] = {"total": 0, "open": 0, "closed": 0}
-            
-            team_data[team]["assignees"][assignee]["total"] += 1
-            if bug.status == "Closed":
-                team_data[team]["assignees"][assignee]["closed"] += 1
-            else:
-                team_data[team]["assignees"][assignee]["open"] += 1
+        if team not in team_data:
+            team = "BIS Team"  # Default fallback
+        
+        team_data[team]["total_bugs"] += 1
+        if bug.status == "Closed":
+            team_data[team]["closed"] += 1
+        else:
+            team_data[team]["open"] += 1
+        
+        if assignee not in team_data[team]["assignees"]:
+            team_data[team]["assignees"][assignee] = {"total": 0, "open": 0, "closed": 0}
+        
+        team_data[team]["assignees"][assignee]["total"] += 1
+        if bug.status == "Closed":
+            team_data[team]["assignees"][assignee]["closed"] += 1
+        else:
+            team_data[team]["assignees"][assignee]["open"] += 1
 
-        return team_data
-    finally:
-        db.close()
+    return team_data
 
 
 @app.get("/bugs/module-breakdown")
 def module_breakdown(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by module"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -581,7 +605,6 @@ def module_breakdown(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     module_data = defaultdict(int)
     
@@ -595,10 +618,10 @@ def module_breakdown(
 @app.get("/bugs/feature-breakdown")
 def feature_breakdown(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by feature"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -609,7 +632,6 @@ def feature_breakdown(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     feature_data = defaultdict(lambda: {"open": 0, "closed": 0, "total": 0})
     
@@ -628,10 +650,10 @@ def feature_breakdown(
 @app.get("/bugs/browser-os-breakdown")
 def browser_os_breakdown(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by browser and OS combinations"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -642,7 +664,6 @@ def browser_os_breakdown(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     browser_os_data = defaultdict(int)
     
@@ -658,10 +679,10 @@ def browser_os_breakdown(
 @app.get("/bugs/platform-breakdown")
 def platform_breakdown(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug distribution by platform"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -672,7 +693,6 @@ def platform_breakdown(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     platform_data = defaultdict(lambda: {"open": 0, "closed": 0, "total": 0, "by_status": defaultdict(int)})
     
@@ -700,10 +720,10 @@ def platform_breakdown(
 @app.get("/bugs/age-analysis")
 def age_analysis(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug age metrics"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -714,7 +734,6 @@ def age_analysis(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     now = datetime.now()
     open_bugs = [b for b in bugs if b.status not in ["Closed", "Deferred"]]
@@ -751,10 +770,10 @@ def age_analysis(
 @app.get("/bugs/resolution-time")
 def resolution_time(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get resolution time metrics"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -765,7 +784,6 @@ def resolution_time(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     closed_bugs = [b for b in bugs if b.status == "Closed" and b.created_on and b.closed_on]
     
@@ -811,10 +829,10 @@ def resolution_time(
 @app.get("/bugs/reopened-analysis")
 def reopened_analysis(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get reopened bugs analysis"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -825,7 +843,6 @@ def reopened_analysis(
         query = query.filter(Bug.environment == environment)
 
     bugs = query.all()
-    db.close()
 
     reopened_bugs = [b for b in bugs if b.status == "Reopened"]
     total_bugs = len(bugs)
@@ -853,10 +870,10 @@ def reopened_analysis(
 @app.get("/bugs/deferred-bugs")
 def deferred_bugs(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get deferred bugs with ageing information"""
-    db: Session = SessionLocal()
 
     query = db.query(Bug)
 
@@ -868,7 +885,6 @@ def deferred_bugs(
 
     query = query.filter(Bug.status == "Deferred")
     bugs = query.all()
-    db.close()
 
     now = datetime.now()
     deferred_list = []
@@ -898,303 +914,351 @@ def deferred_bugs(
 @app.get("/bugs/time-tracking")
 def bug_time_tracking(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get estimate vs actual time comparison with variance analysis"""
-    db: Session = SessionLocal()
+    query = db.query(Bug)
     
-    try:
-        query = db.query(Bug)
-        
-        if ticket_id is not None and ticket_id != 0:
-            query = query.filter(Bug.ticket_id == ticket_id)
-        
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
-        
-        bugs = query.all()
-        
-        total_estimated = 0
-        total_spent = 0
-        estimated_count = 0
-        not_estimated_count = 0
-        bugs_with_variance = []
-        
-        for bug in bugs:
-            estimated = bug.estimated_hours or 0
-            spent = bug.spent_hours or 0
-            
-            if estimated > 0:
-                estimated_count += 1
-                total_estimated += estimated
-                total_spent += spent
-                
-                variance_percent = ((spent - estimated) / estimated) * 100 if estimated > 0 else 0
-                bugs_with_variance.append({
-                    "bug_id": bug.bug_id,
-                    "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
-                    "estimated_hours": estimated,
-                    "spent_hours": spent,
-                    "variance_percent": round(variance_percent, 1),
-                    "variance_status": "green" if abs(variance_percent) < 10 else ("amber" if abs(variance_percent) < 30 else "red")
-                })
-            else:
-                not_estimated_count += 1
-        
-        overall_variance = ((total_spent - total_estimated) / total_estimated * 100) if total_estimated > 0 else 0
-        
-        # Group by variance status
-        variance_distribution = {
-            "under_estimate": len([b for b in bugs_with_variance if b["variance_percent"] < -10]),
-            "on_track": len([b for b in bugs_with_variance if -10 <= b["variance_percent"] <= 10]),
-            "over_estimate": len([b for b in bugs_with_variance if b["variance_percent"] > 10])
-        }
-        
-        return {
-            "total_bugs": len(bugs),
-            "estimated_count": estimated_count,
-            "not_estimated_count": not_estimated_count,
-            "not_estimated_percent": round((not_estimated_count / len(bugs) * 100) if bugs else 0, 1),
-            "total_estimated_hours": round(total_estimated, 1),
-            "total_spent_hours": round(total_spent, 1),
-            "overall_variance_percent": round(overall_variance, 1),
-            "variance_distribution": variance_distribution,
-            "top_variances": sorted(bugs_with_variance, key=lambda x: abs(x["variance_percent"]), reverse=True)[:10]
-        }
-    finally:
-        db.close()
+    if ticket_id is not None and ticket_id != 0:
+        query = query.filter(Bug.ticket_id == ticket_id)
+    
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
+    
+    bugs = query.all()
+    
+    total_estimated = 0
+    total_spent = 0
+    estimated_count = 0
+    not_estimated_count = 0
+    bugs_with_variance = []
+    
+    for bug in bugs:
+        estimated = bug.estimated_hours or 0
+        spent = bug.spent_hours or 0
+        
+        if estimated > 0:
+            estimated_count += 1
+            total_estimated += estimated
+            total_spent += spent
+            
+            variance_percent = ((spent - estimated) / estimated) * 100 if estimated > 0 else 0
+            bugs_with_variance.append({
+                "bug_id": bug.bug_id,
+                "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
+                "estimated_hours": estimated,
+                "spent_hours": spent,
+                "variance_percent": round(variance_percent, 1),
+                "variance_status": "green" if abs(variance_percent) < 10 else ("amber" if abs(variance_percent) < 30 else "red")
+            })
+        else:
+            not_estimated_count += 1
+    
+    overall_variance = ((total_spent - total_estimated) / total_estimated * 100) if total_estimated > 0 else 0
+    
+    # Group by variance status
+    variance_distribution = {
+        "under_estimate": len([b for b in bugs_with_variance if b["variance_percent"] < -10]),
+        "on_track": len([b for b in bugs_with_variance if -10 <= b["variance_percent"] <= 10]),
+        "over_estimate": len([b for b in bugs_with_variance if b["variance_percent"] > 10])
+    }
+    
+    return {
+        "total_bugs": len(bugs),
+        "estimated_count": estimated_count,
+        "not_estimated_count": not_estimated_count,
+        "not_estimated_percent": round((not_estimated_count / len(bugs) * 100) if bugs else 0, 1),
+        "total_estimated_hours": round(total_estimated, 1),
+        "total_spent_hours": round(total_spent, 1),
+        "overall_variance_percent": round(overall_variance, 1),
+        "variance_distribution": variance_distribution,
+        "top_variances": sorted(bugs_with_variance, key=lambda x: abs(x["variance_percent"]), reverse=True)[:10]
+    }
 
 
 @app.get("/bugs/sla-analysis")
 def bug_sla_analysis(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get due date/SLA tracking - overdue, on-time, no due date"""
-    db: Session = SessionLocal()
+    query = db.query(Bug)
     
-    try:
-        query = db.query(Bug)
-        
-        if ticket_id is not None and ticket_id != 0:
-            query = query.filter(Bug.ticket_id == ticket_id)
-        
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
-        
-        bugs = query.all()
-        now = datetime.now()
-        
-        overdue = []
-        on_time = []
-        no_due_date = []
-        completed_on_time = 0
-        completed_late = 0
-        
-        for bug in bugs:
-            if bug.due_date is None:
-                no_due_date.append(bug.bug_id)
-            else:
-                due = bug.due_date.replace(tzinfo=None) if bug.due_date.tzinfo else bug.due_date
-                
-                if bug.status == "Closed" and bug.closed_on:
-                    closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
-                    if closed <= due:
-                        completed_on_time += 1
-                        on_time.append(bug.bug_id)
-                    else:
-                        completed_late += 1
-                        overdue.append({
-                            "bug_id": bug.bug_id,
-                            "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
-                            "due_date": due.isoformat(),
-                            "days_overdue": (closed - due).days,
-                            "status": bug.status,
-                            "severity": bug.severity
-                        })
-                elif bug.status != "Closed":
-                    if now > due:
-                        days_overdue = (now - due).days
-                        overdue.append({
-                            "bug_id": bug.bug_id,
-                            "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
-                            "due_date": due.isoformat(),
-                            "days_overdue": days_overdue,
-                            "status": bug.status,
-                            "severity": bug.severity
-                        })
-                    else:
-                        on_time.append(bug.bug_id)
-        
-        # Sort overdue by days overdue (most overdue first)
-        overdue_list = sorted(overdue, key=lambda x: x["days_overdue"], reverse=True)
-        
-        return {
-            "total_bugs": len(bugs),
-            "overdue_count": len(overdue),
-            "on_time_count": len(on_time),
-            "no_due_date_count": len(no_due_date),
-            "completed_on_time": completed_on_time,
-            "completed_late": completed_late,
-            "sla_compliance_rate": round((len(on_time) / (len(on_time) + len(overdue)) * 100) if (len(on_time) + len(overdue)) > 0 else 0, 1),
-            "overdue_bugs": overdue_list[:20],  # Top 20 overdue
-            "distribution": {
-                "overdue": len(overdue),
-                "on_time": len(on_time),
-                "no_due_date": len(no_due_date)
-            }
+    if ticket_id is not None and ticket_id != 0:
+        query = query.filter(Bug.ticket_id == ticket_id)
+    
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
+    
+    bugs = query.all()
+    now = datetime.now()
+    
+    overdue = []
+    on_time = []
+    no_due_date = []
+    completed_on_time = 0
+    completed_late = 0
+    
+    for bug in bugs:
+        if bug.due_date is None:
+            no_due_date.append(bug.bug_id)
+        else:
+            due = bug.due_date.replace(tzinfo=None) if bug.due_date.tzinfo else bug.due_date
+            
+            if bug.status == "Closed" and bug.closed_on:
+                closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
+                if closed <= due:
+                    completed_on_time += 1
+                    on_time.append(bug.bug_id)
+                else:
+                    completed_late += 1
+                    overdue.append({
+                        "bug_id": bug.bug_id,
+                        "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
+                        "due_date": due.isoformat(),
+                        "days_overdue": (closed - due).days,
+                        "status": bug.status,
+                        "severity": bug.severity
+                    })
+            elif bug.status != "Closed":
+                if now > due:
+                    days_overdue = (now - due).days
+                    overdue.append({
+                        "bug_id": bug.bug_id,
+                        "subject": bug.subject[:50] + "..." if len(bug.subject or "") > 50 else bug.subject,
+                        "due_date": due.isoformat(),
+                        "days_overdue": days_overdue,
+                        "status": bug.status,
+                        "severity": bug.severity
+                    })
+                else:
+                    on_time.append(bug.bug_id)
+    
+    # Sort overdue by days overdue (most overdue first)
+    overdue_list = sorted(overdue, key=lambda x: x["days_overdue"], reverse=True)
+    
+    return {
+        "total_bugs": len(bugs),
+        "overdue_count": len(overdue),
+        "on_time_count": len(on_time),
+        "no_due_date_count": len(no_due_date),
+        "completed_on_time": completed_on_time,
+        "completed_late": completed_late,
+        "sla_compliance_rate": round((len(on_time) / (len(on_time) + len(overdue)) * 100) if (len(on_time) + len(overdue)) > 0 else 0, 1),
+        "overdue_bugs": overdue_list[:20],  # Top 20 overdue
+        "distribution": {
+            "overdue": len(overdue),
+            "on_time": len(on_time),
+            "no_due_date": len(no_due_date)
         }
-    finally:
-        db.close()
+    }
 
 
 @app.get("/bugs/lifecycle-analysis")
 def bug_lifecycle_analysis(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get bug lifecycle metrics - start to close timeline"""
-    db: Session = SessionLocal()
+    query = db.query(Bug)
     
-    try:
-        query = db.query(Bug)
-        
-        if ticket_id is not None and ticket_id != 0:
-            query = query.filter(Bug.ticket_id == ticket_id)
-        
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
-        
-        bugs = query.all()
-        
-        lifecycle_days = []
-        creation_to_close = []
-        
-        for bug in bugs:
-            # Calculate lifecycle from start_date to closed_on
-            if bug.start_date and bug.closed_on:
-                start = bug.start_date.replace(tzinfo=None) if bug.start_date.tzinfo else bug.start_date
-                closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
-                days = (closed - start).days
-                if days >= 0:
-                    lifecycle_days.append(days)
-            
-            # Also calculate from created_on to closed_on
-            if bug.created_on and bug.closed_on:
-                created = bug.created_on.replace(tzinfo=None) if bug.created_on.tzinfo else bug.created_on
-                closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
-                days = (closed - created).days
-                if days >= 0:
-                    creation_to_close.append(days)
-        
-        # Calculate distribution buckets
-        def get_distribution(days_list):
-            return {
-                "0-1": len([d for d in days_list if d <= 1]),
-                "2-3": len([d for d in days_list if 2 <= d <= 3]),
-                "4-7": len([d for d in days_list if 4 <= d <= 7]),
-                "8-14": len([d for d in days_list if 8 <= d <= 14]),
-                "15-30": len([d for d in days_list if 15 <= d <= 30]),
-                "30+": len([d for d in days_list if d > 30])
-            }
-        
-        avg_lifecycle = sum(lifecycle_days) / len(lifecycle_days) if lifecycle_days else 0
-        avg_creation_to_close = sum(creation_to_close) / len(creation_to_close) if creation_to_close else 0
-        
+    if ticket_id is not None and ticket_id != 0:
+        query = query.filter(Bug.ticket_id == ticket_id)
+    
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
+    
+    bugs = query.all()
+    
+    lifecycle_days = []
+    creation_to_close = []
+    
+    for bug in bugs:
+        # Calculate lifecycle from start_date to closed_on
+        if bug.start_date and bug.closed_on:
+            start = bug.start_date.replace(tzinfo=None) if bug.start_date.tzinfo else bug.start_date
+            closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
+            days = (closed - start).days
+            if days >= 0:
+                lifecycle_days.append(days)
+        
+        # Also calculate from created_on to closed_on
+        if bug.created_on and bug.closed_on:
+            created = bug.created_on.replace(tzinfo=None) if bug.created_on.tzinfo else bug.created_on
+            closed = bug.closed_on.replace(tzinfo=None) if bug.closed_on.tzinfo else bug.closed_on
+            days = (closed - created).days
+            if days >= 0:
+                creation_to_close.append(days)
+    
+    # Calculate distribution buckets
+    def get_distribution(days_list):
         return {
-            "total_closed_bugs": len(creation_to_close),
-            "avg_lifecycle_days": round(avg_lifecycle, 1),
-            "avg_creation_to_close_days": round(avg_creation_to_close, 1),
-            "min_lifecycle_days": min(lifecycle_days) if lifecycle_days else 0,
-            "max_lifecycle_days": max(lifecycle_days) if lifecycle_days else 0,
-            "median_lifecycle_days": sorted(lifecycle_days)[len(lifecycle_days)//2] if lifecycle_days else 0,
-            "lifecycle_distribution": get_distribution(lifecycle_days),
-            "creation_close_distribution": get_distribution(creation_to_close)
+            "0-1": len([d for d in days_list if d <= 1]),
+            "2-3": len([d for d in days_list if 2 <= d <= 3]),
+            "4-7": len([d for d in days_list if 4 <= d <= 7]),
+            "8-14": len([d for d in days_list if 8 <= d <= 14]),
+            "15-30": len([d for d in days_list if 15 <= d <= 30]),
+            "30+": len([d for d in days_list if d > 30])
         }
-    finally:
-        db.close()
+    
+    avg_lifecycle = sum(lifecycle_days) / len(lifecycle_days) if lifecycle_days else 0
+    avg_creation_to_close = sum(creation_to_close) / len(creation_to_close) if creation_to_close else 0
+    
+    return {
+        "total_closed_bugs": len(creation_to_close),
+        "avg_lifecycle_days": round(avg_lifecycle, 1),
+        "avg_creation_to_close_days": round(avg_creation_to_close, 1),
+        "min_lifecycle_days": min(lifecycle_days) if lifecycle_days else 0,
+        "max_lifecycle_days": max(lifecycle_days) if lifecycle_days else 0,
+        "median_lifecycle_days": sorted(lifecycle_days)[len(lifecycle_days)//2] if lifecycle_days else 0,
+        "lifecycle_distribution": get_distribution(lifecycle_days),
+        "creation_close_distribution": get_distribution(creation_to_close)
+    }
 
 
 @app.get("/bugs/completion-progress")
 def bug_completion_progress(
     ticket_id: Optional[int] = Query(None),
-    environment: str = Query("All")
+    environment: str = Query("All"),
+    db: Session = Depends(get_db)
 ):
     """Get done_ratio/completion progress distribution"""
-    db: Session = SessionLocal()
+    query = db.query(Bug)
     
-    try:
-        query = db.query(Bug)
-        
-        if ticket_id is not None and ticket_id != 0:
-            query = query.filter(Bug.ticket_id == ticket_id)
-        
-        if environment != "All":
-            query = query.filter(Bug.environment == environment)
-        
-        # Only get open bugs (not closed)
-        query = query.filter(Bug.status != "Closed")
-        
-        bugs = query.all()
-        
-        completion_buckets = {
-            "0%": 0,
-            "1-25%": 0,
-            "26-50%": 0,
-            "51-75%": 0,
-            "76-99%": 0,
-            "100%": 0
-        }
-        
-        total_done_ratio = 0
-        bugs_with_progress = 0
-        
-        for bug in bugs:
-            done = bug.done_ratio or 0
-            total_done_ratio += done
-            
-            if done > 0:
-                bugs_with_progress += 1
-            
-            if done == 0:
-                completion_buckets["0%"] += 1
-            elif done <= 25:
-                completion_buckets["1-25%"] += 1
-            elif done <= 50:
-                completion_buckets["26-50%"] += 1
-            elif done <= 75:
-                completion_buckets["51-75%"] += 1
-            elif done < 100:
-                completion_buckets["76-99%"] += 1
-            else:
-                completion_buckets["100%"] += 1
-        
-        avg_completion = total_done_ratio / len(bugs) if bugs else 0
-        
-        return {
-            "total_open_bugs": len(bugs),
-            "bugs_with_progress": bugs_with_progress,
-            "bugs_not_started": completion_buckets["0%"],
-            "avg_completion_percent": round(avg_completion, 1),
-            "completion_distribution": completion_buckets,
-            "near_completion": completion_buckets["76-99%"] + completion_buckets["100%"]
-        }
-    finally:
-        db.close()
+    if ticket_id is not None and ticket_id != 0:
+        query = query.filter(Bug.ticket_id == ticket_id)
+    
+    if environment != "All":
+        query = query.filter(Bug.environment == environment)
+    
+    # Only get open bugs (not closed)
+    query = query.filter(Bug.status != "Closed")
+    
+    bugs = query.all()
+    
+    completion_buckets = {
+        "0%": 0,
+        "1-25%": 0,
+        "26-50%": 0,
+        "51-75%": 0,
+        "76-99%": 0,
+        "100%": 0
+    }
+    
+    total_done_ratio = 0
+    bugs_with_progress = 0
+    
+    for bug in bugs:
+        done = bug.done_ratio or 0
+        total_done_ratio += done
+        
+        if done > 0:
+            bugs_with_progress += 1
+        
+        if done == 0:
+            completion_buckets["0%"] += 1
+        elif done <= 25:
+            completion_buckets["1-25%"] += 1
+        elif done <= 50:
+            completion_buckets["26-50%"] += 1
+        elif done <= 75:
+            completion_buckets["51-75%"] += 1
+        elif done < 100:
+            completion_buckets["76-99%"] += 1
+        else:
+            completion_buckets["100%"] += 1
+    
+    avg_completion = total_done_ratio / len(bugs) if bugs else 0
+    
+    return {
+        "total_open_bugs": len(bugs),
+        "bugs_with_progress": bugs_with_progress,
+        "bugs_not_started": completion_buckets["0%"],
+        "avg_completion_percent": round(avg_completion, 1),
+        "completion_distribution": completion_buckets,
+        "near_completion": completion_buckets["76-99%"] + completion_buckets["100%"]
+    }
 
 
 # ===== TESTRAIL ENDPOINTS =====
 
 @app.get("/testrail/summary")
-def testrail_summary(ticket_id: int = Query(...)):
+def testrail_summary(ticket_id: int = Query(...), db: Session = Depends(get_db)):
     """Get test case counts and status breakdown for a ticket"""
-    db: Session = SessionLocal()
+    # Get all test results for this ticket
+    results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
     
-    try:
-        # Get all test results for this ticket
-        results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
+    total_tests = len(results)
+    status_counts = {
+        "Passed": 0,
+        "Failed": 0,
+        "Blocked": 0,
+        "Retest": 0,
+        "Untested": 0
+    }
+    
+    for result in results:
+        status = result.status_name or "Untested"
+        if status in status_counts:
+            status_counts[status] += 1
+    
+    # Get unique test cases count
+    unique_cases = db.query(TestCase.case_id).filter(TestCase.ticket_id == ticket_id).distinct().count()
+    plans_count = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).count()
+    runs_count = db.query(TestRun).filter(TestRun.ticket_id == ticket_id).count()
+    
+    # Get test plan name (most recent plan)
+    test_plan = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).order_by(TestPlan.created_on.desc()).first()
+    plan_name = None
+    if test_plan and test_plan.name:
+        # Remove ticket_id_ prefix from plan name
+        import re
+        plan_name = re.sub(r'^\d+_', '', test_plan.name)
+    
+    return {
+        "ticket_id": ticket_id,
+        "total_test_cases": unique_cases,
+        "total_test_results": total_tests,
+        "status_counts": status_counts,
+        "test_plans_count": plans_count,
+        "test_runs_count": runs_count,
+        "test_plan_name": plan_name
+    }
+
+
+@app.get("/testrail/test-plans")
+def testrail_test_plans(ticket_id: int = Query(...), db: Session = Depends(get_db)):
+    """Get all test plans for a ticket"""
+    plans = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).all()
+    return [
+        {
+            "plan_id": plan.plan_id,
+            "name": plan.name,
+            "description": plan.description,
+            "created_on": plan.created_on.isoformat() if plan.created_on else None,
+            "updated_on": plan.updated_on.isoformat() if plan.updated_on else None,
+            "custom_fields": plan.custom_fields
+        }
+        for plan in plans
+    ]
+
+
+@app.get("/testrail/test-runs")
+def testrail_test_runs(ticket_id: int = Query(...), db: Session = Depends(get_db)):
+    """Get all test runs for a ticket with their test results"""
+    # Results for all runs are loaded in one extra SELECT ... WHERE run_id IN (...)
+    runs = db.query(TestRun).options(selectinload(TestRun.results), undefer(TestRun.custom_fields)).filter(
+        TestRun.ticket_id == ticket_id
+    ).order_by(TestRun.created_on.desc()).all()
+    result = []
+    
+    for run in runs:
+        results = run.results
         
-        total_tests = len(results)
+        # Count statuses for this run
         status_counts = {
             "Passed": 0,
             "Failed": 0,
@@ -1203,450 +1267,349 @@ def testrail_summary(ticket_id: int = Query(...)):
             "Untested": 0
         }
         
-        for result in results:
-            status = result.status_name or "Untested"
+        for res in results:
+            status = res.status_name or "Untested"
             if status in status_counts:
                 status_counts[status] += 1
         
-        # Get unique test cases count
-        unique_cases = db.query(TestCase.case_id).filter(TestCase.ticket_id == ticket_id).distinct().count()
-        plans_count = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).count()
-        runs_count = db.query(TestRun).filter(TestRun.ticket_id == ticket_id).count()
-        
-        # Get test plan name (most recent plan)
-        test_plan = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).order_by(TestPlan.created_on.desc()).first()
-        plan_name = None
-        if test_plan and test_plan.name:
-            # Remove ticket_id_ prefix from plan name
-            import re
-            plan_name = re.sub(r'^\d+_', '', test_plan.name)
-        
-        return {
-            "ticket_id": ticket_id,
-            "total_test_cases": unique_cases,
-            "total_test_results": total_tests,
+        # Get unique test cases in this run
+        unique_cases = len({res.case_id for res in results})
+        
+        result.append({
+            "run_id": run.run_id,
+            "plan_id": run.plan_id,
+            "name": run.name,
+            "description": run.description,
+            "status": run.status,
+            "created_on": run.created_on.isoformat() if run.created_on else None,
+            "updated_on": run.updated_on.isoformat() if run.updated_on else None,
+            "total_tests": len(results),
+            "unique_test_cases": unique_cases,
             "status_counts": status_counts,
-            "test_plans_count": plans_count,
-            "test_runs_count": runs_count,
-            "test_plan_name": plan_name
-        }
-    finally:
-        db.close()
-
-
-@app.get("/testrail/test-plans")
-def testrail_test_plans(ticket_id: int = Query(...)):
-    """Get all test plans for a ticket"""
-    db: Session = SessionLocal()
-    try:
-        plans = db.query(TestPlan).filter(TestPlan.ticket_id == ticket_id).all()
-        return [
-            {
-                "plan_id": plan.plan_id,
-                "name": plan.name,
-                "description": plan.description,
-                "created_on": plan.created_on.isoformat() if plan.created_on else None,
-                "updated_on": plan.updated_on.isoformat() if plan.updated_on else None,
-                "custom_fields": plan.custom_fields
-            }
-            for plan in plans
-        ]
-    finally:
-        db.close()
-
-
-@app.get("/testrail/test-runs")
-def testrail_test_runs(ticket_id: int = Query(...)):
-    """Get all test runs for a ticket with their test results"""
-    db: Session = SessionLocal()
-    try:
-        runs = db.query(TestRun).filter(TestRun.ticket_id == ticket_id).order_by(TestRun.created_on.desc()).all()
-        result = []
-        
-        for run in runs:
-            # Get all test results for this run
-            results = db.query(TestResult).filter(TestResult.run_id == run.run_id).all()
-            
-            # Count statuses for this run
-            status_counts = {
-                "Passed": 0,
-                "Failed": 0,
-                "Blocked": 0,
-                "Retest": 0,
-                "Untested": 0
-            }
-            
-            for res in results:
-                status = res.status_name or "Untested"
-                if status in status_counts:
-                    status_counts[status] += 1
-            
-            # Get unique test cases in this run
-            unique_cases = db.query(TestResult.case_id).filter(
-                TestResult.run_id == run.run_id
-            ).distinct().count()
-            
-            result.append({
-                "run_id": run.run_id,
-                "plan_id": run.plan_id,
-                "name": run.name,
-                "description": run.description,
-                "status": run.status,
-                "created_on": run.created_on.isoformat() if run.created_on else None,
-                "updated_on": run.updated_on.isoformat() if run.updated_on else None,
-                "total_tests": len(results),
-                "unique_test_cases": unique_cases,
-                "status_counts": status_counts,
-                "custom_fields": run.custom_fields
-            })
-        
-        return result
-    finally:
-        db.close()
+            "custom_fields": run.custom_fields
+        })
+    
+    return result
 
 
 @app.get("/testrail/test-cases")
-def testrail_test_cases(ticket_id: int = Query(...)):
+def testrail_test_cases(ticket_id: int = Query(...), db: Session = Depends(get_db)):
     """Get all test cases with results for a ticket"""
-    db: Session = SessionLocal()
-    try:
-        # Get all test cases for this ticket
-        cases = db.query(TestCase).filter(TestCase.ticket_id == ticket_id).all()
-        
-        # Get latest results for each case
-        case_results = {}
-        results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
-        
-        for result in results:
-            case_id = result.case_id
-            if case_id not in case_results or (result.created_on and (
-                not case_results[case_id].created_on or 
-                result.created_on > case_results[case_id].created_on
-            )):
-                case_results[case_id] = result
-        
-        return [
-            {
-                "case_id": case.case_id,
-                "run_id": case.run_id,
-                "title": case.title,
-                "section": case.section,
-                "priority": case.priority,
-                "type": case.type,
-                "latest_status": case_results.get(case.case_id).status_name if case.case_id in case_results and case_results.get(case.case_id) else "Untested",
-                "latest_result_id": case_results.get(case.case_id).test_id if case.case_id in case_results and case_results.get(case.case_id) else None,
-                "custom_fields": case.custom_fields
-            }
-            for case in cases
-        ]
-    finally:
-        db.close()
+    # Get all test cases for this ticket
+    cases = db.query(TestCase).options(undefer(TestCase.custom_fields)).filter(TestCase.ticket_id == ticket_id).all()
+    
+    # Get latest results for each case
+    case_results = {}
+    results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
+    
+    for result in results:
+        case_id = result.case_id
+        if case_id not in case_results or (result.created_on and (
+            not case_results[case_id].created_on or 
+            result.created_on > case_results[case_id].created_on
+        )):
+            case_results[case_id] = result
+    
+    return [
+        {
+            "case_id": case.case_id,
+            "run_id": case.run_id,
+            "title": case.title,
+            "section": case.section,
+            "priority": case.priority,
+            "type": case.type,
+            "latest_status": case_results.get(case.case_id).status_name if case.case_id in case_results and case_results.get(case.case_id) else "Untested",
+            "latest_result_id": case_results.get(case.case_id).test_id if case.case_id in case_results and case_results.get(case.case_id) else None,
+            "custom_fields": case.custom_fields
+        }
+        for case in cases
+    ]
 
 
 @app.get("/testrail/status-breakdown")
-def testrail_status_breakdown(ticket_id: int = Query(...)):
+def testrail_status_breakdown(ticket_id: int = Query(...), db: Session = Depends(get_db)):
     """Get test status distribution for a ticket"""
-    db: Session = SessionLocal()
-    try:
-        results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
-        
-        status_counts = defaultdict(int)
-        for result in results:
-            status = result.status_name or "Untested"
-            status_counts[status] += 1
-        
-        total = len(results)
-        
-        return {
-            "ticket_id": ticket_id,
-            "total": total,
-            "status_distribution": dict(status_counts),
-            "percentages": {
-                status: round((count / total * 100), 1) if total > 0 else 0
-                for status, count in status_counts.items()
-            }
+    results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
+    
+    status_counts = defaultdict(int)
+    for result in results:
+        status = result.status_name or "Untested"
+        status_counts[status] += 1
+    
+    total = len(results)
+    
+    return {
+        "ticket_id": ticket_id,
+        "total": total,
+        "status_distribution": dict(status_counts),
+        "percentages": {
+            status: round((count / total * 100), 1) if total > 0 else 0
+            for status, count in status_counts.items()
         }
-    finally:
-        db.close()
+    }
 
 
 # ===== TICKET TRACKING ENDPOINTS =====
 
 @app.get("/tickets/search")
-def search_tickets(query: str = Query("", description="Search query for ticket ID or title")):
+def search_tickets(query: str = Query("", description="Search query for ticket ID or title"), db: Session = Depends(get_db)):
     """Search tickets for autocomplete - returns matching ticket IDs from PM tracker Excel import only"""
-    db: Session = SessionLocal()
-    try:
-        # Get tickets ONLY from TicketTracking (PM tracker Excel import)
-        tracking_tickets = db.query(TicketTracking).all()
-        
-        # Build a map of ticket_id -> first bug subject for titles
-        ticket_id_to_title = {}
-        if tracking_tickets:
-            ticket_ids = [t.ticket_id for t in tracking_tickets]
-            # Get ticket titles from Bug table for tickets that exist in tracking
-            bugs = db.query(Bug.ticket_id, Bug.subject).filter(
-                Bug.ticket_id.in_(ticket_ids)
-            ).distinct(Bug.ticket_id).all()
-            
-            for bug in bugs:
-                if bug.ticket_id and bug.subject:
-                    title_parts = bug.subject.split(" - ")
-                    ticket_id_to_title[bug.ticket_id] = title_parts[0] if title_parts else bug.subject
-        
-        # Build ticket list from TicketTracking only
-        tickets = []
-        for t in tracking_tickets:
-            ticket_data = {
-                "ticket_id": t.ticket_id,
-                "title": ticket_id_to_title.get(t.ticket_id, f"Ticket #{t.ticket_id}"),
-                "status": t.status,
-                "assignee": t.current_assignee
-            }
-            tickets.append(ticket_data)
+    # Get tickets ONLY from TicketTracking (PM tracker Excel import)
+    tracking_tickets = db.query(TicketTracking).all()
+    
+    # Build a map of ticket_id -> first bug subject for titles
+    ticket_id_to_title = {}
+    if tracking_tickets:
+        ticket_ids = [t.ticket_id for t in tracking_tickets]
+        # Get ticket titles from Bug table for tickets that exist in tracking
+        bugs = db.query(Bug.ticket_id, Bug.subject).filter(
+            Bug.ticket_id.in_(ticket_ids)
+        ).distinct(Bug.ticket_id).all()
         
-        # Filter by query if provided
-        if query:
-            query_str = query.strip()
-            
-            # First, find tickets where ticket_id STARTS WITH the query
-            starts_with = [
-                t for t in tickets
-                if str(t["ticket_id"]).startswith(query_str)
-            ]
-            
-            # If we have matches that start with the query, return only those
-            if starts_with:
-                # Sort by ticket_id descending (most recent first)
-                starts_with.sort(key=lambda x: x["ticket_id"], reverse=True)
-                return starts_with[:50]
-            
-            # Otherwise, fall back to tickets that CONTAIN the query anywhere
-            query_lower = query_str.lower()
-            contains = [
-                t for t in tickets
-                if query_str in str(t["ticket_id"]) or query_lower in (t["title"] or "").lower()
-            ]
-            
-            # Sort by ticket_id descending (most recent first)
-            contains.sort(key=lambda x: x["ticket_id"], reverse=True)
-            return contains[:50]
+        for bug in bugs:
+            if bug.ticket_id and bug.subject:
+                title_parts = bug.subject.split(" - ")
+                ticket_id_to_title[bug.ticket_id] = title_parts[0] if title_parts else bug.subject
+    
+    # Build ticket list from TicketTracking only
+    tickets = []
+    for t in tracking_tickets:
+        ticket_data = {
+            "ticket_id": t.ticket_id,
+            "title": ticket_id_to_title.get(t.ticket_id, f"Ticket #{t.ticket_id}"),
+            "status": t.status,
+            "assignee": t.current_assignee
+        }
+        tickets.append(ticket_data)
+    
+    # Filter by query if provided
+    if query:
+        query_str = query.strip()
+        
+        # First, find tickets where ticket_id STARTS WITH the query
+        starts_with = [
+            t for t in tickets
+            if str(t["ticket_id"]).startswith(query_str)
+        ]
         
-        # No query - return all tickets sorted by ticket_id descending
-        tickets.sort(key=lambda x: x["ticket_id"], reverse=True)
+        # If we have matches that start with the query, return only those
+        if starts_with:
+            # Sort by ticket_id descending (most recent first)
+            starts_with.sort(key=lambda x: x["ticket_id"], reverse=True)
+            return starts_with[:50]
+        
+        # Otherwise, fall back to tickets that CONTAIN the query anywhere
+        query_lower = query_str.lower()
+        contains = [
+            t for t in tickets
+            if query_str in str(t["ticket_id"]) or query_lower in (t["title"] or "").lower()
+        ]
         
-        # Limit results for performance
-        return tickets[:50]
-    finally:
-        db.close()
+        # Sort by ticket_id descending (most recent first)
+        contains.sort(key=lambda x: x["ticket_id"], reverse=True)
+        return contains[:50]
+    
+    # No query - return all tickets sorted by ticket_id descending
+    tickets.sort(key=lambda x: x["ticket_id"], reverse=True)
+    
+    # Limit results for performance
+    return tickets[:50]
 
 
 @app.get("/ticket-tracking/{ticket_id}")
-def get_ticket_tracking(ticket_id: int):
+def get_ticket_tracking(ticket_id: int, db: Session = Depends(get_db)):
     """Get tracking data for a specific ticket, including developers from Redmine"""
-    db: Session = SessionLocal()
-    try:
-        tracking = db.query(TicketTracking).filter(TicketTracking.ticket_id == ticket_id).first()
-        
-        # Get developers from Redmine bugs for this ticket
-        bugs = db.query(Bug).filter(Bug.ticket_id == ticket_id).all()
-        redmine_developers = set()
-        for bug in bugs:
-            if bug.assignee and bug.assignee.strip():
-                redmine_developers.add(bug.assignee.strip())
-        
-        if not tracking:
-            # Return just Redmine data if no tracking data
-            if redmine_developers:
-                return {
-                    "ticket_id": ticket_id,
-                    "status": None,
-                    "developers": list(redmine_developers),
-                    "qc_testers": [],
-                    "eta": None,
-                    "current_assignee": None,
-                    "dev_estimate_hours": None,
-                    "actual_dev_hours": None,
-                    "qa_estimate_hours": None,
-                    "actual_qa_hours": None,
-                    "dev_deviation": None,
-                    "qa_deviation": None,
-                    "qa_vs_dev_ratio": None,
-                    "updated_on": None
-                }
-            return None
-        
-        # Collect all developers (from tracking + Redmine)
-        developers = set()
-        if tracking.backend_developer:
-            developers.add(tracking.backend_developer.strip())
-        if tracking.frontend_developer:
-            developers.add(tracking.frontend_developer.strip())
-        if tracking.developer_assigned:
-            developers.add(tracking.developer_assigned.strip())
-        developers.update(redmine_developers)
-        # Remove empty strings
-        developers = [d for d in developers if d]
-        
-        # Collect QC testers
-        qc_testers = []
-        if tracking.qc_tester:
-            qc_testers = [t.strip() for t in tracking.qc_tester.split(',') if t.strip()]
-        
-        # Calculate deviations
-        dev_deviation = None
-        if tracking.dev_estimate_hours and tracking.actual_dev_hours:
-            dev_deviation = round(tracking.actual_dev_hours - tracking.dev_estimate_hours, 1)
-        
-        qa_deviation = None
-        if tracking.qa_estimate_hours and tracking.actual_qa_hours:
-            qa_deviation = round(tracking.actual_qa_hours - tracking.qa_estimate_hours, 1)
-        
-        # QA vs Dev ratio (how much QA time compared to actual dev time)
-        qa_vs_dev_ratio = None
-        if tracking.actual_dev_hours and tracking.actual_qa_hours and tracking.actual_dev_hours > 0:
-            qa_vs_dev_ratio = round((tracking.actual_qa_hours / tracking.actual_dev_hours) * 100, 1)
-        
-        return {
-            "ticket_id": tracking.ticket_id,
-            "status": tracking.status,
-            "developers": developers,
-            "qc_testers": qc_testers,
-            "eta": tracking.eta.isoformat() if tracking.eta else None,
-            "current_assignee": tracking.current_assignee,
-            "dev_estimate_hours": tracking.dev_estimate_hours,
-            "actual_dev_hours": tracking.actual_dev_hours,
-            "qa_estimate_hours": tracking.qa_estimate_hours,
-            "actual_qa_hours": tracking.actual_qa_hours,
-            "dev_deviation": dev_deviation,
-            "qa_deviation": qa_deviation,
-            "qa_vs_dev_ratio": qa_vs_dev_ratio,
-            "updated_on": tracking.updated_on.isoformat() if tracking.updated_on else None
-        }
-    finally:
-        db.close()
+    tracking = db.query(TicketTracking).filter(TicketTracking.ticket_id == ticket_id).first()
+    
+    # Get developers from Redmine bugs for this ticket
+    bugs = db.query(Bug).filter(Bug.ticket_id == ticket_id).all()
+    redmine_developers = set()
+    for bug in bugs:
+        if bug.assignee and bug.assignee.strip():
+            redmine_developers.add(bug.assignee.strip())
+    
+    if not tracking:
+        # Return just Redmine data if no tracking data
+        if redmine_developers:
+            return {
+                "ticket_id": ticket_id,
+                "status": None,
+                "developers": list(redmine_developers),
+                "qc_testers": [],
+                "eta": None,
+                "current_assignee": None,
+                "dev_estimate_hours": None,
+                "actual_dev_hours": None,
+                "qa_estimate_hours": None,
+                "actual_qa_hours": None,
+                "dev_deviation": None,
+                "qa_deviation": None,
+                "qa_vs_dev_ratio": None,
+                "updated_on": None
+            }
+        return None
+    
+    # Collect all developers (from tracking + Redmine)
+    developers = set()
+    if tracking.backend_developer:
+        developers.add(tracking.backend_developer.strip())
+    if tracking.frontend_developer:
+        developers.add(tracking.frontend_developer.strip())
+    if tracking.developer_assigned:
+        developers.add(tracking.developer_assigned.strip())
+    developers.update(redmine_developers)
+    # Remove empty strings
+    developers = [d for d in developers if d]
+    
+    # Collect QC testers
+    qc_testers = []
+    if tracking.qc_tester:
+        qc_testers = [t.strip() for t in tracking.qc_tester.split(',') if t.strip()]
+    
+    # Calculate deviations
+    dev_deviation = None
+    if tracking.dev_estimate_hours and tracking.actual_dev_hours:
+        dev_deviation = round(tracking.actual_dev_hours - tracking.dev_estimate_hours, 1)
+    
+    qa_deviation = None
+    if tracking.qa_estimate_hours and tracking.actual_qa_hours:
+        qa_deviation = round(tracking.actual_qa_hours - tracking.qa_estimate_hours, 1)
+    
+    # QA vs Dev ratio (how much QA time compared to actual dev time)
+    qa_vs_dev_ratio = None
+    if tracking.actual_dev_hours and tracking.actual_qa_hours and tracking.actual_dev_hours > 0:
+        qa_vs_dev_ratio = round((tracking.actual_qa_hours / tracking.actual_dev_hours) * 100, 1)
+    
+    return {
+        "ticket_id": tracking.ticket_id,
+        "status": tracking.status,
+        "developers": developers,
+        "qc_testers": qc_testers,
+        "eta": tracking.eta.isoformat() if tracking.eta else None,
+        "current_assignee": tracking.current_assignee,
+        "dev_estimate_hours": tracking.dev_estimate_hours,
+        "actual_dev_hours": tracking.actual_dev_hours,
+        "qa_estimate_hours": tracking.qa_estimate_hours,
+        "actual_qa_hours": tracking.actual_qa_hours,
+        "dev_deviation": dev_deviation,
+        "qa_deviation": qa_deviation,
+        "qa_vs_dev_ratio": qa_vs_dev_ratio,
+        "updated_on": tracking.updated_on.isoformat() if tracking.updated_on else None
+    }
 
 
 @app.get("/ticket-tracking/summary/all")
-def get_ticket_tracking_summary():
+def get_ticket_tracking_summary(db: Session = Depends(get_db)):
     """Get overview metrics for all tracked tickets"""
-    db: Session = SessionLocal()
-    try:
-        all_tracking = db.query(TicketTracking).all()
-        
-        if not all_tracking:
-            return {
-                "total_tickets": 0,
-                "avg_dev_estimate": 0,
-                "avg_dev_actual": 0,
-                "avg_qa_estimate": 0,
-                "avg_qa_actual": 0,
-                "dev_efficiency": 0,
-                "qa_efficiency": 0,
-                "status_breakdown": {}
-            }
-        
-        total = len(all_tracking)
-        
-        # Calculate averages
-        dev_estimates = [t.dev_estimate_hours for t in all_tracking if t.dev_estimate_hours]
-        dev_actuals = [t.actual_dev_hours for t in all_tracking if t.actual_dev_hours]
-        qa_estimates = [t.qa_estimate_hours for t in all_tracking if t.qa_estimate_hours]
-        qa_actuals = [t.actual_qa_hours for t in all_tracking if t.actual_qa_hours]
-        
-        avg_dev_estimate = sum(dev_estimates) / len(dev_estimates) if dev_estimates else 0
-        avg_dev_actual = sum(dev_actuals) / len(dev_actuals) if dev_actuals else 0
-        avg_qa_estimate = sum(qa_estimates) / len(qa_estimates) if qa_estimates else 0
-        avg_qa_actual = sum(qa_actuals) / len(qa_actuals) if qa_actuals else 0
-        
-        # Calculate efficiency (how well estimates match actual)
-        dev_efficiency = (avg_dev_estimate / avg_dev_actual * 100) if avg_dev_actual > 0 else 100
-        qa_efficiency = (avg_qa_estimate / avg_qa_actual * 100) if avg_qa_actual > 0 else 100
-        
-        # Status breakdown
-        status_counts = defaultdict(int)
-        for t in all_tracking:
-            status_counts[t.status or "Unknown"] += 1
-        
+    all_tracking = db.query(TicketTracking).all()
+    
+    if not all_tracking:
         return {
-            "total_tickets": total,
-            "avg_dev_estimate": round(avg_dev_estimate, 1),
-            "avg_dev_actual": round(avg_dev_actual, 1),
-            "avg_qa_estimate": round(avg_qa_estimate, 1),
-            "avg_qa_actual": round(avg_qa_actual, 1),
-            "dev_efficiency": round(dev_efficiency, 1),
-            "qa_efficiency": round(qa_efficiency, 1),
-            "status_breakdown": dict(status_counts)
+            "total_tickets": 0,
+            "avg_dev_estimate": 0,
+            "avg_dev_actual": 0,
+            "avg_qa_estimate": 0,
+            "avg_qa_actual": 0,
+            "dev_efficiency": 0,
+            "qa_efficiency": 0,
+            "status_breakdown": {}
         }
-    finally:
-        db.close()
+    
+    total = len(all_tracking)
+    
+    # Calculate averages
+    dev_estimates = [t.dev_estimate_hours for t in all_tracking if t.dev_estimate_hours]
+    dev_actuals = [t.actual_dev_hours for t in all_tracking if t.actual_dev_hours]
+    qa_estimates = [t.qa_estimate_hours for t in all_tracking if t.qa_estimate_hours]
+    qa_actuals = [t.actual_qa_hours for t in all_tracking if t.actual_qa_hours]
+    
+    avg_dev_estimate = sum(dev_estimates) / len(dev_estimates) if dev_estimates else 0
+    avg_dev_actual = sum(dev_actuals) / len(dev_actuals) if dev_actuals else 0
+    avg_qa_estimate = sum(qa_estimates) / len(qa_estimates) if qa_estimates else 0
+    avg_qa_actual = sum(qa_actuals) / len(qa_actuals) if qa_actuals else 0
+    
+    # Calculate efficiency (how well estimates match actual)
+    dev_efficiency = (avg_dev_estimate / avg_dev_actual * 100) if avg_dev_actual > 0 else 100
+    qa_efficiency = (avg_qa_estimate / avg_qa_actual * 100) if avg_qa_actual > 0 else 100
+    
+    # Status breakdown
+    status_counts = defaultdict(int)
+    for t in all_tracking:
+        status_counts[t.status or "Unknown"] += 1
+    
+    return {
+        "total_tickets": total,
+        "avg_dev_estimate": round(avg_dev_estimate, 1),
+        "avg_dev_actual": round(avg_dev_actual, 1),
+        "avg_qa_estimate": round(avg_qa_estimate, 1),
+        "avg_qa_actual": round(avg_qa_actual, 1),
+        "dev_efficiency": round(dev_efficiency, 1),
+        "qa_efficiency": round(qa_efficiency, 1),
+        "status_breakdown": dict(status_counts)
+    }
 
 
 @app.get("/ticket-tracking/team-metrics")
-def get_team_metrics():
+def get_team_metrics(db: Session = Depends(get_db)):
     """Get developer/QC productivity metrics"""
-    db: Session = SessionLocal()
-    try:
-        all_tracking = db.query(TicketTracking).all()
-        
-        if not all_tracking:
-            return {
-                "developers": {},
-                "qc_testers": {}
-            }
-        
-        # Developer metrics
-        dev_metrics = defaultdict(lambda: {"tickets": 0, "total_hours": 0, "total_estimate": 0})
-        qc_metrics = defaultdict(lambda: {"tickets": 0, "total_hours": 0, "total_estimate": 0})
-        
-        for t in all_tracking:
-            # Backend developer
-            if t.backend_developer:
-                dev_metrics[t.backend_developer]["tickets"] += 1
-                if t.actual_dev_hours:
-                    dev_metrics[t.backend_developer]["total_hours"] += t.actual_dev_hours
-                if t.dev_estimate_hours:
-                    dev_metrics[t.backend_developer]["total_estimate"] += t.dev_estimate_hours
-            
-            # Frontend developer
-            if t.frontend_developer:
-                dev_metrics[t.frontend_developer]["tickets"] += 1
-                if t.actual_dev_hours:
-                    dev_metrics[t.frontend_developer]["total_hours"] += t.actual_dev_hours
-                if t.dev_estimate_hours:
-                    dev_metrics[t.frontend_developer]["total_estimate"] += t.dev_estimate_hours
-            
-            # QC Tester
-            if t.qc_tester:
-                qc_metrics[t.qc_tester]["tickets"] += 1
-                if t.actual_qa_hours:
-                    qc_metrics[t.qc_tester]["total_hours"] += t.actual_qa_hours
-                if t.qa_estimate_hours:
-                    qc_metrics[t.qc_tester]["total_estimate"] += t.qa_estimate_hours
-        
-        # Calculate efficiency for each person
-        for dev, data in dev_metrics.items():
-            if data["total_hours"] > 0:
-                data["efficiency"] = round((data["total_estimate"] / data["total_hours"]) * 100, 1)
-            else:
-                data["efficiency"] = 100
-            data["total_hours"] = round(data["total_hours"], 1)
-            data["total_estimate"] = round(data["total_estimate"], 1)
-        
-        for qc, data in qc_metrics.items():
-            if data["total_hours"] > 0:
-                data["efficiency"] = round((data["total_estimate"] / data["total_hours"]) * 100, 1)
-            else:
-                data["efficiency"] = 100
-            data["total_hours"] = round(data["total_hours"], 1)
-            data["total_estimate"] = round(data["total_estimate"], 1)
-        
+    all_tracking = db.query(TicketTracking).all()
+    
+    if not all_tracking:
         return {
-            "developers": dict(dev_metrics),
-            "qc_testers": dict(qc_metrics)
+            "developers": {},
+            "qc_testers": {}
         }
-    finally:
-        db.close()
+    
+    # Developer metrics
+    dev_metrics = defaultdict(lambda: {"tickets": 0, "total_hours": 0, "total_estimate": 0})
+    qc_metrics = defaultdict(lambda: {"tickets": 0, "total_hours": 0, "total_estimate": 0})
+    
+    for t in all_tracking:
+        # Backend developer
+        if t.backend_developer:
+            dev_metrics[t.backend_developer]["tickets"] += 1
+            if t.actual_dev_hours:
+                dev_metrics[t.backend_developer]["total_hours"] += t.actual_dev_hours
+            if t.dev_estimate_hours:
+                dev_metrics[t.backend_developer]["total_estimate"] += t.dev_estimate_hours
+        
+        # Frontend developer
+        if t.frontend_developer:
+            dev_metrics[t.frontend_developer]["tickets"] += 1
+            if t.actual_dev_hours:
+                dev_metrics[t.frontend_developer]["total_hours"] += t.actual_dev_hours
+            if t.dev_estimate_hours:
+                dev_metrics[t.frontend_developer]["total_estimate"] += t.dev_estimate_hours
+        
+        # QC Tester
+        if t.qc_tester:
+            qc_metrics[t.qc_tester]["tickets"] += 1
+            if t.actual_qa_hours:
+                qc_metrics[t.qc_tester]["total_hours"] += t.actual_qa_hours
+            if t.qa_estimate_hours:
+                qc_metrics[t.qc_tester]["total_estimate"] += t.qa_estimate_hours
+    
+    # Calculate efficiency for each person
+    for dev, data in dev_metrics.items():
+        if data["total_hours"] > 0:
+            data["efficiency"] = round((data["total_estimate"] / data["total_hours"]) * 100, 1)
+        else:
+            data["efficiency"] = 100
+        data["total_hours"] = round(data["total_hours"], 1)
+        data["total_estimate"] = round(data["total_estimate"], 1)
+    
+    for qc, data in qc_metrics.items():
+        if data["total_hours"] > 0:
+            data["efficiency"] = round((data["total_estimate"] / data["total_hours"]) * 100, 1)
+        else:
+            data["efficiency"] = 100
+        data["total_hours"] = round(data["total_hours"], 1)
+        data["total_estimate"] = round(data["total_estimate"], 1)
+    
+    return {
+        "developers": dict(dev_metrics),
+        "qc_testers": dict(qc_metrics)
+    }
 
 
 @app.post("/ticket-tracking/refresh")
@@ -1748,7 +1711,7 @@ def sync_latest_ticket_report():
 
 
 @app.get("/ticket-tracking/sync-status")
-def get_ticket_sync_status():
+def get_ticket_sync_status(db: Session = Depends(get_db)):
     """Get status of last ticket sync and available files"""
     import os
     import re
@@ -1792,11 +1755,7 @@ def get_ticket_sync_status():
                     latest_import = f
     
     # Get last sync time from database
-    db = SessionLocal()
-    try:
-        last_updated = db.query(func.max(TicketTracking.updated_on)).scalar()
-    finally:
-        db.close()
+    last_updated = db.query(func.max(TicketTracking.updated_on)).scalar()
     
     return {
         "downloads_folder": downloads_folder,
@@ -1848,54 +1807,147 @@ STATUS_TEAM_MAPPING = {
 }
 
 @app.get("/tickets-dashboard/overview")
-def get_tickets_overview():
+def get_tickets_overview(db: Session = Depends(get_db)):
     """Get overall tickets dashboard data with team breakdown"""
-    db: Session = SessionLocal()
-    try:
-        all_tickets = db.query(TicketTracking).all()
-        
-        if not all_tickets:
-            return {
-                "total_tickets": 0,
-                "by_status": {},
-                "by_team": {},
-                "by_assignee": {},
-                "team_status_breakdown": {},
-                "eta_analysis": {
-                    "overdue": 0,
-                    "due_this_week": 0,
-                    "no_eta": 0,
-                    "on_track": 0
-                }
+    all_tickets = db.query(TicketTracking).all()
+    
+    if not all_tickets:
+        return {
+            "total_tickets": 0,
+            "by_status": {},
+            "by_team": {},
+            "by_assignee": {},
+            "team_status_breakdown": {},
+            "eta_analysis": {
+                "overdue": 0,
+                "due_this_week": 0,
+                "no_eta": 0,
+                "on_track": 0
             }
+        }
+    
+    today = datetime.now().date()
+    week_from_now = today + timedelta(days=7)
+    
+    # Initialize counters
+    by_status = defaultdict(int)
+    by_team = defaultdict(int)
+    by_assignee = defaultdict(list)
+    team_status_breakdown = defaultdict(lambda: defaultdict(int))
+    team_tickets = defaultdict(list)
+    
+    eta_overdue = 0
+    eta_due_this_week = 0
+    eta_no_eta = 0
+    eta_on_track = 0
+    
+    completed_count = 0
+    completed_tickets = []
+    
+    for ticket in all_tickets:
+        status = ticket.status or 'Unknown'
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
+        assignee = ticket.current_assignee or 'Unassigned'
+        
+        # Check if completed
+        is_closed = status.lower() in ['closed', 'moved to live', 'completed']
+        
+        # Calculate ageing (days since updated_on or created)
+        ticket_age = 0
+        if ticket.updated_on:
+            age_delta = today - (ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on)
+            ticket_age = age_delta.days
+        elif ticket.eta:
+            age_delta = today - (ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta)
+            ticket_age = age_delta.days
+        
+        ticket_data = {
+            "ticket_id": ticket.ticket_id,
+            "status": status,
+            "team": team,
+            "assignee": assignee,
+            "eta": ticket.eta.isoformat() if ticket.eta else None,
+            "age_days": ticket_age,
+            "dev_estimate": ticket.dev_estimate_hours,
+            "dev_actual": ticket.actual_dev_hours,
+            "qa_estimate": ticket.qa_estimate_hours,
+            "qa_actual": ticket.actual_qa_hours,
+            "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None
+        }
         
-        today = datetime.now().date()
-        week_from_now = today + timedelta(days=7)
+        if is_closed:
+            completed_count += 1
+            completed_tickets.append(ticket_data)
+            continue  # Skip completed tickets from active tracking
         
-        # Initialize counters
-        by_status = defaultdict(int)
-        by_team = defaultdict(int)
-        by_assignee = defaultdict(list)
-        team_status_breakdown = defaultdict(lambda: defaultdict(int))
-        team_tickets = defaultdict(list)
+        # Count by status (only active tickets)
+        by_status[status] += 1
         
-        eta_overdue = 0
-        eta_due_this_week = 0
-        eta_no_eta = 0
-        eta_on_track = 0
+        # Count by team (only active tickets)
+        by_team[team] += 1
         
-        completed_count = 0
-        completed_tickets = []
+        # Track team status breakdown (only active tickets)
+        team_status_breakdown[team][status] += 1
         
-        for ticket in all_tickets:
-            status = ticket.status or 'Unknown'
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
+        # Track tickets by assignee (only active tickets)
+        by_assignee[assignee].append(ticket_data)
+        
+        # Track tickets by team (only active tickets)
+        team_tickets[team].append(ticket_data)
+        
+        # ETA analysis (only active tickets)
+        if not ticket.eta:
+            eta_no_eta += 1
+        else:
+            eta_date = ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta
+            if eta_date < today:
+                eta_overdue += 1
+            elif eta_date <= week_from_now:
+                eta_due_this_week += 1
+            else:
+                eta_on_track += 1
+    
+    return {
+        "total_tickets": len(all_tickets),
+        "completed_count": completed_count,
+        "completed_tickets": completed_tickets,
+        "active_tickets": len(all_tickets) - completed_count,
+        "by_status": dict(by_status),
+        "by_team": dict(by_team),
+        "by_assignee": {k: {"count": len(v), "tickets": v} for k, v in by_assignee.items()},
+        "team_status_breakdown": {k: dict(v) for k, v in team_status_breakdown.items()},
+        "team_tickets": {k: v for k, v in team_tickets.items()},
+        "eta_analysis": {
+            "overdue": eta_overdue,
+            "due_this_week": eta_due_this_week,
+            "no_eta": eta_no_eta,
+            "on_track": eta_on_track
+        }
+    }
+
+
+@app.get("/tickets-dashboard/team/{team_name}")
+def get_team_tickets(team_name: str, db: Session = Depends(get_db)):
+    """Get detailed tickets for a specific team"""
+    all_tickets = db.query(TicketTracking).all()
+    
+    team_tickets = []
+    status_breakdown = defaultdict(int)
+    assignee_breakdown = defaultdict(list)
+    
+    for ticket in all_tickets:
+        status = ticket.status or 'Unknown'
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
+        
+        # Match team (case-insensitive, handle variations)
+        team_normalized = team.lower().replace(' ', '-').replace('/', '-')
+        team_name_normalized = team_name.lower().replace(' ', '-').replace('/', '-')
+        
+        if team_normalized == team_name_normalized:
             assignee = ticket.current_assignee or 'Unassigned'
             
-            # Check if completed
-            is_closed = status.lower() in ['closed', 'moved to live', 'completed']
-            
-            # Calculate ageing (days since updated_on or created)
+            # Calculate ageing
+            today = datetime.now().date()
             ticket_age = 0
             if ticket.updated_on:
                 age_delta = today - (ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on)
@@ -1907,7 +1959,6 @@ def get_tickets_overview():
             ticket_data = {
                 "ticket_id": ticket.ticket_id,
                 "status": status,
-                "team": team,
                 "assignee": assignee,
                 "eta": ticket.eta.isoformat() if ticket.eta else None,
                 "age_days": ticket_age,
@@ -1915,643 +1966,525 @@ def get_tickets_overview():
                 "dev_actual": ticket.actual_dev_hours,
                 "qa_estimate": ticket.qa_estimate_hours,
                 "qa_actual": ticket.actual_qa_hours,
+                "backend_developer": ticket.backend_developer,
+                "frontend_developer": ticket.frontend_developer,
+                "qc_tester": ticket.qc_tester,
                 "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None
             }
             
-            if is_closed:
-                completed_count += 1
-                completed_tickets.append(ticket_data)
-                continue  # Skip completed tickets from active tracking
-            
-            # Count by status (only active tickets)
-            by_status[status] += 1
-            
-            # Count by team (only active tickets)
-            by_team[team] += 1
-            
-            # Track team status breakdown (only active tickets)
-            team_status_breakdown[team][status] += 1
-            
-            # Track tickets by assignee (only active tickets)
-            by_assignee[assignee].append(ticket_data)
-            
-            # Track tickets by team (only active tickets)
-            team_tickets[team].append(ticket_data)
-            
-            # ETA analysis (only active tickets)
-            if not ticket.eta:
-                eta_no_eta += 1
-            else:
-                eta_date = ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta
-                if eta_date < today:
-                    eta_overdue += 1
-                elif eta_date <= week_from_now:
-                    eta_due_this_week += 1
-                else:
-                    eta_on_track += 1
-        
-        return {
-            "total_tickets": len(all_tickets),
-            "completed_count": completed_count,
-            "completed_tickets": completed_tickets,
-            "active_tickets": len(all_tickets) - completed_count,
-            "by_status": dict(by_status),
-            "by_team": dict(by_team),
-            "by_assignee": {k: {"count": len(v), "tickets": v} for k, v in by_assignee.items()},
-            "team_status_breakdown": {k: dict(v) for k, v in team_status_breakdown.items()},
-            "team_tickets": {k: v for k, v in team_tickets.items()},
-            "eta_analysis": {
-                "overdue": eta_overdue,
-                "due_this_week": eta_due_this_week,
-                "no_eta": eta_no_eta,
-                "on_track": eta_on_track
-            }
-        }
-    finally:
-        db.close()
-
-
-@app.get("/tickets-dashboard/team/{team_name}")
-def get_team_tickets(team_name: str):
-    """Get detailed tickets for a specific team"""
-    db: Session = SessionLocal()
-    try:
-        all_tickets = db.query(TicketTracking).all()
-        
-        team_tickets = []
-        status_breakdown = defaultdict(int)
-        assignee_breakdown = defaultdict(list)
-        
-        for ticket in all_tickets:
-            status = ticket.status or 'Unknown'
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-            
-            # Match team (case-insensitive, handle variations)
-            team_normalized = team.lower().replace(' ', '-').replace('/', '-')
-            team_name_normalized = team_name.lower().replace(' ', '-').replace('/', '-')
-            
-            if team_normalized == team_name_normalized:
-                assignee = ticket.current_assignee or 'Unassigned'
-                
-                # Calculate ageing
-                today = datetime.now().date()
-                ticket_age = 0
-                if ticket.updated_on:
-                    age_delta = today - (ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on)
-                    ticket_age = age_delta.days
-                elif ticket.eta:
-                    age_delta = today - (ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta)
-                    ticket_age = age_delta.days
-                
-                ticket_data = {
-                    "ticket_id": ticket.ticket_id,
-                    "status": status,
-                    "assignee": assignee,
-                    "eta": ticket.eta.isoformat() if ticket.eta else None,
-                    "age_days": ticket_age,
-                    "dev_estimate": ticket.dev_estimate_hours,
-                    "dev_actual": ticket.actual_dev_hours,
-                    "qa_estimate": ticket.qa_estimate_hours,
-                    "qa_actual": ticket.actual_qa_hours,
-                    "backend_developer": ticket.backend_developer,
-                    "frontend_developer": ticket.frontend_developer,
-                    "qc_tester": ticket.qc_tester,
-                    "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None
-                }
-                
-                team_tickets.append(ticket_data)
-                status_breakdown[status] += 1
-                assignee_breakdown[assignee].append(ticket_data)
-        
-        return {
-            "team": team_name,
-            "total_tickets": len(team_tickets),
-            "tickets": team_tickets,
-            "status_breakdown": dict(status_breakdown),
-            "assignee_breakdown": {k: {"count": len(v), "tickets": v} for k, v in assignee_breakdown.items()}
-        }
-    finally:
-        db.close()
+            team_tickets.append(ticket_data)
+            status_breakdown[status] += 1
+            assignee_breakdown[assignee].append(ticket_data)
+    
+    return {
+        "team": team_name,
+        "total_tickets": len(team_tickets),
+        "tickets": team_tickets,
+        "status_breakdown": dict(status_breakdown),
+        "assignee_breakdown": {k: {"count": len(v), "tickets": v} for k, v in assignee_breakdown.items()}
+    }
 
 
 @app.get("/tickets-dashboard/assignee/{assignee_name}")
-def get_assignee_tickets(assignee_name: str):
+def get_assignee_tickets(assignee_name: str, db: Session = Depends(get_db)):
     """Get tickets assigned to a specific person"""
-    db: Session = SessionLocal()
-    try:
-        # Handle 'Unassigned' case
-        if assignee_name.lower() == 'unassigned':
-            tickets = db.query(TicketTracking).filter(
-                (TicketTracking.current_assignee == None) | (TicketTracking.current_assignee == '')
-            ).all()
-        else:
-            tickets = db.query(TicketTracking).filter(
-                TicketTracking.current_assignee.ilike(f"%{assignee_name}%")
-            ).all()
-        
-        result = []
-        status_breakdown = defaultdict(int)
-        team_breakdown = defaultdict(int)
-        
-        today = datetime.now().date()
-        
-        for ticket in tickets:
-            status = ticket.status or 'Unknown'
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-            
-            # Calculate ageing
-            ticket_age = 0
-            if ticket.updated_on:
-                age_delta = today - (ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on)
-                ticket_age = age_delta.days
-            elif ticket.eta:
-                age_delta = today - (ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta)
-                ticket_age = age_delta.days
-            
-            result.append({
-                "ticket_id": ticket.ticket_id,
-                "status": status,
-                "team": team,
-                "eta": ticket.eta.isoformat() if ticket.eta else None,
-                "age_days": ticket_age,
-                "dev_estimate": ticket.dev_estimate_hours,
-                "dev_actual": ticket.actual_dev_hours,
-                "qa_estimate": ticket.qa_estimate_hours,
-                "qa_actual": ticket.actual_qa_hours,
-                "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None
-            })
-            
-            status_breakdown[status] += 1
-            team_breakdown[team] += 1
+    # Handle 'Unassigned' case
+    if assignee_name.lower() == 'unassigned':
+        tickets = db.query(TicketTracking).filter(
+            (TicketTracking.current_assignee == None) | (TicketTracking.current_assignee == '')
+        ).all()
+    else:
+        tickets = db.query(TicketTracking).filter(
+            TicketTracking.current_assignee.ilike(f"%{assignee_name}%")
+        ).all()
+    
+    result = []
+    status_breakdown = defaultdict(int)
+    team_breakdown = defaultdict(int)
+    
+    today = datetime.now().date()
+    
+    for ticket in tickets:
+        status = ticket.status or 'Unknown'
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
+        
+        # Calculate ageing
+        ticket_age = 0
+        if ticket.updated_on:
+            age_delta = today - (ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on)
+            ticket_age = age_delta.days
+        elif ticket.eta:
+            age_delta = today - (ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta)
+            ticket_age = age_delta.days
+        
+        result.append({
+            "ticket_id": ticket.ticket_id,
+            "status": status,
+            "team": team,
+            "eta": ticket.eta.isoformat() if ticket.eta else None,
+            "age_days": ticket_age,
+            "dev_estimate": ticket.dev_estimate_hours,
+            "dev_actual": ticket.actual_dev_hours,
+            "qa_estimate": ticket.qa_estimate_hours,
+            "qa_actual": ticket.actual_qa_hours,
+            "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None
+        })
         
-        return {
-            "assignee": assignee_name,
-            "total_tickets": len(result),
-            "tickets": result,
-            "status_breakdown": dict(status_breakdown),
-            "team_breakdown": dict(team_breakdown)
-        }
-    finally:
-        db.close()
+        status_breakdown[status] += 1
+        team_breakdown[team] += 1
+    
+    return {
+        "assignee": assignee_name,
+        "total_tickets": len(result),
+        "tickets": result,
+        "status_breakdown": dict(status_breakdown),
+        "team_breakdown": dict(team_breakdown)
+    }
 
 
 @app.get("/tickets-dashboard/status/{status_name}")
-def get_status_tickets(status_name: str):
+def get_status_tickets(status_name: str, db: Session = Depends(get_db)):
     """Get all tickets with a specific status"""
-    db: Session = SessionLocal()
-    try:
-        tickets = db.query(TicketTracking).filter(
-            TicketTracking.status.ilike(f"%{status_name}%")
-        ).all()
-        
-        result = []
-        assignee_breakdown = defaultdict(int)
+    tickets = db.query(TicketTracking).filter(
+        TicketTracking.status.ilike(f"%{status_name}%")
+    ).all()
+    
+    result = []
+    assignee_breakdown = defaultdict(int)
+    
+    for ticket in tickets:
+        status = ticket.status or 'Unknown'
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
+        assignee = ticket.current_assignee or 'Unassigned'
         
-        for ticket in tickets:
-            status = ticket.status or 'Unknown'
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-            assignee = ticket.current_assignee or 'Unassigned'
-            
-            result.append({
-                "ticket_id": ticket.ticket_id,
-                "status": status,
-                "team": team,
-                "assignee": assignee,
-                "eta": ticket.eta.isoformat() if ticket.eta else None,
-                "dev_estimate": ticket.dev_estimate_hours,
-                "dev_actual": ticket.actual_dev_hours
-            })
-            
-            assignee_breakdown[assignee] += 1
+        result.append({
+            "ticket_id": ticket.ticket_id,
+            "status": status,
+            "team": team,
+            "assignee": assignee,
+            "eta": ticket.eta.isoformat() if ticket.eta else None,
+            "dev_estimate": ticket.dev_estimate_hours,
+            "dev_actual": ticket.actual_dev_hours
+        })
         
-        return {
-            "status": status_name,
-            "team": STATUS_TEAM_MAPPING.get(status_name, 'Unknown'),
-            "total_tickets": len(result),
-            "tickets": result,
-            "assignee_breakdown": dict(assignee_breakdown)
-        }
-    finally:
-        db.close()
+        assignee_breakdown[assignee] += 1
+    
+    return {
+        "status": status_name,
+        "team": STATUS_TEAM_MAPPING.get(status_name, 'Unknown'),
+        "total_tickets": len(result),
+        "tickets": result,
+        "assignee_breakdown": dict(assignee_breakdown)
+    }
 
 
 @app.get("/tickets-dashboard/eta-alerts")
-def get_eta_alerts():
+def get_eta_alerts(db: Session = Depends(get_db)):
     """Get tickets with ETA concerns (overdue, due soon, no ETA)"""
-    db: Session = SessionLocal()
-    try:
-        all_tickets = db.query(TicketTracking).all()
+    all_tickets = db.query(TicketTracking).all()
+    
+    today = datetime.now().date()
+    week_from_now = today + timedelta(days=7)
+    
+    overdue = []
+    due_this_week = []
+    no_eta = []
+    
+    for ticket in all_tickets:
+        status = ticket.status or 'Unknown'
+        is_closed = status.lower() in ['closed', 'moved to live', 'completed']
         
-        today = datetime.now().date()
-        week_from_now = today + timedelta(days=7)
+        if is_closed:
+            continue
         
-        overdue = []
-        due_this_week = []
-        no_eta = []
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
         
-        for ticket in all_tickets:
-            status = ticket.status or 'Unknown'
-            is_closed = status.lower() in ['closed', 'moved to live', 'completed']
-            
-            if is_closed:
-                continue
-            
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-            
-            ticket_data = {
-                "ticket_id": ticket.ticket_id,
-                "status": status,
-                "team": team,
-                "assignee": ticket.current_assignee or 'Unassigned',
-                "eta": ticket.eta.isoformat() if ticket.eta else None
-            }
-            
-            if not ticket.eta:
-                no_eta.append(ticket_data)
-            else:
-                eta_date = ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta
-                if eta_date < today:
-                    days_overdue = (today - eta_date).days
-                    ticket_data["days_overdue"] = days_overdue
-                    overdue.append(ticket_data)
-                elif eta_date <= week_from_now:
-                    days_until = (eta_date - today).days
-                    ticket_data["days_until_eta"] = days_until
-                    due_this_week.append(ticket_data)
-        
-        # Sort by urgency
-        overdue.sort(key=lambda x: x.get("days_overdue", 0), reverse=True)
-        due_this_week.sort(key=lambda x: x.get("days_until_eta", 7))
+        ticket_data = {
+            "ticket_id": ticket.ticket_id,
+            "status": status,
+            "team": team,
+            "assignee": ticket.current_assignee or 'Unassigned',
+            "eta": ticket.eta.isoformat() if ticket.eta else None
+        }
         
-        return {
-            "overdue": overdue,
-            "due_this_week": due_this_week,
-            "no_eta": no_eta,
-            "summary": {
-                "overdue_count": len(overdue),
-                "due_this_week_count": len(due_this_week),
-                "no_eta_count": len(no_eta)
-            }
+        if not ticket.eta:
+            no_eta.append(ticket_data)
+        else:
+            eta_date = ticket.eta.date() if hasattr(ticket.eta, 'date') else ticket.eta
+            if eta_date < today:
+                days_overdue = (today - eta_date).days
+                ticket_data["days_overdue"] = days_overdue
+                overdue.append(ticket_data)
+            elif eta_date <= week_from_now:
+                days_until = (eta_date - today).days
+                ticket_data["days_until_eta"] = days_until
+                due_this_week.append(ticket_data)
+    
+    # Sort by urgency
+    overdue.sort(key=lambda x: x.get("days_overdue", 0), reverse=True)
+    due_this_week.sort(key=lambda x: x.get("days_until_eta", 7))
+    
+    return {
+        "overdue": overdue,
+        "due_this_week": due_this_week,
+        "no_eta": no_eta,
+        "summary": {
+            "overdue_count": len(overdue),
+            "due_this_week_count": len(due_this_week),
+            "no_eta_count": len(no_eta)
         }
-    finally:
-        db.close()
+    }
 
 
 @app.get("/tickets-dashboard/time-analysis")
 def get_time_analysis(
     period: str = Query("last_week", description="Time period: last_week, last_2_weeks, last_month, custom"),
     start_date: Optional[str] = Query(None, description="Start date for custom period (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date for custom period (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date for custom period (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
 ):
     """Get time-based analysis of ticket activity by team"""
-    db: Session = SessionLocal()
-    try:
-        today = datetime.now().date()
-        
-        # Determine date range
-        if period == "last_week":
-            range_start = today - timedelta(days=7)
-            range_end = today
-        elif period == "last_2_weeks":
-            range_start = today - timedelta(days=14)
-            range_end = today
-        elif period == "last_month":
-            range_start = today - timedelta(days=30)
-            range_end = today
-        elif period == "custom" and start_date and end_date:
-            range_start = datetime.strptime(start_date, "%Y-%m-%d").date()
-            range_end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        else:
-            range_start = today - timedelta(days=7)
-            range_end = today
+    today = datetime.now().date()
+    
+    # Determine date range
+    if period == "last_week":
+        range_start = today - timedelta(days=7)
+        range_end = today
+    elif period == "last_2_weeks":
+        range_start = today - timedelta(days=14)
+        range_end = today
+    elif period == "last_month":
+        range_start = today - timedelta(days=30)
+        range_end = today
+    elif period == "custom" and start_date and end_date:
+        range_start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        range_end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    else:
+        range_start = today - timedelta(days=7)
+        range_end = today
+    
+    all_tickets = db.query(TicketTracking).all()
+    
+    print(f"Time Analysis: period={period}, range={range_start} to {range_end}, total_tickets={len(all_tickets)}")
+    
+    # Filter tickets by update date within period
+    period_tickets = []
+    for ticket in all_tickets:
+        if ticket.updated_on:
+            update_date = ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on
+            if range_start <= update_date <= range_end:
+                period_tickets.append(ticket)
+    
+    print(f"Period tickets found: {len(period_tickets)}")
+    
+    # Team-centric analysis structure
+    teams_data = {
+        'BIS': {
+            'name': 'BIS',
+            'description': 'Business Intelligence & Strategy',
+            'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
+            'total_tickets': 0,
+            'status_breakdown': defaultdict(int),
+            'transitions': defaultdict(int)  # e.g., how many moved to Dev
+        },
+        'DEV': {
+            'name': 'DEV',
+            'description': 'Development Team',
+            'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
+            'total_tickets': 0,
+            'status_breakdown': defaultdict(int),
+            'transitions': defaultdict(int)
+        },
+        'QA': {
+            'name': 'QA',
+            'description': 'Quality Assurance',
+            'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
+            'total_tickets': 0,
+            'status_breakdown': defaultdict(int),
+            'transitions': defaultdict(int),
+            'moved_to_bis_testing': 0,  # Special metric for QA
+            'moved_to_dev': 0  # Tickets sent back to dev
+        },
+        'BIS - QA': {
+            'name': 'BIS - QA',
+            'description': 'BIS Quality Testing',
+            'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
+            'total_tickets': 0,
+            'status_breakdown': defaultdict(int),
+            'transitions': defaultdict(int)
+        }
+    }
+    
+    # Track closed tickets separately
+    closed_tickets_count = 0
+    active_tickets_count = 0
+    
+    # Track achievements for each team
+    achievements = {
+        'DEV': {
+            'moved_to_qc_testing': 0,
+            'label': 'Moved to QC Testing'
+        },
+        'QA': {
+            'moved_to_bis_testing': 0,
+            'moved_to_closed': 0,
+            'label_bis': 'Moved to BIS Testing',
+            'label_closed': 'Moved to Closed'
+        },
+        'BIS - QA': {
+            'approved_for_live': 0,
+            'label': 'Approved for Live'
+        }
+    }
+    
+    # Process tickets
+    for ticket in period_tickets:
+        status = ticket.status or 'Unknown'
+        team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
         
-        all_tickets = db.query(TicketTracking).all()
+        # Check if ticket is closed/completed
+        is_closed = status.lower() in ['closed', 'moved to live', 'completed'] or team == 'Completed'
         
-        print(f"Time Analysis: period={period}, range={range_start} to {range_end}, total_tickets={len(all_tickets)}")
+        # Track achievements based on current status (these are milestones reached)
+        # DEV achievement: tickets that moved to QC Testing
+        if status in ['QC Testing', 'QC Testing in Progress', 'QC Testing Hold']:
+            achievements['DEV']['moved_to_qc_testing'] += 1
         
-        # Filter tickets by update date within period
-        period_tickets = []
-        for ticket in all_tickets:
-            if ticket.updated_on:
-                update_date = ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on
-                if range_start <= update_date <= range_end:
-                    period_tickets.append(ticket)
+        # QA achievement: tickets moved to BIS Testing
+        if status == 'BIS Testing':
+            achievements['QA']['moved_to_bis_testing'] += 1
         
-        print(f"Period tickets found: {len(period_tickets)}")
+        # QA achievement: tickets moved to Closed
+        if status.lower() in ['closed', 'moved to live']:
+            achievements['QA']['moved_to_closed'] += 1
         
-        # Team-centric analysis structure
-        teams_data = {
-            'BIS': {
-                'name': 'BIS',
-                'description': 'Business Intelligence & Strategy',
-                'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
-                'total_tickets': 0,
-                'status_breakdown': defaultdict(int),
-                'transitions': defaultdict(int)  # e.g., how many moved to Dev
-            },
-            'DEV': {
-                'name': 'DEV',
-                'description': 'Development Team',
-                'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
-                'total_tickets': 0,
-                'status_breakdown': defaultdict(int),
-                'transitions': defaultdict(int)
-            },
-            'QA': {
-                'name': 'QA',
-                'description': 'Quality Assurance',
-                'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
-                'total_tickets': 0,
-                'status_breakdown': defaultdict(int),
-                'transitions': defaultdict(int),
-                'moved_to_bis_testing': 0,  # Special metric for QA
-                'moved_to_dev': 0  # Tickets sent back to dev
-            },
-            'BIS - QA': {
-                'name': 'BIS - QA',
-                'description': 'BIS Quality Testing',
+        # BIS-QA achievement: tickets approved for live
+        if status in ['Approved for Live', 'Moved to Live']:
+            achievements['BIS - QA']['approved_for_live'] += 1
+        
+        if is_closed:
+            closed_tickets_count += 1
+            continue  # Skip closed tickets from team analysis
+        
+        active_tickets_count += 1
+        
+        if team not in teams_data:
+            teams_data[team] = {
+                'name': team,
+                'description': team,
                 'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
                 'total_tickets': 0,
                 'status_breakdown': defaultdict(int),
                 'transitions': defaultdict(int)
             }
-        }
         
-        # Track closed tickets separately
-        closed_tickets_count = 0
-        active_tickets_count = 0
-        
-        # Track achievements for each team
-        achievements = {
-            'DEV': {
-                'moved_to_qc_testing': 0,
-                'label': 'Moved to QC Testing'
-            },
-            'QA': {
-                'moved_to_bis_testing': 0,
-                'moved_to_closed': 0,
-                'label_bis': 'Moved to BIS Testing',
-                'label_closed': 'Moved to Closed'
-            },
-            'BIS - QA': {
-                'approved_for_live': 0,
-                'label': 'Approved for Live'
-            }
+        ticket_data = {
+            "ticket_id": ticket.ticket_id,
+            "status": status,
+            "team": team,
+            "assignee": ticket.current_assignee or 'Unassigned',
+            "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None,
+            "eta": ticket.eta.isoformat() if ticket.eta else None,
+            "dev_estimate": ticket.dev_estimate_hours,
+            "dev_actual": ticket.actual_dev_hours,
+            "qa_estimate": ticket.qa_estimate_hours,
+            "qa_actual": ticket.actual_qa_hours,
+            "qc_tester": ticket.qc_tester,
+            "backend_developer": ticket.backend_developer,
+            "frontend_developer": ticket.frontend_developer
         }
         
-        # Process tickets
-        for ticket in period_tickets:
-            status = ticket.status or 'Unknown'
-            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-            
-            # Check if ticket is closed/completed
-            is_closed = status.lower() in ['closed', 'moved to live', 'completed'] or team == 'Completed'
-            
-            # Track achievements based on current status (these are milestones reached)
-            # DEV achievement: tickets that moved to QC Testing
-            if status in ['QC Testing', 'QC Testing in Progress', 'QC Testing Hold']:
-                achievements['DEV']['moved_to_qc_testing'] += 1
-            
-            # QA achievement: tickets moved to BIS Testing
+        teams_data[team]['total_tickets'] += 1
+        teams_data[team]['status_breakdown'][status] += 1
+        
+        # Get the right member based on team
+        if team == 'QA':
+            member = ticket.qc_tester or ticket.current_assignee or 'Unassigned'
+            # Track QA-specific metrics
             if status == 'BIS Testing':
-                achievements['QA']['moved_to_bis_testing'] += 1
-            
-            # QA achievement: tickets moved to Closed
-            if status.lower() in ['closed', 'moved to live']:
-                achievements['QA']['moved_to_closed'] += 1
-            
-            # BIS-QA achievement: tickets approved for live
-            if status in ['Approved for Live', 'Moved to Live']:
-                achievements['BIS - QA']['approved_for_live'] += 1
-            
-            if is_closed:
-                closed_tickets_count += 1
-                continue  # Skip closed tickets from team analysis
-            
-            active_tickets_count += 1
-            
-            if team not in teams_data:
-                teams_data[team] = {
-                    'name': team,
-                    'description': team,
-                    'members': defaultdict(lambda: {'tickets': [], 'statuses': defaultdict(int)}),
-                    'total_tickets': 0,
-                    'status_breakdown': defaultdict(int),
-                    'transitions': defaultdict(int)
-                }
-            
-            ticket_data = {
-                "ticket_id": ticket.ticket_id,
-                "status": status,
-                "team": team,
-                "assignee": ticket.current_assignee or 'Unassigned',
-                "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None,
-                "eta": ticket.eta.isoformat() if ticket.eta else None,
-                "dev_estimate": ticket.dev_estimate_hours,
-                "dev_actual": ticket.actual_dev_hours,
-                "qa_estimate": ticket.qa_estimate_hours,
-                "qa_actual": ticket.actual_qa_hours,
-                "qc_tester": ticket.qc_tester,
-                "backend_developer": ticket.backend_developer,
-                "frontend_developer": ticket.frontend_developer
+                teams_data['QA']['moved_to_bis_testing'] += 1
+            elif status in ['Code Review Failed', 'QC Review Fail', 'Tested - Awaiting Fixes']:
+                teams_data['QA']['moved_to_dev'] += 1
+        elif team == 'DEV':
+            member = ticket.backend_developer or ticket.frontend_developer or ticket.current_assignee or 'Unassigned'
+        else:
+            member = ticket.current_assignee or 'Unassigned'
+        
+        teams_data[team]['members'][member]['tickets'].append(ticket_data)
+        teams_data[team]['members'][member]['statuses'][status] += 1
+    
+    # Convert to serializable format
+    result_teams = {}
+    for team_key, team_data in teams_data.items():
+        if team_data['total_tickets'] > 0:  # Only include teams with activity
+            members_list = []
+            for member_name, member_data in team_data['members'].items():
+                members_list.append({
+                    'name': member_name,
+                    'ticket_count': len(member_data['tickets']),
+                    'tickets': member_data['tickets'],
+                    'status_breakdown': dict(member_data['statuses'])
+                })
+            # Sort members by ticket count
+            members_list.sort(key=lambda x: x['ticket_count'], reverse=True)
+            
+            result_teams[team_key] = {
+                'name': team_data['name'],
+                'description': team_data['description'],
+                'total_tickets': team_data['total_tickets'],
+                'status_breakdown': dict(team_data['status_breakdown']),
+                'members': members_list
             }
             
-            teams_data[team]['total_tickets'] += 1
-            teams_data[team]['status_breakdown'][status] += 1
-            
-            # Get the right member based on team
-            if team == 'QA':
-                member = ticket.qc_tester or ticket.current_assignee or 'Unassigned'
-                # Track QA-specific metrics
-                if status == 'BIS Testing':
-                    teams_data['QA']['moved_to_bis_testing'] += 1
-                elif status in ['Code Review Failed', 'QC Review Fail', 'Tested - Awaiting Fixes']:
-                    teams_data['QA']['moved_to_dev'] += 1
-            elif team == 'DEV':
-                member = ticket.backend_developer or ticket.frontend_developer or ticket.current_assignee or 'Unassigned'
-            else:
-                member = ticket.current_assignee or 'Unassigned'
-            
-            teams_data[team]['members'][member]['tickets'].append(ticket_data)
-            teams_data[team]['members'][member]['statuses'][status] += 1
-        
-        # Convert to serializable format
-        result_teams = {}
-        for team_key, team_data in teams_data.items():
-            if team_data['total_tickets'] > 0:  # Only include teams with activity
-                members_list = []
-                for member_name, member_data in team_data['members'].items():
-                    members_list.append({
-                        'name': member_name,
-                        'ticket_count': len(member_data['tickets']),
-                        'tickets': member_data['tickets'],
-                        'status_breakdown': dict(member_data['statuses'])
-                    })
-                # Sort members by ticket count
-                members_list.sort(key=lambda x: x['ticket_count'], reverse=True)
-                
-                result_teams[team_key] = {
-                    'name': team_data['name'],
-                    'description': team_data['description'],
-                    'total_tickets': team_data['total_tickets'],
-                    'status_breakdown': dict(team_data['status_breakdown']),
-                    'members': members_list
-                }
-                
-                # Add QA-specific metrics
-                if team_key == 'QA':
-                    result_teams[team_key]['moved_to_bis_testing'] = team_data.get('moved_to_bis_testing', 0)
-                    result_teams[team_key]['moved_to_dev'] = team_data.get('moved_to_dev', 0)
-        
-        return {
-            "period": {
-                "type": period,
-                "start_date": range_start.isoformat(),
-                "end_date": range_end.isoformat(),
-                "days": (range_end - range_start).days
-            },
-            "summary": {
-                "total_tickets_worked": len(period_tickets),
-                "active_tickets": active_tickets_count,
-                "closed_tickets": closed_tickets_count,
-                "teams_active": len(result_teams)
+            # Add QA-specific metrics
+            if team_key == 'QA':
+                result_teams[team_key]['moved_to_bis_testing'] = team_data.get('moved_to_bis_testing', 0)
+                result_teams[team_key]['moved_to_dev'] = team_data.get('moved_to_dev', 0)
+    
+    return {
+        "period": {
+            "type": period,
+            "start_date": range_start.isoformat(),
+            "end_date": range_end.isoformat(),
+            "days": (range_end - range_start).days
+        },
+        "summary": {
+            "total_tickets_worked": len(period_tickets),
+            "active_tickets": active_tickets_count,
+            "closed_tickets": closed_tickets_count,
+            "teams_active": len(result_teams)
+        },
+        "achievements": {
+            "DEV": {
+                "count": achievements['DEV']['moved_to_qc_testing'],
+                "label": "Moved to QC Testing",
+                "icon": "🧪"
             },
-            "achievements": {
-                "DEV": {
-                    "count": achievements['DEV']['moved_to_qc_testing'],
-                    "label": "Moved to QC Testing",
-                    "icon": "🧪"
+            "QA": {
+                "bis_testing": {
+                    "count": achievements['QA']['moved_to_bis_testing'],
+                    "label": "Moved to BIS Testing",
+                    "icon": "🔍"
                 },
-                "QA": {
-                    "bis_testing": {
-                        "count": achievements['QA']['moved_to_bis_testing'],
-                        "label": "Moved to BIS Testing",
-                        "icon": "🔍"
-                    },
-                    "closed": {
-                        "count": achievements['QA']['moved_to_closed'],
-                        "label": "Moved to Closed",
-                        "icon": "✅"
-                    }
-                },
-                "BIS_QA": {
-                    "count": achievements['BIS - QA']['approved_for_live'],
-                    "label": "Approved for Live",
-                    "icon": "🚀"
-                }
-            },
-            # Debug info
-            "_debug": {
-                "period": period,
-                "range_start": range_start.isoformat(),
-                "range_end": range_end.isoformat(),
-                "period_tickets_count": len(period_tickets),
-                "achievements_raw": {
-                    "dev_to_qc": achievements['DEV']['moved_to_qc_testing'],
-                    "qa_to_bis": achievements['QA']['moved_to_bis_testing'],
-                    "qa_to_closed": achievements['QA']['moved_to_closed'],
-                    "bis_qa_approved": achievements['BIS - QA']['approved_for_live']
+                "closed": {
+                    "count": achievements['QA']['moved_to_closed'],
+                    "label": "Moved to Closed",
+                    "icon": "✅"
                 }
             },
-            "teams": result_teams
-        }
-    finally:
-        db.close()
+            "BIS_QA": {
+                "count": achievements['BIS - QA']['approved_for_live'],
+                "label": "Approved for Live",
+                "icon": "🚀"
+            }
+        },
+        # Debug info
+        "_debug": {
+            "period": period,
+            "range_start": range_start.isoformat(),
+            "range_end": range_end.isoformat(),
+            "period_tickets_count": len(period_tickets),
+            "achievements_raw": {
+                "dev_to_qc": achievements['DEV']['moved_to_qc_testing'],
+                "qa_to_bis": achievements['QA']['moved_to_bis_testing'],
+                "qa_to_closed": achievements['QA']['moved_to_closed'],
+                "bis_qa_approved": achievements['BIS - QA']['approved_for_live']
+            }
+        },
+        "teams": result_teams
+    }
 
 
 @app.get("/tickets-dashboard/user-performance")
 def get_user_performance(
     user: str = Query(..., description="User name to get performance for"),
-    period: str = Query("last_month", description="Time period")
+    period: str = Query("last_month", description="Time period"),
+    db: Session = Depends(get_db)
 ):
     """Get detailed performance metrics for a specific user"""
-    db: Session = SessionLocal()
-    try:
-        today = datetime.now().date()
-        
-        # Determine date range
-        if period == "last_week":
-            range_start = today - timedelta(days=7)
-        elif period == "last_2_weeks":
-            range_start = today - timedelta(days=14)
-        elif period == "last_month":
-            range_start = today - timedelta(days=30)
-        else:
-            range_start = today - timedelta(days=30)
-        
-        all_tickets = db.query(TicketTracking).all()
+    today = datetime.now().date()
+    
+    # Determine date range
+    if period == "last_week":
+        range_start = today - timedelta(days=7)
+    elif period == "last_2_weeks":
+        range_start = today - timedelta(days=14)
+    elif period == "last_month":
+        range_start = today - timedelta(days=30)
+    else:
+        range_start = today - timedelta(days=30)
+    
+    all_tickets = db.query(TicketTracking).all()
+    
+    user_lower = user.lower()
+    user_tickets = []
+    
+    for ticket in all_tickets:
+        assignee = (ticket.current_assignee or '').lower()
+        backend_dev = (ticket.backend_developer or '').lower()
+        frontend_dev = (ticket.frontend_developer or '').lower()
+        qc_tester = (ticket.qc_tester or '').lower()
         
-        user_lower = user.lower()
-        user_tickets = []
+        is_user_ticket = user_lower in [assignee, backend_dev, frontend_dev, qc_tester]
         
-        for ticket in all_tickets:
-            assignee = (ticket.current_assignee or '').lower()
-            backend_dev = (ticket.backend_developer or '').lower()
-            frontend_dev = (ticket.frontend_developer or '').lower()
-            qc_tester = (ticket.qc_tester or '').lower()
+        if is_user_ticket:
+            status = ticket.status or 'Unknown'
+            team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
             
-            is_user_ticket = user_lower in [assignee, backend_dev, frontend_dev, qc_tester]
+            # Check if updated within period
+            in_period = False
+            if ticket.updated_on:
+                update_date = ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on
+                in_period = update_date >= range_start
             
-            if is_user_ticket:
-                status = ticket.status or 'Unknown'
-                team = STATUS_TEAM_MAPPING.get(status, 'Unknown')
-                
-                # Check if updated within period
-                in_period = False
-                if ticket.updated_on:
-                    update_date = ticket.updated_on.date() if hasattr(ticket.updated_on, 'date') else ticket.updated_on
-                    in_period = update_date >= range_start
-                
-                user_tickets.append({
-                    "ticket_id": ticket.ticket_id,
-                    "status": status,
-                    "team": team,
-                    "role": "Assignee" if assignee == user_lower else 
-                            "Backend Dev" if backend_dev == user_lower else
-                            "Frontend Dev" if frontend_dev == user_lower else
-                            "QC Tester",
-                    "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None,
-                    "eta": ticket.eta.isoformat() if ticket.eta else None,
-                    "in_period": in_period,
-                    "dev_estimate": ticket.dev_estimate_hours,
-                    "dev_actual": ticket.actual_dev_hours,
-                    "qa_estimate": ticket.qa_estimate_hours,
-                    "qa_actual": ticket.actual_qa_hours
-                })
-        
-        # Calculate metrics
-        total_tickets = len(user_tickets)
-        period_tickets = [t for t in user_tickets if t.get("in_period")]
-        completed = [t for t in user_tickets if t["status"].lower() in ['closed', 'moved to live', 'completed']]
-        
-        # Status breakdown
-        status_breakdown = defaultdict(int)
-        team_breakdown = defaultdict(int)
-        role_breakdown = defaultdict(int)
-        
-        for ticket in user_tickets:
-            status_breakdown[ticket["status"]] += 1
-            team_breakdown[ticket["team"]] += 1
-            role_breakdown[ticket["role"]] += 1
-        
-        return {
-            "user": user,
-            "period": period,
-            "metrics": {
-                "total_tickets_assigned": total_tickets,
-                "tickets_worked_in_period": len(period_tickets),
-                "completed_tickets": len(completed),
-                "completion_rate": round((len(completed) / total_tickets * 100), 1) if total_tickets > 0 else 0
-            },
-            "breakdown": {
-                "by_status": dict(status_breakdown),
-                "by_team": dict(team_breakdown),
-                "by_role": dict(role_breakdown)
-            },
-            "tickets": user_tickets
-        }
-    finally:
-        db.close()
+            user_tickets.append({
+                "ticket_id": ticket.ticket_id,
+                "status": status,
+                "team": team,
+                "role": "Assignee" if assignee == user_lower else 
+                        "Backend Dev" if backend_dev == user_lower else
+                        "Frontend Dev" if frontend_dev == user_lower else
+                        "QC Tester",
+                "updated_on": ticket.updated_on.isoformat() if ticket.updated_on else None,
+                "eta": ticket.eta.isoformat() if ticket.eta else None,
+                "in_period": in_period,
+                "dev_estimate": ticket.dev_estimate_hours,
+                "dev_actual": ticket.actual_dev_hours,
+                "qa_estimate": ticket.qa_estimate_hours,
+                "qa_actual": ticket.actual_qa_hours
+            })
+    
+    # Calculate metrics
+    total_tickets = len(user_tickets)
+    period_tickets = [t for t in user_tickets if t.get("in_period")]
+    completed = [t for t in user_tickets if t["status"].lower() in ['closed', 'moved to live', 'completed']]
+    
+    # Status breakdown
+    status_breakdown = defaultdict(int)
+    team_breakdown = defaultdict(int)
+    role_breakdown = defaultdict(int)
+    
+    for ticket in user_tickets:
+        status_breakdown[ticket["status"]] += 1
+        team_breakdown[ticket["team"]] += 1
+        role_breakdown[ticket["role"]] += 1
+    
+    return {
+        "user": user,
+        "period": period,
+        "metrics": {
+            "total_tickets_assigned": total_tickets,
+            "tickets_worked_in_period": len(period_tickets),
+            "completed_tickets": len(completed),
+            "completion_rate": round((len(completed) / total_tickets * 100), 1) if total_tickets > 0 else 0
+        },
+        "breakdown": {
+            "by_status": dict(status_breakdown),
+            "by_team": dict(team_breakdown),
+            "by_role": dict(role_breakdown)
+        },
+        "tickets": user_tickets
+    }
 
 
 # ===== EMPLOYEE MANAGEMENT ENDPOINTS =====
@@ -2601,65 +2534,62 @@ def list_employees(
     lead: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(True),
     search: Optional[str] = Query(None),
-    employment_status: Optional[str] = Query(None)
+    employment_status: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
 ):
     """List all employees with optional filters"""
-    db: Session = SessionLocal()
-    try:
-        query = db.query(Employee)
-
-        if is_active is not None:
-            query = query.filter(Employee.is_active == is_active)
-        if team:
-            query = query.filter(Employee.team.ilike(f"%{team}%"))
-        if category:
-            query = query.filter(Employee.category.ilike(f"%{category}%"))
-        if lead:
-            query = query.filter(Employee.lead.ilike(f"%{lead}%"))
-        if employment_status:
-            query = query.filter(Employee.employment_status == employment_status)
-        if search:
-            query = query.filter(
-                or_(
-                    Employee.name.ilike(f"%{search}%"),
-                    Employee.employee_id.ilike(f"%{search}%"),
-                    Employee.email.ilike(f"%{search}%")
-                )
+    query = db.query(Employee)
+
+    if is_active is not None:
+        query = query.filter(Employee.is_active == is_active)
+    if team:
+        query = query.filter(Employee.team.ilike(f"%{team}%"))
+    if category:
+        query = query.filter(Employee.category.ilike(f"%{category}%"))
+    if lead:
+        query = query.filter(Employee.lead.ilike(f"%{lead}%"))
+    if employment_status:
+        query = query.filter(Employee.employment_status == employment_status)
+    if search:
+        query = query.filter(
+            or_(
+                Employee.name.ilike(f"%{search}%"),
+                Employee.employee_id.ilike(f"%{search}%"),
+                Employee.email.ilike(f"%{search}%")
             )
-        
-        employees = query.order_by(Employee.name).all()
-        
-        result = []
-        for emp in employees:
-            result.append({
-                "id": emp.id,
-                "employee_id": emp.employee_id,
-                "name": emp.name,
-                "email": emp.email,
-                "role": emp.role,
-                "location": emp.location,
-                "date_of_joining": emp.date_of_joining.isoformat() if emp.date_of_joining else None,
-                "team": emp.team,
-                "category": emp.category,
-                "employment_status": emp.employment_status or "Ongoing Employee",
-                "lead": emp.lead,
-                "experience_years": calculate_experience_years(emp.date_of_joining),
-                "is_active": emp.is_active
-            })
-        
-        return result
-    finally:
-        db.close()
+        )
+    
+    employees = query.order_by(Employee.name).all()
+    
+    result = []
+    for emp in employees:
+        result.append({
+            "id": emp.id,
+            "employee_id": emp.employee_id,
+            "name": emp.name,
+            "email": emp.email,
+            "role": emp.role,
+            "location": emp.location,
+            "date_of_joining": emp.date_of_joining.isoformat() if emp.date_of_joining else None,
+            "team": emp.team,
+            "category": emp.category,
+            "employment_status": emp.employment_status or "Ongoing Employee",
+            "lead": emp.lead,
+            "experience_years": calculate_experience_years(emp.date_of_joining),
+            "is_active": emp.is_active
+        })
+    
+    return result
 
 
 @app.get("/employees/export-all")
 def export_all_employees(
     team: Optional[str] = Query(None, description="Filter by team"),
     category: Optional[str] = Query(None, description="Filter by category"),
-    employment_status: Optional[str] = Query(None, description="Filter by employment status")
+    employment_status: Optional[str] = Query(None, description="Filter by employment status"),
+    db: Session = Depends(get_db)
 ):
     """Export all employees with basic profile details to Excel format with additional columns for mapping"""
-    db: Session = SessionLocal()
     try:
         import openpyxl
         from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -2849,16 +2779,14 @@ def export_all_employees(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error exporting employees: {str(e)}")
-    finally:
-        db.close()
 
 
 @app.post("/employees/import-mapping")
 def import_employee_mapping_data(
-    file_path: Optional[str] = Query(None, description="Path to Excel file. If not provided, will look for latest in Downloads folder")
+    file_path: Optional[str] = Query(None, description="Path to Excel file. If not provided, will look for latest in Downloads folder"),
+    db: Session = Depends(get_db)
 ):
     """Import employee mapping data from Excel file (Column 1-5, Notes)"""
-    db: Session = SessionLocal()
     try:
         import openpyxl
         from pathlib import Path
@@ -3025,119 +2953,98 @@ def import_employee_mapping_data(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error importing mapping data: {str(e)}")
-    finally:
-        db.close()
 
 
 @app.get("/employees/team-overview")
-def get_team_overview():
+def get_team_overview(db: Session = Depends(get_db)):
     """Get team-level summary for PM dashboard"""
-    db: Session = SessionLocal()
-    try:
-        employees = db.query(Employee).filter(Employee.is_active == True).all()
-        
-        team_stats = {
-            "DEVELOPMENT": {"total": 0, "billed": 0, "unbilled": 0},
-            "QA": {"total": 0, "billed": 0, "unbilled": 0}
-        }
-        
-        leads = defaultdict(lambda: {"total": 0, "dev": 0, "qa": 0})
-        
-        for emp in employees:
-            team = emp.team or "Unknown"
-            if team not in team_stats:
-                team_stats[team] = {"total": 0, "billed": 0, "unbilled": 0}
-            
-            team_stats[team]["total"] += 1
-            if emp.category and "BILLED" in emp.category.upper():
-                if "UN" in emp.category.upper():
-                    team_stats[team]["unbilled"] += 1
-                else:
-                    team_stats[team]["billed"] += 1
-            
-            if emp.lead:
-                leads[emp.lead]["total"] += 1
-                if team == "DEVELOPMENT":
-                    leads[emp.lead]["dev"] += 1
-                elif team == "QA":
-                    leads[emp.lead]["qa"] += 1
-        
-        return {
-            "total_employees": len(employees),
-            "team_breakdown": team_stats,
-            "leads": dict(leads)
-        }
-    finally:
-        db.close()
+    employees = db.query(Employee).filter(Employee.is_active == True).all()
+    
+    team_stats = {
+        "DEVELOPMENT": {"total": 0, "billed": 0, "unbilled": 0},
+        "QA": {"total": 0, "billed": 0, "unbilled": 0}
+    }
+    
+    leads = defaultdict(lambda: {"total": 0, "dev": 0, "qa": 0})
+    
+    for emp in employees:
+        team = emp.team or "Unknown"
+        if team not in team_stats:
+            team_stats[team] = {"total": 0, "billed": 0, "unbilled": 0}
+        
+        team_stats[team]["total"] += 1
+        if emp.category and "BILLED" in emp.category.upper():
+            if "UN" in emp.category.upper():
+                team_stats[team]["unbilled"] += 1
+            else:
+                team_stats[team]["billed"] += 1
+        
+        if emp.lead:
+            leads[emp.lead]["total"] += 1
+            if team == "DEVELOPMENT":
+                leads[emp.lead]["dev"] += 1
+            elif team == "QA":
+                leads[emp.lead]["qa"] += 1
+    
+    return {
+        "total_employees": len(employees),
+        "team_breakdown": team_stats,
+        "leads": dict(leads)
+    }
 
 
 @app.get("/employees/{employee_id}")
-def get_employee(employee_id: str):
+def get_employee(employee_id: str, db: Session = Depends(get_db)):
     """Get single employee details"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
 
-        # Calculate experience metrics
-        techversant_exp = calculate_experience_years(employee.date_of_joining)
-        bis_exp = calculate_bis_experience(employee.bis_introduced_date) if employee.category == "BILLED" else None
-        total_exp = calculate_total_experience(employee.date_of_joining, employee.previous_experience)
-        
-        return {
-            "id": employee.id,
-            "employee_id": employee.employee_id,
-            "name": employee.name,
-            "email": employee.email,
-            "role": employee.role,
-            "location": employee.location,
-            "date_of_joining": employee.date_of_joining.isoformat() if employee.date_of_joining else None,
-            "team": employee.team,
-            "category": employee.category,
-            "employment_status": employee.employment_status or "Ongoing Employee",
-            "lead": employee.lead,
-            "manager": employee.manager,
-            "previous_experience": round(float(employee.previous_experience), 1) if employee.previous_experience is not None else None,
-            "bis_introduced_date": employee.bis_introduced_date.isoformat() if employee.bis_introduced_date else None,
-            "techversant_experience": techversant_exp,
-            "bis_experience": bis_exp,
-            "total_experience": total_exp,
-            "bis_status": "Un-Billed" if employee.category != "BILLED" else "Billed",
-            "platform": employee.platform,
-            "photo_url": employee.photo_url,
-            "experience_years": techversant_exp,  # Keep for backward compatibility
-            "is_active": employee.is_active,
-            "mapping_data": employee.mapping_data or {},
-            "created_on": employee.created_on.isoformat() if employee.created_on else None,
-            "updated_on": employee.updated_on.isoformat() if employee.updated_on else None
-        }
-    finally:
-        db.close()
+    # Calculate experience metrics
+    techversant_exp = calculate_experience_years(employee.date_of_joining)
+    bis_exp = calculate_bis_experience(employee.bis_introduced_date) if employee.category == "BILLED" else None
+    total_exp = calculate_total_experience(employee.date_of_joining, employee.previous_experience)
+    
+    return {
+        "id": employee.id,
+        "employee_id": employee.employee_id,
+        "name": employee.name,
+        "email": employee.email,
+        "role": employee.role,
+        "location": employee.location,
+        "date_of_joining": employee.date_of_joining.isoformat() if employee.date_of_joining else None,
+        "team": employee.team,
+        "category": employee.category,
+        "employment_status": employee.employment_status or "Ongoing Employee",
+        "lead": employee.lead,
+        "manager": employee.manager,
+        "previous_experience": round(float(employee.previous_experience), 1) if employee.previous_experience is not None else None,
+        "bis_introduced_date": employee.bis_introduced_date.isoformat() if employee.bis_introduced_date else None,
+        "techversant_experience": techversant_exp,
+        "bis_experience": bis_exp,
+        "total_experience": total_exp,
+        "bis_status": "Un-Billed" if employee.category != "BILLED" else "Billed",
+        "platform": employee.platform,
+        "photo_url": employee.photo_url,
+        "experience_years": techversant_exp,  # Keep for backward compatibility
+        "is_active": employee.is_active,
+        "mapping_data": employee.mapping_data or {},
+        "created_on": employee.created_on.isoformat() if employee.created_on else None,
+        "updated_on": employee.updated_on.isoformat() if employee.updated_on else None
+    }
 
 
 @app.get("/employees/{employee_id}/export")
-def export_employee_profile(employee_id: str):
+def export_employee_profile(employee_id: str, db: Session = Depends(get_db)):
     """Export employee profile data to Excel format"""
-    db: Session = SessionLocal()
     try:
         import openpyxl
         from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
         from io import BytesIO
         
         # Find employee
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
+        employee = find_employee(db, employee_id)
         
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -3442,14 +3349,11 @@ def export_employee_profile(employee_id: str):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error exporting employee profile: {str(e)}")
-    finally:
-        db.close()
 
 
 @app.post("/employees")
-def create_employee(employee: EmployeeCreate):
+def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
     """Create a new employee"""
-    db: Session = SessionLocal()
     try:
         # Check if employee_id or email already exists
         existing = db.query(Employee).filter(
@@ -3479,6 +3383,7 @@ def create_employee(employee: EmployeeCreate):
         
         db.add(new_employee)
         db.commit()
+        clear_calendar_views()
         db.refresh(new_employee)
         
         return {"message": "Employee created successfully", "id": new_employee.id, "employee_id": new_employee.employee_id}
@@ -3487,21 +3392,13 @@ def create_employee(employee: EmployeeCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.put("/employees/{employee_id}")
-def update_employee(employee_id: str, updates: EmployeeUpdate):
+def update_employee(employee_id: str, updates: EmployeeUpdate, db: Session = Depends(get_db)):
     """Update an employee and cascade updates to related records"""
-    db: Session = SessionLocal()
     try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
+        employee = find_employee(db, employee_id)
         
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -3512,11 +3409,11 @@ def update_employee(employee_id: str, updates: EmployeeUpdate):
         old_manager = employee.manager
         
         update_data = updates.dict(exclude_unset=True)
-        for field, value in update_data.items():
+        for field_name, value in update_data.items():
             if value is not None:
-                if field == 'team' and value:
+                if field_name == 'team' and value:
                     value = value.upper()
-                setattr(employee, field, value)
+                setattr(employee, field_name, value)
         
         new_name = employee.name
         new_lead = employee.lead
@@ -3591,6 +3488,7 @@ def update_employee(employee_id: str, updates: EmployeeUpdate):
         
         employee.updated_on = datetime.utcnow()
         db.commit()
+        clear_calendar_views()
         
         message = f"Employee updated successfully"
         if update_count > 0:
@@ -3602,82 +3500,69 @@ def update_employee(employee_id: str, updates: EmployeeUpdate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.post("/employees/{employee_id}/photo")
 async def upload_employee_photo(
     employee_id: str,
     request: Request,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
 ):
     """Upload and save employee profile photo."""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
-
-        filename = file.filename or ""
-        ext = os.path.splitext(filename)[1].lower()
-        allowed_exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-        if ext and ext not in allowed_exts:
-            raise HTTPException(status_code=400, detail="Unsupported image format.")
-
-        if not ext:
-            content_map = {
-                "image/jpeg": ".jpg",
-                "image/png": ".png",
-                "image/webp": ".webp",
-                "image/gif": ".gif"
-            }
-            ext = content_map.get(file.content_type, ".jpg")
+    employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
+
+    filename = file.filename or ""
+    ext = os.path.splitext(filename)[1].lower()
+    allowed_exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+    if ext and ext not in allowed_exts:
+        raise HTTPException(status_code=400, detail="Unsupported image format.")
+
+    if not ext:
+        content_map = {
+            "image/jpeg": ".jpg",
+            "image/png": ".png",
+            "image/webp": ".webp",
+            "image/gif": ".gif"
+        }
+        ext = content_map.get(file.content_type, ".jpg")
 
-        timestamp = int(datetime.utcnow().timestamp())
-        safe_filename = f"{employee_id}_{timestamp}{ext}"
-        file_path = os.path.join(PROFILE_PHOTO_DIR, safe_filename)
+    timestamp = int(datetime.utcnow().timestamp())
+    safe_filename = f"{employee_id}_{timestamp}{ext}"
+    file_path = os.path.join(PROFILE_PHOTO_DIR, safe_filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
 
-        base_url = str(request.base_url).rstrip("/")
-        photo_url = f"{base_url}/uploads/profile_photos/{safe_filename}"
+    base_url = str(request.base_url).rstrip("/")
+    photo_url = f"{base_url}/uploads/profile_photos/{safe_filename}"
 
-        employee.photo_url = photo_url
-        employee.updated_on = datetime.utcnow()
-        db.commit()
+    employee.photo_url = photo_url
+    employee.updated_on = datetime.utcnow()
+    db.commit()
 
-        return {"photo_url": photo_url}
-    finally:
-        db.close()
+    return {"photo_url": photo_url}
 
 
 @app.delete("/employees/{employee_id}")
-def delete_employee(employee_id: str):
+def delete_employee(employee_id: str, db: Session = Depends(get_db)):
     """Soft delete an employee (set is_active=False)"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-        
-        employee.is_active = False
-        employee.updated_on = datetime.utcnow()
-        db.commit()
-        
-        return {"message": "Employee deactivated successfully"}
-    finally:
-        db.close()
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    employee.is_active = False
+    employee.updated_on = datetime.utcnow()
+    db.commit()
+    clear_calendar_views()
+    
+    return {"message": "Employee deactivated successfully"}
 
 
 @app.post("/employees/import")
@@ -3695,6 +3580,7 @@ async def import_employees(file: UploadFile = File(...)):
     try:
         from sync_employees_to_db import import_employees as do_import
         success, imported, updated = do_import(tmp_path)
+        clear_calendar_views()
         
         if success:
             return {
@@ -3714,238 +3600,230 @@ async def import_employees(file: UploadFile = File(...)):
 @app.get("/employees/{employee_id}/performance")
 def get_employee_performance(
     employee_id: str,
-    period: str = Query("overall", description="past_week, past_month, past_quarter, one_year, overall")
+    period: str = Query("overall", description="past_week, past_month, past_quarter, one_year, overall"),
+    db: Session = Depends(get_db)
 ):
     """Get comprehensive performance metrics for an employee"""
-    db: Session = SessionLocal()
-    try:
-        # Get employee
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+    # Get employee
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
 
-        start_date, end_date = get_date_range(period)
-        employee_name = employee.name
-        is_dev = employee.team == "DEVELOPMENT"
-        
-        # Build base response
-        result = {
-            "employee": {
-                "id": employee.id,
-                "employee_id": employee.employee_id,
-                "name": employee.name,
-                "team": employee.team,
-                "role": employee.role,
-                "category": employee.category,
-                "lead": employee.lead,
-                "experience_years": calculate_experience_years(employee.date_of_joining)
-            },
-            "period": period,
-            "metrics": {}
-        }
-        
-        # ===== TICKET METRICS (from ticket_tracking) =====
-        ticket_query = db.query(TicketTracking)
-        
-        if is_dev:
-            ticket_query = ticket_query.filter(
-                or_(
-                    TicketTracking.backend_developer.ilike(f"%{employee_name}%"),
-                    TicketTracking.frontend_developer.ilike(f"%{employee_name}%")
-                )
-            )
-        else:  # QA
-            ticket_query = ticket_query.filter(
-                TicketTracking.qc_tester.ilike(f"%{employee_name}%")
+    start_date, end_date = get_date_range(period)
+    employee_name = employee.name
+    is_dev = employee.team == "DEVELOPMENT"
+    
+    # Build base response
+    result = {
+        "employee": {
+            "id": employee.id,
+            "employee_id": employee.employee_id,
+            "name": employee.name,
+            "team": employee.team,
+            "role": employee.role,
+            "category": employee.category,
+            "lead": employee.lead,
+            "experience_years": calculate_experience_years(employee.date_of_joining)
+        },
+        "period": period,
+        "metrics": {}
+    }
+    
+    # ===== TICKET METRICS (from ticket_tracking) =====
+    ticket_query = db.query(TicketTracking)
+    
+    if is_dev:
+        ticket_query = ticket_query.filter(
+            or_(
+                TicketTracking.backend_developer.ilike(f"%{employee_name}%"),
+                TicketTracking.frontend_developer.ilike(f"%{employee_name}%")
             )
+        )
+    else:  # QA
+        ticket_query = ticket_query.filter(
+            TicketTracking.qc_tester.ilike(f"%{employee_name}%")
+        )
+    
+    if start_date:
+        ticket_query = ticket_query.filter(TicketTracking.updated_on >= start_date)
+    
+    tickets = ticket_query.all()
+    ticket_ids = [t.ticket_id for t in tickets]
+    
+    # Calculate estimate vs actual
+    total_estimate = sum(t.dev_estimate_hours or 0 for t in tickets) if is_dev else sum(t.qa_estimate_hours or 0 for t in tickets)
+    total_actual = sum(t.actual_dev_hours or 0 for t in tickets) if is_dev else sum(t.actual_qa_hours or 0 for t in tickets)
+    
+    result["metrics"]["tickets"] = {
+        "count": len(tickets),
+        "ticket_ids": ticket_ids[:50],  # Limit to 50
+        "estimate_hours": round(total_estimate, 1),
+        "actual_hours": round(total_actual, 1),
+        "estimate_accuracy": round((total_estimate / total_actual * 100), 1) if total_actual > 0 else 100
+    }
+    
+    # ===== BUG METRICS (from bugs) =====
+    bug_query = db.query(Bug)
+    
+    if is_dev:
+        bug_query = bug_query.filter(Bug.assignee.ilike(f"%{employee_name}%"))
+    else:  # QA - bugs reported by this person
+        bug_query = bug_query.filter(Bug.author.ilike(f"%{employee_name}%"))
+    
+    if start_date:
+        bug_query = bug_query.filter(Bug.created_on >= start_date)
+    
+    bugs = bug_query.all()
+    total_bugs = len(bugs)
+    
+    if total_bugs > 0:
+        # Status breakdown
+        closed_bugs = len([b for b in bugs if b.status == "Closed"])
+        reopened_bugs = len([b for b in bugs if b.status == "Reopened"])
+        rejected_bugs = len([b for b in bugs if b.status == "Rejected"])
+        
+        # Severity breakdown
+        critical_bugs = len([b for b in bugs if b.severity == "Critical"])
+        major_bugs = len([b for b in bugs if b.severity == "Major"])
+        minor_bugs = len([b for b in bugs if b.severity == "Minor"])
+        
+        # Environment breakdown
+        live_bugs = len([b for b in bugs if b.environment == "Live"])
+        pre_bugs = len([b for b in bugs if b.environment == "Pre"])
+        staging_bugs = len([b for b in bugs if b.environment == "Staging"])
+        
+        # Bug ageing (for open bugs)
+        open_bugs = [b for b in bugs if b.status not in ["Closed", "Rejected"]]
+        ages = []
+        for bug in open_bugs:
+            if bug.created_on:
+                age = (datetime.now() - bug.created_on).days
+                ages.append(age)
+        avg_ageing = round(sum(ages) / len(ages), 1) if ages else 0
+        
+        # Resolution time (for closed bugs)
+        resolution_times = []
+        for bug in bugs:
+            if bug.status == "Closed" and bug.created_on and bug.closed_on:
+                days = (bug.closed_on - bug.created_on).days
+                resolution_times.append(days)
+        avg_resolution = round(sum(resolution_times) / len(resolution_times), 1) if resolution_times else 0
         
-        if start_date:
-            ticket_query = ticket_query.filter(TicketTracking.updated_on >= start_date)
-        
-        tickets = ticket_query.all()
-        ticket_ids = [t.ticket_id for t in tickets]
-        
-        # Calculate estimate vs actual
-        total_estimate = sum(t.dev_estimate_hours or 0 for t in tickets) if is_dev else sum(t.qa_estimate_hours or 0 for t in tickets)
-        total_actual = sum(t.actual_dev_hours or 0 for t in tickets) if is_dev else sum(t.actual_qa_hours or 0 for t in tickets)
+        # Modules expertise
+        modules = list(set(b.module for b in bugs if b.module))
         
-        result["metrics"]["tickets"] = {
-            "count": len(tickets),
-            "ticket_ids": ticket_ids[:50],  # Limit to 50
-            "estimate_hours": round(total_estimate, 1),
-            "actual_hours": round(total_actual, 1),
-            "estimate_accuracy": round((total_estimate / total_actual * 100), 1) if total_actual > 0 else 100
+        # Bug types
+        bug_types = defaultdict(int)
+        for bug in bugs:
+            tracker = bug.tracker or "Unknown"
+            bug_types[tracker] += 1
+        
+        result["metrics"]["bugs"] = {
+            "total": total_bugs,
+            "closed": closed_bugs,
+            "reopened": reopened_bugs,
+            "rejected": rejected_bugs,
+            "closure_rate": round((closed_bugs / total_bugs * 100), 1),
+            "reopened_percent": round((reopened_bugs / total_bugs * 100), 1),
+            "rejected_percent": round((rejected_bugs / total_bugs * 100), 1),
+            "severity": {
+                "critical": critical_bugs,
+                "critical_percent": round((critical_bugs / total_bugs * 100), 1),
+                "major": major_bugs,
+                "minor": minor_bugs
+            },
+            "environment": {
+                "live": live_bugs,
+                "live_percent": round((live_bugs / total_bugs * 100), 1),
+                "pre": pre_bugs,
+                "pre_percent": round((pre_bugs / total_bugs * 100), 1),
+                "staging": staging_bugs,
+                "staging_percent": round((staging_bugs / total_bugs * 100), 1)
+            },
+            "avg_ageing_days": avg_ageing,
+            "avg_resolution_days": avg_resolution,
+            "modules_expertise": modules[:15],
+            "bug_types": dict(bug_types)
         }
-        
-        # ===== BUG METRICS (from bugs) =====
-        bug_query = db.query(Bug)
-        
-        if is_dev:
-            bug_query = bug_query.filter(Bug.assignee.ilike(f"%{employee_name}%"))
-        else:  # QA - bugs reported by this person
-            bug_query = bug_query.filter(Bug.author.ilike(f"%{employee_name}%"))
+    else:
+        result["metrics"]["bugs"] = {"total": 0}
+    
+    # ===== TESTRAIL METRICS (QA only) =====
+    if not is_dev:
+        test_query = db.query(TestResult).filter(
+            TestResult.assigned_to.ilike(f"%{employee_name}%")
+        )
         
         if start_date:
-            bug_query = bug_query.filter(Bug.created_on >= start_date)
-        
-        bugs = bug_query.all()
-        total_bugs = len(bugs)
-        
-        if total_bugs > 0:
-            # Status breakdown
-            closed_bugs = len([b for b in bugs if b.status == "Closed"])
-            reopened_bugs = len([b for b in bugs if b.status == "Reopened"])
-            rejected_bugs = len([b for b in bugs if b.status == "Rejected"])
-            
-            # Severity breakdown
-            critical_bugs = len([b for b in bugs if b.severity == "Critical"])
-            major_bugs = len([b for b in bugs if b.severity == "Major"])
-            minor_bugs = len([b for b in bugs if b.severity == "Minor"])
-            
-            # Environment breakdown
-            live_bugs = len([b for b in bugs if b.environment == "Live"])
-            pre_bugs = len([b for b in bugs if b.environment == "Pre"])
-            staging_bugs = len([b for b in bugs if b.environment == "Staging"])
-            
-            # Bug ageing (for open bugs)
-            open_bugs = [b for b in bugs if b.status not in ["Closed", "Rejected"]]
-            ages = []
-            for bug in open_bugs:
-                if bug.created_on:
-                    age = (datetime.now() - bug.created_on).days
-                    ages.append(age)
-            avg_ageing = round(sum(ages) / len(ages), 1) if ages else 0
-            
-            # Resolution time (for closed bugs)
-            resolution_times = []
-            for bug in bugs:
-                if bug.status == "Closed" and bug.created_on and bug.closed_on:
-                    days = (bug.closed_on - bug.created_on).days
-                    resolution_times.append(days)
-            avg_resolution = round(sum(resolution_times) / len(resolution_times), 1) if resolution_times else 0
-            
-            # Modules expertise
-            modules = list(set(b.module for b in bugs if b.module))
-            
-            # Bug types
-            bug_types = defaultdict(int)
-            for bug in bugs:
-                tracker = bug.tracker or "Unknown"
-                bug_types[tracker] += 1
-            
-            result["metrics"]["bugs"] = {
-                "total": total_bugs,
-                "closed": closed_bugs,
-                "reopened": reopened_bugs,
-                "rejected": rejected_bugs,
-                "closure_rate": round((closed_bugs / total_bugs * 100), 1),
-                "reopened_percent": round((reopened_bugs / total_bugs * 100), 1),
-                "rejected_percent": round((rejected_bugs / total_bugs * 100), 1),
-                "severity": {
-                    "critical": critical_bugs,
-                    "critical_percent": round((critical_bugs / total_bugs * 100), 1),
-                    "major": major_bugs,
-                    "minor": minor_bugs
-                },
-                "environment": {
-                    "live": live_bugs,
-                    "live_percent": round((live_bugs / total_bugs * 100), 1),
-                    "pre": pre_bugs,
-                    "pre_percent": round((pre_bugs / total_bugs * 100), 1),
-                    "staging": staging_bugs,
-                    "staging_percent": round((staging_bugs / total_bugs * 100), 1)
-                },
-                "avg_ageing_days": avg_ageing,
-                "avg_resolution_days": avg_resolution,
-                "modules_expertise": modules[:15],
-                "bug_types": dict(bug_types)
+            test_query = test_query.filter(TestResult.created_on >= start_date)
+        
+        test_results = test_query.all()
+        total_tests = len(test_results)
+        
+        if total_tests > 0:
+            passed = len([t for t in test_results if t.status_name == "Passed"])
+            failed = len([t for t in test_results if t.status_name == "Failed"])
+            blocked = len([t for t in test_results if t.status_name == "Blocked"])
+            
+            # Unique test runs
+            unique_runs = len(set(t.run_id for t in test_results if t.run_id))
+            
+            result["metrics"]["tests"] = {
+                "total_executed": total_tests,
+                "passed": passed,
+                "failed": failed,
+                "blocked": blocked,
+                "pass_rate": round((passed / total_tests * 100), 1),
+                "fail_rate": round((failed / total_tests * 100), 1),
+                "blocked_percent": round((blocked / total_tests * 100), 1),
+                "test_runs_participated": unique_runs
             }
-        else:
-            result["metrics"]["bugs"] = {"total": 0}
-        
-        # ===== TESTRAIL METRICS (QA only) =====
-        if not is_dev:
-            test_query = db.query(TestResult).filter(
-                TestResult.assigned_to.ilike(f"%{employee_name}%")
-            )
             
-            if start_date:
-                test_query = test_query.filter(TestResult.created_on >= start_date)
-            
-            test_results = test_query.all()
-            total_tests = len(test_results)
-            
-            if total_tests > 0:
-                passed = len([t for t in test_results if t.status_name == "Passed"])
-                failed = len([t for t in test_results if t.status_name == "Failed"])
-                blocked = len([t for t in test_results if t.status_name == "Blocked"])
-                
-                # Unique test runs
-                unique_runs = len(set(t.run_id for t in test_results if t.run_id))
-                
-                result["metrics"]["tests"] = {
-                    "total_executed": total_tests,
-                    "passed": passed,
-                    "failed": failed,
-                    "blocked": blocked,
-                    "pass_rate": round((passed / total_tests * 100), 1),
-                    "fail_rate": round((failed / total_tests * 100), 1),
-                    "blocked_percent": round((blocked / total_tests * 100), 1),
-                    "test_runs_participated": unique_runs
-                }
-                
-                # Bugs per ticket
-                if len(ticket_ids) > 0:
-                    result["metrics"]["bugs_per_ticket"] = round(total_bugs / len(ticket_ids), 1)
-            else:
-                result["metrics"]["tests"] = {"total_executed": 0}
-        
-        # ===== TIMESHEET METRICS =====
-        timesheet_query = db.query(Timesheet).filter(
-            Timesheet.employee_name.ilike(f"%{employee_name}%")
-        )
-        
-        if start_date:
-            timesheet_query = timesheet_query.filter(Timesheet.date >= start_date.date())
-        
-        timesheets = timesheet_query.all()
-        
-        total_minutes = sum(t.time_logged_minutes or 0 for t in timesheets)
-        total_hours = round(total_minutes / 60, 1)
-        
-        # Calculate working days in period
-        if start_date:
-            working_days = sum(1 for i in range((end_date - start_date).days + 1) 
-                             if (start_date + timedelta(days=i)).weekday() < 5)
+            # Bugs per ticket
+            if len(ticket_ids) > 0:
+                result["metrics"]["bugs_per_ticket"] = round(total_bugs / len(ticket_ids), 1)
         else:
-            working_days = 250  # Approximate yearly working days
-        
-        expected_hours = working_days * 8
-        
-        result["metrics"]["timesheet"] = {
-            "total_hours": total_hours,
-            "expected_hours": expected_hours,
-            "utilization_percent": round((total_hours / expected_hours * 100), 1) if expected_hours > 0 else 0,
-            "avg_daily_hours": round(total_hours / working_days, 1) if working_days > 0 else 0,
-            "entries_count": len(timesheets)
-        }
-        
-        # ===== RAG SCORE CALCULATION =====
-        rag_score = calculate_rag_score(result["metrics"], is_dev)
-        result["rag_status"] = {
-            "score": rag_score,
-            "status": "GREEN" if rag_score >= 70 else "AMBER" if rag_score >= 50 else "RED"
-        }
-        
-        return result
-    finally:
-        db.close()
+            result["metrics"]["tests"] = {"total_executed": 0}
+    
+    # ===== TIMESHEET METRICS =====
+    timesheet_query = db.query(
+        func.count(Timesheet.id),
+        func.coalesce(func.sum(Timesheet.time_logged_minutes), 0)
+    ).filter(
+        Timesheet.employee_name.ilike(f"%{employee_name}%")
+    )
+    
+    if start_date:
+        timesheet_query = timesheet_query.filter(Timesheet.date >= start_date.date())
+    
+    entries_count, total_minutes = timesheet_query.one()
+    total_hours = round(total_minutes / 60, 1)
+    
+    # Calculate working days in period (weekdays only)
+    if start_date:
+        working_days = count_working_days(start_date.date(), end_date.date(), set())
+    else:
+        working_days = 250  # Approximate yearly working days
+    
+    expected_hours = working_days * 8
+    
+    result["metrics"]["timesheet"] = {
+        "total_hours": total_hours,
+        "expected_hours": expected_hours,
+        "utilization_percent": round((total_hours / expected_hours * 100), 1) if expected_hours > 0 else 0,
+        "avg_daily_hours": round(total_hours / working_days, 1) if working_days > 0 else 0,
+        "entries_count": entries_count
+    }
+    
+    # ===== RAG SCORE CALCULATION =====
+    rag_score = calculate_rag_score(result["metrics"], is_dev)
+    result["rag_status"] = {
+        "score": rag_score,
+        "status": "GREEN" if rag_score >= 70 else "AMBER" if rag_score >= 50 else "RED"
+    }
+    
+    return result
 
 
 def calculate_rag_score(metrics, is_dev):
@@ -4027,265 +3905,239 @@ def calculate_rag_score(metrics, is_dev):
             weights_used += 20
     
     # Normalize to 100 if not all weights were used
-    if weights_used > 0:
-        score = (score / weights_used) * 100
-    
-    return round(score, 1)
-
-
-@app.get("/employees/{employee_id}/timesheet-summary")
-def get_employee_timesheet_summary(
-    employee_id: str,
-    period: str = Query("past_month")
-):
-    """Get detailed timesheet summary for an employee"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-
-        start_date, end_date = get_date_range(period)
-        
-        query = db.query(Timesheet).filter(
-            Timesheet.employee_name.ilike(f"%{employee.name}%")
-        )
-        
-        if start_date:
-            query = query.filter(Timesheet.date >= start_date.date())
-        
-        timesheets = query.order_by(Timesheet.date.desc()).all()
-        
-        # Daily breakdown
-        daily_data = defaultdict(int)
-        ticket_hours = defaultdict(int)
-        
-        for ts in timesheets:
-            day_key = ts.date.isoformat() if ts.date else "unknown"
-            daily_data[day_key] += ts.time_logged_minutes or 0
-            if ts.ticket_id:
-                ticket_hours[ts.ticket_id] += ts.time_logged_minutes or 0
-        
-        # Convert to hours
-        daily_hours = {k: round(v / 60, 2) for k, v in daily_data.items()}
-        ticket_hours_formatted = {k: round(v / 60, 2) for k, v in ticket_hours.items()}
-        
-        total_minutes = sum(daily_data.values())
-        
-        return {
-            "employee_name": employee.name,
-            "period": period,
-            "total_hours": round(total_minutes / 60, 1),
-            "total_entries": len(timesheets),
-            "unique_tickets": len(ticket_hours),
-            "daily_hours": dict(sorted(daily_hours.items(), reverse=True)[:30]),
-            "ticket_hours": dict(sorted(ticket_hours_formatted.items(), key=lambda x: x[1], reverse=True)[:20])
-        }
-    finally:
-        db.close()
+    if weights_used > 0:
+        score = (score / weights_used) * 100
+    
+    return round(score, 1)
+
+
+@app.get("/employees/{employee_id}/timesheet-summary")
+def get_employee_timesheet_summary(
+    employee_id: str,
+    period: str = Query("past_month"),
+    db: Session = Depends(get_db)
+):
+    """Get detailed timesheet summary for an employee"""
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    start_date, end_date = get_date_range(period)
+    
+    filters = [Timesheet.employee_name.ilike(f"%{employee.name}%")]
+    if start_date:
+        filters.append(Timesheet.date >= start_date.date())
+    
+    minutes = func.coalesce(func.sum(func.coalesce(Timesheet.time_logged_minutes, 0)), 0)
+    
+    # Daily breakdown, summed per day in the database
+    daily_rows = db.query(Timesheet.date, func.count(Timesheet.id), minutes).filter(
+        *filters
+    ).group_by(Timesheet.date).all()
+    
+    # Per-ticket breakdown; most recently worked tickets first so ties keep their previous order
+    ticket_rows = db.query(Timesheet.ticket_id, minutes).filter(
+        *filters, Timesheet.ticket_id.isnot(None), Timesheet.ticket_id != 0
+    ).group_by(Timesheet.ticket_id).order_by(func.max(Timesheet.date).desc()).all()
+    
+    # Convert to hours
+    daily_hours = {(day.isoformat() if day else "unknown"): round(m / 60, 2) for day, _, m in daily_rows}
+    ticket_hours_formatted = {ticket_id: round(m / 60, 2) for ticket_id, m in ticket_rows}
+    
+    total_minutes = sum(m for _, _, m in daily_rows)
+    
+    return {
+        "employee_name": employee.name,
+        "period": period,
+        "total_hours": round(total_minutes / 60, 1),
+        "total_entries": sum(count for _, count, _ in daily_rows),
+        "unique_tickets": len(ticket_rows),
+        "daily_hours": dict(sorted(daily_hours.items(), reverse=True)[:30]),
+        "ticket_hours": dict(sorted(ticket_hours_formatted.items(), key=lambda x: x[1], reverse=True)[:20])
+    }
 
 
 @app.get("/employees/{employee_id}/rag-history")
-def get_employee_rag_history(employee_id: str):
+def get_employee_rag_history(employee_id: str, db: Session = Depends(get_db)):
     """
     Get historical RAG scores for an employee across different time periods.
     This allows showing RAG trend over time.
     """
-    db: Session = SessionLocal()
-    try:
-        # Find employee
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+    # Find employee
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
 
-        is_dev = employee.team == "DEVELOPMENT"
-        employee_name = employee.name
-        
-        # Calculate RAG scores for different periods
-        periods = ["past_week", "past_month", "past_quarter", "one_year"]
-        period_labels = {
-            "past_week": "Past Week",
-            "past_month": "Past Month", 
-            "past_quarter": "Past Quarter",
-            "one_year": "Past Year"
-        }
+    is_dev = employee.team == "DEVELOPMENT"
+    employee_name = employee.name
+    
+    # Calculate RAG scores for different periods
+    periods = ["past_week", "past_month", "past_quarter", "one_year"]
+    period_labels = {
+        "past_week": "Past Week",
+        "past_month": "Past Month", 
+        "past_quarter": "Past Quarter",
+        "one_year": "Past Year"
+    }
+    
+    rag_history = []
+    
+    for period in periods:
+        start_date, end_date = get_date_range(period)
         
-        rag_history = []
+        # Get bugs for this period
+        if is_dev:
+            # DEV: bugs assigned to them
+            bugs_query = db.query(Bug).filter(
+                Bug.assignee.ilike(f"%{employee_name}%")
+            )
+        else:
+            # QA: bugs reported by them
+            bugs_query = db.query(Bug).filter(
+                Bug.author.ilike(f"%{employee_name}%")
+            )
+        if start_date:
+            bugs_query = bugs_query.filter(Bug.created_on >= start_date)
+        bugs = bugs_query.all()
         
-        for period in periods:
-            start_date, end_date = get_date_range(period)
-            
-            # Get bugs for this period
-            if is_dev:
-                # DEV: bugs assigned to them
-                bugs_query = db.query(Bug).filter(
-                    Bug.assignee.ilike(f"%{employee_name}%")
-                )
-            else:
-                # QA: bugs reported by them
-                bugs_query = db.query(Bug).filter(
-                    Bug.author.ilike(f"%{employee_name}%")
-                )
-            if start_date:
-                bugs_query = bugs_query.filter(Bug.created_on >= start_date)
-            bugs = bugs_query.all()
-            
-            # Get test results for QA
-            tests = []
-            if not is_dev:
-                tests_query = db.query(TestResult).filter(
-                    TestResult.assigned_to.ilike(f"%{employee_name}%")
-                )
-                if start_date:
-                    tests_query = tests_query.filter(TestResult.created_on >= start_date)
-                tests = tests_query.all()
-            
-            # Get timesheets
-            ts_query = db.query(Timesheet).filter(
-                Timesheet.employee_name.ilike(f"%{employee_name}%")
+        # Get test results for QA
+        tests = []
+        if not is_dev:
+            tests_query = db.query(TestResult).filter(
+                TestResult.assigned_to.ilike(f"%{employee_name}%")
             )
             if start_date:
-                ts_query = ts_query.filter(Timesheet.date >= start_date.date())
-            timesheets = ts_query.all()
-            
-            # Build simplified metrics
-            total_bugs = len(bugs)
-            closed_bugs = len([b for b in bugs if b.status == "Closed"])
-            reopened = len([b for b in bugs if b.status == "Reopened"])
-            
-            metrics = {
-                "bugs": {
-                    "total": total_bugs,
-                    "closure_rate": round((closed_bugs / total_bugs * 100) if total_bugs > 0 else 0, 1),
-                    "reopened_percent": round((reopened / total_bugs * 100) if total_bugs > 0 else 0, 1),
-                    "rejected_percent": round((len([b for b in bugs if b.status == "Rejected"]) / total_bugs * 100) if total_bugs > 0 else 0, 1),
-                    "severity": {
-                        "critical_percent": round((len([b for b in bugs if b.severity == "Critical"]) / total_bugs * 100) if total_bugs > 0 else 0, 1)
-                    }
-                },
-                "tickets": {
-                    "actual_hours": 0,
-                    "estimate_accuracy": 100
-                },
-                "timesheet": {
-                    "expected_hours": 40 if period == "past_week" else 160 if period == "past_month" else 480 if period == "past_quarter" else 2000,
-                    "utilization_percent": 0
-                },
-                "tests": {
-                    "total_executed": len(tests),
-                    "pass_rate": round((len([t for t in tests if t.status_name == "Passed"]) / len(tests) * 100) if tests else 0, 1)
-                },
-                "bugs_per_ticket": 0
-            }
-            
-            # Calculate timesheet utilization
-            total_minutes = sum(t.time_logged_minutes or 0 for t in timesheets)
-            total_hours = round(total_minutes / 60, 1)
-            if metrics["timesheet"]["expected_hours"] > 0:
-                metrics["timesheet"]["utilization_percent"] = round(
-                    (total_hours / metrics["timesheet"]["expected_hours"] * 100), 1
-                )
-            
-            # Calculate RAG score
-            rag_score = calculate_rag_score(metrics, is_dev)
-            rag_status = "GREEN" if rag_score >= 70 else "AMBER" if rag_score >= 50 else "RED"
-            
-            rag_history.append({
-                "period": period,
-                "label": period_labels[period],
-                "score": rag_score,
-                "status": rag_status,
-                "bugs_count": total_bugs,
-                "tests_count": len(tests) if not is_dev else None
-            })
+                tests_query = tests_query.filter(TestResult.created_on >= start_date)
+            tests = tests_query.all()
         
-        # Also get saved reviews for historical context
-        reviews = db.query(EmployeeReview).filter(
-            EmployeeReview.employee_id == employee_id
-        ).order_by(EmployeeReview.review_date.desc()).limit(5).all()
-        
-        review_history = []
-        for review in reviews:
-            review_history.append({
-                "period": review.review_period,
-                "date": review.review_date.isoformat() if review.review_date else None,
-                "score": review.rag_score,
-                "status": review.rag_status,
-                "overall_rating": review.overall_rating
-            })
+        # Get logged timesheet minutes
+        ts_query = db.query(func.coalesce(func.sum(Timesheet.time_logged_minutes), 0)).filter(
+            Timesheet.employee_name.ilike(f"%{employee_name}%")
+        )
+        if start_date:
+            ts_query = ts_query.filter(Timesheet.date >= start_date.date())
+        total_minutes = ts_query.scalar()
         
-        return {
-            "employee_id": employee_id,
-            "employee_name": employee_name,
-            "team": employee.team,
-            "current_rag": rag_history[0] if rag_history else None,
-            "rag_trend": rag_history,
-            "review_history": review_history
+        # Build simplified metrics
+        total_bugs = len(bugs)
+        closed_bugs = len([b for b in bugs if b.status == "Closed"])
+        reopened = len([b for b in bugs if b.status == "Reopened"])
+        
+        metrics = {
+            "bugs": {
+                "total": total_bugs,
+                "closure_rate": round((closed_bugs / total_bugs * 100) if total_bugs > 0 else 0, 1),
+                "reopened_percent": round((reopened / total_bugs * 100) if total_bugs > 0 else 0, 1),
+                "rejected_percent": round((len([b for b in bugs if b.status == "Rejected"]) / total_bugs * 100) if total_bugs > 0 else 0, 1),
+                "severity": {
+                    "critical_percent": round((len([b for b in bugs if b.severity == "Critical"]) / total_bugs * 100) if total_bugs > 0 else 0, 1)
+                }
+            },
+            "tickets": {
+                "actual_hours": 0,
+                "estimate_accuracy": 100
+            },
+            "timesheet": {
+                "expected_hours": 40 if period == "past_week" else 160 if period == "past_month" else 480 if period == "past_quarter" else 2000,
+                "utilization_percent": 0
+            },
+            "tests": {
+                "total_executed": len(tests),
+                "pass_rate": round((len([t for t in tests if t.status_name == "Passed"]) / len(tests) * 100) if tests else 0, 1)
+            },
+            "bugs_per_ticket": 0
         }
-    finally:
-        db.close()
+        
+        # Calculate timesheet utilization
+        total_hours = round(total_minutes / 60, 1)
+        if metrics["timesheet"]["expected_hours"] > 0:
+            metrics["timesheet"]["utilization_percent"] = round(
+                (total_hours / metrics["timesheet"]["expected_hours"] * 100), 1
+            )
+        
+        # Calculate RAG score
+        rag_score = calculate_rag_score(metrics, is_dev)
+        rag_status = "GREEN" if rag_score >= 70 else "AMBER" if rag_score >= 50 else "RED"
+        
+        rag_history.append({
+            "period": period,
+            "label": period_labels[period],
+            "score": rag_score,
+            "status": rag_status,
+            "bugs_count": total_bugs,
+            "tests_count": len(tests) if not is_dev else None
+        })
+    
+    # Also get saved reviews for historical context
+    reviews = db.query(EmployeeReview).filter(
+        EmployeeReview.employee_id == employee_id
+    ).order_by(EmployeeReview.review_date.desc()).limit(5).all()
+    
+    review_history = []
+    for review in reviews:
+        review_history.append({
+            "period": review.review_period,
+            "date": review.review_date.isoformat() if review.review_date else None,
+            "score": review.rag_score,
+            "status": review.rag_status,
+            "overall_rating": review.overall_rating
+        })
+    
+    return {
+        "employee_id": employee_id,
+        "employee_name": employee_name,
+        "team": employee.team,
+        "current_rag": rag_history[0] if rag_history else None,
+        "rag_trend": rag_history,
+        "review_history": review_history
+    }
 
 
 # ===== GOALS ENDPOINTS =====
 
 @app.get("/employees/{employee_id}/goals")
-def get_employee_goals(employee_id: str):
+def get_employee_goals(employee_id: str, db: Session = Depends(get_db)):
     """Get goals, strengths, and improvements for an employee"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-        goals = db.query(EmployeeGoal).filter(
-            EmployeeGoal.employee_id == employee_id
-        ).order_by(EmployeeGoal.created_on.desc()).all()
-        
-        result = {
-            "goals": [],
-            "strengths": [],
-            "improvements": []
+    employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    goals = db.query(EmployeeGoal).filter(
+        EmployeeGoal.employee_id == employee_id
+    ).order_by(EmployeeGoal.created_on.desc()).all()
+    
+    result = {
+        "goals": [],
+        "strengths": [],
+        "improvements": []
+    }
+    
+    for goal in goals:
+        goal_data = {
+            "id": goal.id,
+            "title": goal.title,
+            "description": goal.description,
+            "target_date": goal.target_date.isoformat() if goal.target_date else None,
+            "status": goal.status,
+            "progress": goal.progress,
+            "created_by": goal.created_by,
+            "created_on": goal.created_on.isoformat() if goal.created_on else None
         }
         
-        for goal in goals:
-            goal_data = {
-                "id": goal.id,
-                "title": goal.title,
-                "description": goal.description,
-                "target_date": goal.target_date.isoformat() if goal.target_date else None,
-                "status": goal.status,
-                "progress": goal.progress,
-                "created_by": goal.created_by,
-                "created_on": goal.created_on.isoformat() if goal.created_on else None
-            }
-            
-            if goal.goal_type == "goal":
-                result["goals"].append(goal_data)
-            elif goal.goal_type == "strength":
-                result["strengths"].append(goal_data)
-            elif goal.goal_type == "improvement":
-                result["improvements"].append(goal_data)
-        
-        return result
-    finally:
-        db.close()
+        if goal.goal_type == "goal":
+            result["goals"].append(goal_data)
+        elif goal.goal_type == "strength":
+            result["strengths"].append(goal_data)
+        elif goal.goal_type == "improvement":
+            result["improvements"].append(goal_data)
+    
+    return result
 
 
 @app.post("/employees/{employee_id}/goals")
-def create_employee_goal(employee_id: str, goal: GoalCreate):
+def create_employee_goal(employee_id: str, goal: GoalCreate, db: Session = Depends(get_db)):
     """Create a new goal, strength, or improvement"""
-    db: Session = SessionLocal()
     try:
         employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
         if not employee:
@@ -4310,14 +4162,11 @@ def create_employee_goal(employee_id: str, goal: GoalCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.put("/goals/{goal_id}")
-def update_goal(goal_id: int, updates: GoalUpdate):
+def update_goal(goal_id: int, updates: GoalUpdate, db: Session = Depends(get_db)):
     """Update a goal"""
-    db: Session = SessionLocal()
     try:
         goal = db.query(EmployeeGoal).filter(EmployeeGoal.id == goal_id).first()
         
@@ -4325,9 +4174,9 @@ def update_goal(goal_id: int, updates: GoalUpdate):
             raise HTTPException(status_code=404, detail="Goal not found")
         
         update_data = updates.dict(exclude_unset=True)
-        for field, value in update_data.items():
+        for field_name, value in update_data.items():
             if value is not None:
-                setattr(goal, field, value)
+                setattr(goal, field_name, value)
         
         goal.updated_on = datetime.utcnow()
         db.commit()
@@ -4338,191 +4187,167 @@ def update_goal(goal_id: int, updates: GoalUpdate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.delete("/goals/{goal_id}")
-def delete_goal(goal_id: int):
+def delete_goal(goal_id: int, db: Session = Depends(get_db)):
     """Delete a goal"""
-    db: Session = SessionLocal()
-    try:
-        goal = db.query(EmployeeGoal).filter(EmployeeGoal.id == goal_id).first()
-        
-        if not goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        
-        db.delete(goal)
-        db.commit()
-        
-        return {"message": "Goal deleted successfully"}
-    finally:
-        db.close()
+    goal = db.query(EmployeeGoal).filter(EmployeeGoal.id == goal_id).first()
+    
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    db.delete(goal)
+    db.commit()
+    
+    return {"message": "Goal deleted successfully"}
 
 
 # ===== REVIEW ENDPOINTS =====
 
 @app.get("/employees/{employee_id}/reportees")
-def get_employee_reportees(employee_id: str):
+def get_employee_reportees(employee_id: str, db: Session = Depends(get_db)):
     """Get direct and indirect reportees for a lead/manager"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-
-        # Find direct reportees - employees where this person is the lead
-        direct_reportees = db.query(Employee).filter(
-            Employee.lead.ilike(f"%{employee.name}%"),
-            Employee.is_active == True,
-            Employee.employee_id != employee.employee_id  # Exclude self
-        ).order_by(Employee.name).all()
-        
-        # Find indirect reportees - employees where this person is the manager but NOT the lead
-        indirect_reportees = db.query(Employee).filter(
-            Employee.manager.ilike(f"%{employee.name}%"),
-            ~Employee.lead.ilike(f"%{employee.name}%"),  # Not already a direct reportee
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    # Find direct reportees - employees where this person is the lead
+    direct_reportees = db.query(Employee).filter(
+        Employee.lead.ilike(f"%{employee.name}%"),
+        Employee.is_active == True,
+        Employee.employee_id != employee.employee_id  # Exclude self
+    ).order_by(Employee.name).all()
+    
+    # Find indirect reportees - employees where this person is the manager but NOT the lead
+    indirect_reportees = db.query(Employee).filter(
+        Employee.manager.ilike(f"%{employee.name}%"),
+        ~Employee.lead.ilike(f"%{employee.name}%"),  # Not already a direct reportee
+        Employee.is_active == True,
+        Employee.employee_id != employee.employee_id  # Exclude self
+    ).order_by(Employee.name).all()
+    
+    # Also get employees reporting to the direct reportees (for managers)
+    # These are people whose lead reports to this manager
+    manager_indirect = []
+    for direct in direct_reportees:
+        # Find people who report to this direct reportee
+        sub_reportees = db.query(Employee).filter(
+            Employee.lead.ilike(f"%{direct.name}%"),
             Employee.is_active == True,
-            Employee.employee_id != employee.employee_id  # Exclude self
-        ).order_by(Employee.name).all()
-        
-        # Also get employees reporting to the direct reportees (for managers)
-        # These are people whose lead reports to this manager
-        manager_indirect = []
-        for direct in direct_reportees:
-            # Find people who report to this direct reportee
-            sub_reportees = db.query(Employee).filter(
-                Employee.lead.ilike(f"%{direct.name}%"),
-                Employee.is_active == True,
-                Employee.employee_id != direct.employee_id
-            ).all()
-            for sub in sub_reportees:
-                if sub.employee_id not in [d.employee_id for d in direct_reportees]:
-                    if sub.employee_id not in [m.employee_id for m in manager_indirect]:
-                        manager_indirect.append(sub)
-        
-        return {
-            "direct_reportees": [{
-                "employee_id": emp.employee_id,
-                "name": emp.name,
-                "role": emp.role,
-                "team": emp.team,
-                "email": emp.email,
-                "category": emp.category
-            } for emp in direct_reportees],
-            "indirect_reportees": [{
-                "employee_id": emp.employee_id,
-                "name": emp.name,
-                "role": emp.role,
-                "team": emp.team,
-                "email": emp.email,
-                "category": emp.category,
-                "reports_to": emp.lead
-            } for emp in indirect_reportees + manager_indirect],
-            "total_direct": len(direct_reportees),
-            "total_indirect": len(indirect_reportees) + len(manager_indirect)
-        }
-    finally:
-        db.close()
+            Employee.employee_id != direct.employee_id
+        ).all()
+        for sub in sub_reportees:
+            if sub.employee_id not in [d.employee_id for d in direct_reportees]:
+                if sub.employee_id not in [m.employee_id for m in manager_indirect]:
+                    manager_indirect.append(sub)
+    
+    return {
+        "direct_reportees": [{
+            "employee_id": emp.employee_id,
+            "name": emp.name,
+            "role": emp.role,
+            "team": emp.team,
+            "email": emp.email,
+            "category": emp.category
+        } for emp in direct_reportees],
+        "indirect_reportees": [{
+            "employee_id": emp.employee_id,
+            "name": emp.name,
+            "role": emp.role,
+            "team": emp.team,
+            "email": emp.email,
+            "category": emp.category,
+            "reports_to": emp.lead
+        } for emp in indirect_reportees + manager_indirect],
+        "total_direct": len(direct_reportees),
+        "total_indirect": len(indirect_reportees) + len(manager_indirect)
+    }
 
 
 @app.get("/team-leads")
-def get_team_leads():
+def get_team_leads(db: Session = Depends(get_db)):
     """Get DEV Lead and QA Lead information"""
-    db: Session = SessionLocal()
-    try:
-        # Find DEV Lead (role contains LEAD and team is DEVELOPMENT)
-        dev_lead = db.query(Employee).filter(
-            func.upper(Employee.role).like("%LEAD%"),
-            func.upper(Employee.team) == "DEVELOPMENT",
-            Employee.is_active == True
-        ).first()
-        
-        # Find QA Lead/Manager (role contains QA and (MANAGER or LEAD) and team is QA)
-        qa_lead = db.query(Employee).filter(
-            or_(
-                func.upper(Employee.role).like("%QA%MANAGER%"),
-                func.upper(Employee.role).like("%QA%LEAD%")
-            ),
-            func.upper(Employee.team) == "QA",
-            Employee.is_active == True
-        ).first()
-        
-        result = {}
-        
-        if dev_lead:
-            result["dev_lead"] = {
-                "employee_id": dev_lead.employee_id,
-                "name": dev_lead.name,
-                "email": dev_lead.email,
-                "role": dev_lead.role
-            }
-        else:
-            result["dev_lead"] = None
-            
-        if qa_lead:
-            result["qa_lead"] = {
-                "employee_id": qa_lead.employee_id,
-                "name": qa_lead.name,
-                "email": qa_lead.email,
-                "role": qa_lead.role
-            }
-        else:
-            result["qa_lead"] = None
-        
-        return result
-    finally:
-        db.close()
+    # Find DEV Lead (role contains LEAD and team is DEVELOPMENT)
+    dev_lead = db.query(Employee).filter(
+        func.upper(Employee.role).like("%LEAD%"),
+        func.upper(Employee.team) == "DEVELOPMENT",
+        Employee.is_active == True
+    ).first()
+    
+    # Find QA Lead/Manager (role contains QA and (MANAGER or LEAD) and team is QA)
+    qa_lead = db.query(Employee).filter(
+        or_(
+            func.upper(Employee.role).like("%QA%MANAGER%"),
+            func.upper(Employee.role).like("%QA%LEAD%")
+        ),
+        func.upper(Employee.team) == "QA",
+        Employee.is_active == True
+    ).first()
+    
+    result = {}
+    
+    if dev_lead:
+        result["dev_lead"] = {
+            "employee_id": dev_lead.employee_id,
+            "name": dev_lead.name,
+            "email": dev_lead.email,
+            "role": dev_lead.role
+        }
+    else:
+        result["dev_lead"] = None
+        
+    if qa_lead:
+        result["qa_lead"] = {
+            "employee_id": qa_lead.employee_id,
+            "name": qa_lead.name,
+            "email": qa_lead.email,
+            "role": qa_lead.role
+        }
+    else:
+        result["qa_lead"] = None
+    
+    return result
 
 
 @app.get("/employees/{employee_id}/reviews")
-def get_employee_reviews(employee_id: str):
+def get_employee_reviews(employee_id: str, db: Session = Depends(get_db)):
     """Get all reviews for an employee"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+    employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
 
-        reviews = db.query(EmployeeReview).filter(
-            EmployeeReview.employee_id == employee_id
-        ).order_by(EmployeeReview.review_date.desc()).all()
-        
-        return [
-            {
-                "id": r.id,
-                "review_period": r.review_period,
-                "review_date": r.review_date.isoformat() if r.review_date else None,
-                "rag_status": r.rag_status,
-                "rag_score": r.rag_score,
-                "technical_rating": r.technical_rating,
-                "productivity_rating": r.productivity_rating,
-                "quality_rating": r.quality_rating,
-                "communication_rating": r.communication_rating,
-                "overall_rating": r.overall_rating,
-                "strengths_summary": r.strengths_summary,
-                "improvements_summary": r.improvements_summary,
-                "manager_comments": r.manager_comments,
-                "recommendation": r.recommendation,
-                "salary_hike_percent": r.salary_hike_percent,
-                "reviewed_by": r.reviewed_by
-            }
-            for r in reviews
-        ]
-    finally:
-        db.close()
+    reviews = db.query(EmployeeReview).filter(
+        EmployeeReview.employee_id == employee_id
+    ).order_by(EmployeeReview.review_date.desc()).all()
+    
+    return [
+        {
+            "id": r.id,
+            "review_period": r.review_period,
+            "review_date": r.review_date.isoformat() if r.review_date else None,
+            "rag_status": r.rag_status,
+            "rag_score": r.rag_score,
+            "technical_rating": r.technical_rating,
+            "productivity_rating": r.productivity_rating,
+            "quality_rating": r.quality_rating,
+            "communication_rating": r.communication_rating,
+            "overall_rating": r.overall_rating,
+            "strengths_summary": r.strengths_summary,
+            "improvements_summary": r.improvements_summary,
+            "manager_comments": r.manager_comments,
+            "recommendation": r.recommendation,
+            "salary_hike_percent": r.salary_hike_percent,
+            "reviewed_by": r.reviewed_by
+        }
+        for r in reviews
+    ]
 
 
 @app.post("/employees/{employee_id}/reviews")
-def create_employee_review(employee_id: str, review: ReviewCreate):
+def create_employee_review(employee_id: str, review: ReviewCreate, db: Session = Depends(get_db)):
     """Create a new performance review"""
-    db: Session = SessionLocal()
     try:
         # Calculate overall rating
         overall = (review.technical_rating + review.productivity_rating + 
@@ -4570,14 +4395,11 @@ def create_employee_review(employee_id: str, review: ReviewCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.put("/reviews/{review_id}")
-def update_review(review_id: int, review: ReviewCreate):
+def update_review(review_id: int, review: ReviewCreate, db: Session = Depends(get_db)):
     """Update a performance review"""
-    db: Session = SessionLocal()
     try:
         existing = db.query(EmployeeReview).filter(EmployeeReview.id == review_id).first()
         
@@ -4610,16 +4432,59 @@ def update_review(review_id: int, review: ReviewCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 # ===== KPI MANAGEMENT ENDPOINTS =====
 
+# Overall KPI rating labels; a score at or above OVERALL_RATING_THRESHOLDS[i] earns OVERALL_RATING_LABELS[i + 1]
+OVERALL_RATING_THRESHOLDS = (50, 60, 70, 80, 90)
+OVERALL_RATING_LABELS = ("Poor", "Needs Improvement", "Satisfactory", "Good", "Excellent", "Outstanding")
+
+# Serialized /kpis responses keyed by (role, team); cleared whenever the KPI matrix is imported
+KPI_LIST_CACHE = TTLCache(maxsize=64, ttl=60)
+KPI_LIST_CACHE_LOCK = threading.Lock()
+
+# KPIRating columns returned for each KPI by the kpi-ratings endpoint
+KPI_RATING_RESPONSE_COLUMNS = (
+    KPIRating.rating,
+    KPIRating.self_rating,
+    KPIRating.lead_rating,
+    KPIRating.manager_rating,
+    KPIRating.performance_score,
+    KPIRating.performance_percentage,
+    KPIRating.final_score,
+    KPIRating.self_comments,
+    KPIRating.lead_comments,
+    KPIRating.manager_comments,
+    KPIRating.rated_by,
+    KPIRating.rated_on
+)
+
+
+def employee_kpi_filters(employee: Employee) -> list:
+    """Filters selecting the active KPIs that apply to an employee's role and team"""
+    # Normalize role for comparison (uppercase)
+    filters = [
+        KPI.is_active == True,
+        KPI.role_norm == employee.role.upper().strip()
+    ]
+    
+    # Filter by team: match exact team OR if KPI.team is None (applies to all teams)
+    if employee.team:
+        filters.append(or_(
+            KPI.team_norm == employee.team.upper().strip(),
+            KPI.team.is_(None)
+        ))
+    else:
+        # If employee has no team, only show KPIs with no team specified
+        filters.append(KPI.team.is_(None))
+    
+    return filters
+
+
 @app.post("/kpis/import")
-async def import_kpi_matrix(file: UploadFile = File(...)):
+async def import_kpi_matrix(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """Import KPI matrix from Excel file with multiple sheets (one per role)"""
-    db: Session = SessionLocal()
     try:
         import openpyxl
         import re
@@ -4630,8 +4495,10 @@ async def import_kpi_matrix(file: UploadFile = File(...)):
             tmp_file.write(content)
             tmp_path = tmp_file.name
         
+        workbook = None
         try:
-            workbook = openpyxl.load_workbook(tmp_path)
+            # Read-only mode streams rows instead of building the whole workbook in memory
+            workbook = openpyxl.load_workbook(tmp_path, read_only=True, data_only=True)
             
             # Map sheet names to role names (normalize to match database)
             role_mapping = {
@@ -4755,6 +4622,8 @@ async def import_kpi_matrix(file: UploadFile = File(...)):
                 })
             
             db.commit()
+            with KPI_LIST_CACHE_LOCK:
+                KPI_LIST_CACHE.clear()
             
             return {
                 "message": "KPI matrix imported successfully",
@@ -4765,6 +4634,8 @@ async def import_kpi_matrix(file: UploadFile = File(...)):
                 "sheet_details": sheet_summary
             }
         finally:
+            if workbook is not None:
+                workbook.close()
             os.unlink(tmp_path)
             
     except Exception as e:
@@ -4772,246 +4643,173 @@ async def import_kpi_matrix(file: UploadFile = File(...)):
         import traceback
         error_detail = f"Error importing KPI matrix: {str(e)}\n{traceback.format_exc()}"
         raise HTTPException(status_code=500, detail=error_detail)
-    finally:
-        db.close()
 
 
-@app.get("/kpis")
-def list_kpis(role: Optional[str] = None, team: Optional[str] = None):
+@app.get("/kpis", response_class=ORJSONResponse)
+def list_kpis(role: Optional[str] = None, team: Optional[str] = None, db: Session = Depends(get_db)):
     """Get all KPIs, optionally filtered by role and team"""
-    db: Session = SessionLocal()
-    try:
-        query = db.query(KPI).filter(KPI.is_active == True)
-        
-        if role:
-            query = query.filter(KPI.role == role)
-        if team:
-            query = query.filter(KPI.team == team)
-        
-        kpis = query.order_by(KPI.category, KPI.kpi_name).all()
-        
-        return [{
-            "id": k.id,
-            "kpi_code": k.kpi_code,
-            "kpi_name": k.kpi_name,
-            "description": k.description,
-            "role": k.role,
-            "team": k.team,
-            "category": k.category,
-            "weight": k.weight
-        } for k in kpis]
-    finally:
-        db.close()
+    cache_key = (role, team)
+    with KPI_LIST_CACHE_LOCK:
+        cached = KPI_LIST_CACHE.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    stmt = select(
+        KPI.id, KPI.kpi_code, KPI.kpi_name, KPI.description,
+        KPI.role, KPI.team, KPI.category, KPI.weight
+    ).where(KPI.is_active == True)
+    
+    if role:
+        stmt = stmt.where(KPI.role == role)
+    if team:
+        stmt = stmt.where(KPI.team == team)
+    
+    stmt = stmt.order_by(KPI.category, KPI.kpi_name)
+    
+    content = orjson.dumps([dict(k) for k in db.execute(stmt).mappings()])
+    with KPI_LIST_CACHE_LOCK:
+        KPI_LIST_CACHE[cache_key] = content
+    
+    return Response(content=content, media_type="application/json")
 
 
 @app.get("/employees/{employee_id}/kpis")
-def get_employee_kpis(employee_id: str):
+def get_employee_kpis(employee_id: str, db: Session = Depends(get_db)):
     """Get all KPIs applicable to an employee based on their role and team"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
 
-        if not employee.role:
-            return []  # No role means no KPIs
-        
-        # Normalize role for comparison (uppercase)
-        employee_role = employee.role.upper().strip()
-        
-        # Get KPIs that match the employee's role exactly (case-insensitive)
-        query = db.query(KPI).filter(
-            KPI.is_active == True,
-            func.upper(func.trim(KPI.role)) == employee_role
-        )
-        
-        # Filter by team: match exact team OR if KPI.team is None (applies to all teams)
-        if employee.team:
-            # Normalize team for comparison (uppercase)
-            employee_team = employee.team.upper().strip()
-            query = query.filter(
-                or_(
-                    func.upper(func.trim(KPI.team)) == employee_team,
-                    KPI.team.is_(None)
-                )
-            )
-        else:
-            # If employee has no team, only show KPIs with no team specified
-            query = query.filter(KPI.team.is_(None))
-        
-        kpis = query.order_by(KPI.category, KPI.kpi_name).all()
-        
-        return [{
-            "id": k.id,
-            "kpi_code": k.kpi_code,
-            "kpi_name": k.kpi_name,
-            "description": k.description,
-            "category": k.category,
-            "weight": k.weight
-        } for k in kpis]
-    finally:
-        db.close()
+    if not employee.role:
+        return []  # No role means no KPIs
+    
+    # Get KPIs that match the employee's role and team
+    stmt = select(
+        KPI.id, KPI.kpi_code, KPI.kpi_name, KPI.description, KPI.category, KPI.weight
+    ).where(*employee_kpi_filters(employee)).order_by(KPI.category, KPI.kpi_name)
+    
+    return [dict(k) for k in db.execute(stmt).mappings()]
 
 
-@app.get("/employees/{employee_id}/kpi-ratings")
-def get_employee_kpi_ratings(employee_id: str, quarter: Optional[str] = None):
+@app.get("/employees/{employee_id}/kpi-ratings", response_class=ORJSONResponse)
+def get_employee_kpi_ratings(employee_id: str, quarter: Optional[str] = None, db: Session = Depends(get_db)):
     """Get KPI ratings for an employee, optionally filtered by quarter"""
-    db: Session = SessionLocal()
-    try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
+    employee = find_employee(db, employee_id)
+    
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    # Get current year and quarter if not specified
+    if not quarter:
+        now = datetime.now()
+        year = now.year
+        quarter_num = (now.month - 1) // 3 + 1
+        quarter = f"{year}-Q{quarter_num}"
+    
+    # Get all KPIs for this employee - match role and team exactly
+    if not employee.role:
+        return {"kpis": [], "quarter": quarter}
+    
+    kpi_filters = employee_kpi_filters(employee)
+    
+    kpis = db.execute(
+        select(
+            KPI.id.label("kpi_id"), KPI.kpi_code, KPI.kpi_name,
+            KPI.description, KPI.category, KPI.weight
+        ).where(*kpi_filters).order_by(KPI.category, KPI.kpi_name)
+    ).mappings().all()
+    
+    # Get ratings for this quarter
+    ratings = {
+        r["kpi_id"]: r
+        for r in db.execute(
+            select(KPIRating.kpi_id, *KPI_RATING_RESPONSE_COLUMNS).where(
+                KPIRating.employee_id == employee.employee_id,
+                KPIRating.quarter == quarter
             )
-        ).first()
-        
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-
-        # Get current year and quarter if not specified
-        if not quarter:
-            now = datetime.now()
-            year = now.year
-            quarter_num = (now.month - 1) // 3 + 1
-            quarter = f"{year}-Q{quarter_num}"
-        
-        # Get all KPIs for this employee - match role and team exactly
-        if not employee.role:
-            return {"kpis": [], "quarter": quarter}
-        
-        # Normalize role for comparison (uppercase)
-        employee_role = employee.role.upper().strip()
-        
-        query = db.query(KPI).filter(
-            KPI.is_active == True,
-            func.upper(func.trim(KPI.role)) == employee_role
-        )
-        
-        # Filter by team: match exact team OR if KPI.team is None (applies to all teams)
-        if employee.team:
-            # Normalize team for comparison (uppercase)
-            employee_team = employee.team.upper().strip()
-            query = query.filter(
-                or_(
-                    func.upper(func.trim(KPI.team)) == employee_team,
-                    KPI.team.is_(None)
-                )
+        ).mappings()
+    }
+    
+    # Score for each KPI (use manager_rating if available, else performance_score, else final_score, else 0)
+    # Manager ratings and final scores on a 1-5 scale are converted to a percentage (1=20%, 5=100%)
+    kpi_score = case(
+        (KPIRating.manager_rating.isnot(None), KPIRating.manager_rating / 5.0 * 100),
+        (KPIRating.performance_score.isnot(None), KPIRating.performance_score),
+        (KPIRating.final_score <= 5, KPIRating.final_score / 5.0 * 100),
+        (KPIRating.final_score.isnot(None), KPIRating.final_score),
+        else_=0.0
+    )
+    is_rated = kpi_score > 0
+    
+    # Calculate overall weighted score in the database
+    total_weighted_score, total_weight, rated_kpis_count = db.execute(
+        select(
+            func.coalesce(func.sum(case((is_rated, kpi_score * KPI.weight))), 0.0),
+            func.coalesce(func.sum(case((is_rated, KPI.weight))), 0.0),
+            func.count(case((is_rated, KPI.id)))
+        ).select_from(KPI).outerjoin(
+            KPIRating,
+            and_(
+                KPIRating.kpi_id == KPI.id,
+                KPIRating.employee_id == employee.employee_id,
+                KPIRating.quarter == quarter
             )
-        else:
-            # If employee has no team, only show KPIs with no team specified
-            query = query.filter(KPI.team.is_(None))
-        
-        kpis = query.order_by(KPI.category, KPI.kpi_name).all()
-        
-        # Get ratings for this quarter
-        ratings_query = db.query(KPIRating).filter(
-            KPIRating.employee_id == employee.employee_id,
-            KPIRating.quarter == quarter
-        )
-        ratings = {r.kpi_id: r for r in ratings_query.all()}
-        
-        # Calculate overall weighted score
-        total_weighted_score = 0.0
-        total_weight = 0.0
-        rated_kpis_count = 0
-        
-        result = []
-        for kpi in kpis:
-            rating = ratings.get(kpi.id)
-            
-            # Calculate score for this KPI (use manager_rating if available, else performance_score, else 0)
-            kpi_score = 0.0
-            if rating:
-                if rating.manager_rating is not None:
-                    # Convert 1-5 scale to percentage (1=20%, 5=100%)
-                    kpi_score = (rating.manager_rating / 5.0) * 100
-                elif rating.performance_score is not None:
-                    kpi_score = rating.performance_score
-                elif rating.final_score is not None:
-                    kpi_score = (rating.final_score / 5.0) * 100 if rating.final_score <= 5 else rating.final_score
-                
-                if kpi_score > 0:
-                    total_weighted_score += kpi_score * kpi.weight
-                    total_weight += kpi.weight
-                    rated_kpis_count += 1
-            
-            result.append({
-                "kpi_id": kpi.id,
-                "kpi_code": kpi.kpi_code,
-                "kpi_name": kpi.kpi_name,
-                "description": kpi.description,
-                "category": kpi.category,
-                "weight": kpi.weight,
-                "rating": rating.rating if rating else None,
-                "self_rating": rating.self_rating if rating else None,
-                "lead_rating": rating.lead_rating if rating else None,
-                "manager_rating": rating.manager_rating if rating else None,
-                "performance_score": rating.performance_score if rating else None,
-                "performance_percentage": rating.performance_percentage if rating else None,
-                "final_score": rating.final_score if rating else None,
-                "self_comments": rating.self_comments if rating else None,
-                "lead_comments": rating.lead_comments if rating else None,
-                "manager_comments": rating.manager_comments if rating else None,
-                "rated_by": rating.rated_by if rating else None,
-                "rated_on": rating.rated_on.isoformat() if rating and rating.rated_on else None
-            })
-        
-        # Calculate overall weighted average
-        overall_score = 0.0
-        overall_rating_label = "Not Rated"
-        
-        if total_weight > 0 and rated_kpis_count > 0:
-            overall_score = total_weighted_score / total_weight
-            
-            # Determine rating label based on score
-            if overall_score >= 90:
-                overall_rating_label = "Outstanding"
-            elif overall_score >= 80:
-                overall_rating_label = "Excellent"
-            elif overall_score >= 70:
-                overall_rating_label = "Good"
-            elif overall_score >= 60:
-                overall_rating_label = "Satisfactory"
-            elif overall_score >= 50:
-                overall_rating_label = "Needs Improvement"
-            else:
-                overall_rating_label = "Poor"
+        ).where(*kpi_filters)
+    ).one()
+    
+    result = []
+    for kpi in kpis:
+        rating = ratings.get(kpi["kpi_id"])
+        
+        item = dict(kpi)
+        for column in KPI_RATING_RESPONSE_COLUMNS:
+            item[column.key] = rating[column.key] if rating else None
+        result.append(item)
+    
+    # Calculate overall weighted average
+    overall_score = 0.0
+    overall_rating_label = "Not Rated"
+    
+    if total_weight > 0 and rated_kpis_count > 0:
+        overall_score = total_weighted_score / total_weight
         
-        return {
-            "employee_id": employee.employee_id,
-            "employee_name": employee.name,
-            "role": employee.role,
-            "quarter": quarter,
-            "kpis": result,
-            "overall_score": round(overall_score, 2),
-            "overall_rating": overall_rating_label,
-            "rated_kpis_count": rated_kpis_count,
-            "total_kpis_count": len(kpis)
-        }
-    finally:
-        db.close()
+        # Determine rating label based on score
+        overall_rating_label = OVERALL_RATING_LABELS[bisect.bisect_right(OVERALL_RATING_THRESHOLDS, overall_score)]
+    
+    return ORJSONResponse({
+        "employee_id": employee.employee_id,
+        "employee_name": employee.name,
+        "role": employee.role,
+        "quarter": quarter,
+        "kpis": result,
+        "overall_score": round(overall_score, 2),
+        "overall_rating": overall_rating_label,
+        "rated_kpis_count": rated_kpis_count,
+        "total_kpis_count": len(kpis)
+    })
+
+
+# KPIRating (and KPIRatingCreate) rating/comments fields written by each kind of rater
+RATER_FIELDS = {
+    "self": ("self_rating", "self_comments"),
+    "lead": ("lead_rating", "lead_comments"),
+    "manager": ("manager_rating", "manager_comments")
+}
+
+# Rater whose fields are mirrored when an employee's lead and manager are the same person
+MIRRORED_RATERS = {"lead": "manager", "manager": "lead"}
 
 
 @app.post("/employees/{employee_id}/kpi-ratings")
 def submit_kpi_ratings(
     employee_id: str,
-    ratings: List[KPIRatingCreate]
+    ratings: List[KPIRatingCreate],
+    db: Session = Depends(get_db)
 ):
     """Submit KPI ratings for an employee for a quarter"""
-    db: Session = SessionLocal()
     try:
-        employee = db.query(Employee).filter(
-            or_(
-                Employee.employee_id == employee_id,
-                Employee.id == int(employee_id) if employee_id.isdigit() else False
-            )
-        ).first()
+        employee = find_employee(db, employee_id)
         
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -5021,8 +4819,16 @@ def submit_kpi_ratings(
         if not quarter:
             raise HTTPException(status_code=400, detail="Quarter is required")
         
-        year = int(quarter.split('-')[0])
-        quarter_num = int(quarter.split('-Q')[1])
+        year, quarter_num, start_date, end_date = _quarter_bounds(quarter)
+        
+        # Determine if lead and manager are the same person
+        is_lead_manager_same = bool(
+            employee.lead and employee.manager
+            and employee.lead.strip().upper() == employee.manager.strip().upper()
+        )
+        
+        # Performance scores computed so far in this request, keyed by (employee_id, kpi_id, quarter)
+        performance_scores = {}
         
         submitted_count = 0
         
@@ -5040,9 +4846,12 @@ def submit_kpi_ratings(
             ).first()
             
             # Calculate performance score from actual metrics
-            performance_score = calculate_kpi_performance_score(
-                db, employee, kpi, quarter
-            )
+            score_key = (employee.employee_id, kpi.id, quarter)
+            if score_key not in performance_scores:
+                performance_scores[score_key] = calculate_kpi_performance_score(
+                    db, employee, kpi, start_date, end_date
+                )
+            performance_score = performance_scores[score_key]
             
             # Calculate final score (use manager rating if provided, otherwise performance score)
             final_score = None
@@ -5051,30 +4860,36 @@ def submit_kpi_ratings(
             elif performance_score is not None:
                 final_score = performance_score
             
-            # Determine if lead and manager are the same person
-            is_lead_manager_same = employee.lead and employee.manager and employee.lead.strip().upper() == employee.manager.strip().upper()
-            
             # Update or create rating based on who is rating
             if existing:
-                # Update existing - only update the field for the current rater
-                if rating_data.rated_by == "self":
-                    existing.self_rating = rating_data.self_rating
-                    existing.self_comments = rating_data.self_comments
-                elif rating_data.rated_by == "lead":
-                    existing.lead_rating = rating_data.lead_rating
-                    existing.lead_comments = rating_data.lead_comments
-                    # If lead and manager are same, also update manager fields
-                    if is_lead_manager_same:
-                        existing.manager_rating = rating_data.lead_rating
-                        existing.manager_comments = rating_data.lead_comments
-                elif rating_data.rated_by == "manager":
-                    existing.manager_rating = rating_data.manager_rating
-                    existing.manager_comments = rating_data.manager_comments
-                    # If lead and manager are same, also update lead fields
-                    if is_lead_manager_same:
-                        existing.lead_rating = rating_data.manager_rating
-                        existing.lead_comments = rating_data.manager_comments
+                target = existing
+            else:
+                target = KPIRating(
+                    employee_id=employee.employee_id,
+                    kpi_id=rating_data.kpi_id,
+                    quarter=quarter,
+                    year=year,
+                    quarter_number=quarter_num,
+                    rating=rating_data.rating  # Backward compatibility
+                )
+            
+            # Only update the fields for the current rater
+            rater_fields = RATER_FIELDS.get(rating_data.rated_by)
+            if rater_fields:
+                rating_field, comments_field = rater_fields
+                rating_value = getattr(rating_data, rating_field)
+                comments_value = getattr(rating_data, comments_field)
+                setattr(target, rating_field, rating_value)
+                setattr(target, comments_field, comments_value)
                 
+                # If lead and manager are same, also update the other one's fields
+                mirrored_rater = MIRRORED_RATERS.get(rating_data.rated_by)
+                if is_lead_manager_same and mirrored_rater:
+                    mirrored_rating_field, mirrored_comments_field = RATER_FIELDS[mirrored_rater]
+                    setattr(target, mirrored_rating_field, rating_value)
+                    setattr(target, mirrored_comments_field, comments_value)
+            
+            if existing:
                 # Keep backward compatibility
                 if rating_data.rating is not None:
                     existing.rating = rating_data.rating
@@ -5082,39 +4897,14 @@ def submit_kpi_ratings(
                     existing.manager_rating = rating_data.manager_rating
                 if rating_data.manager_comments is not None:
                     existing.manager_comments = rating_data.manager_comments
-                
-                existing.performance_score = performance_score
-                existing.final_score = final_score
-                existing.rated_by = rating_data.rated_by
                 existing.rated_on = datetime.now()
-            else:
-                # Create new
-                new_rating = KPIRating(
-                    employee_id=employee.employee_id,
-                    kpi_id=rating_data.kpi_id,
-                    quarter=quarter,
-                    year=year,
-                    quarter_number=quarter_num,
-                    rating=rating_data.rating,  # Backward compatibility
-                    self_rating=rating_data.self_rating if rating_data.rated_by == "self" else None,
-                    lead_rating=rating_data.lead_rating if rating_data.rated_by == "lead" else None,
-                    manager_rating=rating_data.manager_rating if rating_data.rated_by == "manager" else None,
-                    self_comments=rating_data.self_comments if rating_data.rated_by == "self" else None,
-                    lead_comments=rating_data.lead_comments if rating_data.rated_by == "lead" else None,
-                    manager_comments=rating_data.manager_comments if rating_data.rated_by == "manager" else None,
-                    performance_score=performance_score,
-                    final_score=final_score,
-                    rated_by=rating_data.rated_by
-                )
-                # If lead and manager are same, copy lead rating to manager
-                if is_lead_manager_same and rating_data.rated_by == "lead":
-                    new_rating.manager_rating = rating_data.lead_rating
-                    new_rating.manager_comments = rating_data.lead_comments
-                elif is_lead_manager_same and rating_data.rated_by == "manager":
-                    new_rating.lead_rating = rating_data.manager_rating
-                    new_rating.lead_comments = rating_data.manager_comments
-                
-                db.add(new_rating)
+            
+            target.performance_score = performance_score
+            target.final_score = final_score
+            target.rated_by = rating_data.rated_by
+            
+            if not existing:
+                db.add(target)
             
             submitted_count += 1
         
@@ -5130,13 +4920,11 @@ def submit_kpi_ratings(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
-def calculate_kpi_performance_score(db: Session, employee: Employee, kpi: KPI, quarter: str) -> Optional[float]:
-    """Calculate performance score for a KPI based on actual metrics"""
-    # Parse quarter to get date range
+@lru_cache(maxsize=256)
+def _quarter_bounds(quarter: str) -> tuple:
+    """Parse a quarter like "2025-Q1" into (year, quarter_num, start_date, end_date), end exclusive"""
     year = int(quarter.split('-')[0])
     quarter_num = int(quarter.split('-Q')[1])
     start_month = (quarter_num - 1) * 3 + 1
@@ -5147,6 +4935,11 @@ def calculate_kpi_performance_score(db: Session, employee: Employee, kpi: KPI, q
     else:
         end_date = datetime(year, start_month + 3, 1)
     
+    return year, quarter_num, start_date, end_date
+
+
+def calculate_kpi_performance_score(db: Session, employee: Employee, kpi: KPI, start_date: datetime, end_date: datetime) -> Optional[float]:
+    """Calculate performance score for a KPI based on actual metrics within [start_date, end_date)"""
     # This is a placeholder - implement actual calculation based on KPI code
     # You can implement specific calculations based on kpi.kpi_code
     # Example: If KPI is about bug closure rate, calculate from actual bugs
@@ -5156,7 +4949,54 @@ def calculate_kpi_performance_score(db: Session, employee: Employee, kpi: KPI, q
 
 # ===== STATUS HISTORY ENDPOINTS =====
 
-@app.get("/status-history/tickets")
+HISTORY_STREAM_BATCH_SIZE = 500
+
+
+def stream_json_array(db: Session, stmt, batch_size: int = HISTORY_STREAM_BATCH_SIZE, key: Optional[str] = None):
+    """
+    Yield a JSON array of the row mappings returned by stmt, fetched in batches
+    through a server-side cursor; with key, the array is wrapped as {key: [...]}.
+    Closes the session once the stream is exhausted.
+    """
+    opening, closing = (b"[", b"]") if key is None else (b"{" + orjson.dumps(key) + b":[", b"]}")
+    try:
+        yield opening
+        first = True
+        result = db.execute(stmt.execution_options(yield_per=batch_size)).mappings()
+        for rows in result.partitions():
+            yield (b"" if first else b",") + b",".join(orjson.dumps(dict(row)) for row in rows)
+            first = False
+        yield closing
+    finally:
+        db.close()
+
+
+TICKET_STATUS_HISTORY_COLUMNS = (
+    TicketStatusHistory.id,
+    TicketStatusHistory.ticket_id,
+    TicketStatusHistory.previous_status,
+    TicketStatusHistory.new_status,
+    TicketStatusHistory.changed_on,
+    TicketStatusHistory.current_assignee,
+    TicketStatusHistory.qc_tester,
+    TicketStatusHistory.duration_in_previous_status,
+    TicketStatusHistory.source
+)
+
+BUG_STATUS_HISTORY_COLUMNS = (
+    BugStatusHistory.id,
+    BugStatusHistory.bug_id,
+    BugStatusHistory.ticket_id,
+    BugStatusHistory.previous_status,
+    BugStatusHistory.new_status,
+    BugStatusHistory.changed_on,
+    BugStatusHistory.assignee,
+    BugStatusHistory.duration_in_previous_status,
+    BugStatusHistory.source
+)
+
+
+@app.get("/status-history/tickets", response_class=StreamingResponse)
 def get_ticket_status_history(
     ticket_id: Optional[int] = Query(None, description="Filter by specific ticket ID"),
     status: Optional[str] = Query(None, description="Filter by status (new_status)"),
@@ -5164,98 +5004,85 @@ def get_ticket_status_history(
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(100, description="Maximum records to return")
 ):
-    """Get ticket status change history"""
+    """Get ticket status change history (streamed as a JSON array)"""
     db: Session = SessionLocal()
     try:
-        query = db.query(TicketStatusHistory)
+        stmt = select(*TICKET_STATUS_HISTORY_COLUMNS)
         
         if ticket_id:
-            query = query.filter(TicketStatusHistory.ticket_id == ticket_id)
+            stmt = stmt.where(TicketStatusHistory.ticket_id == ticket_id)
         
         if status:
-            query = query.filter(TicketStatusHistory.new_status == status)
+            stmt = stmt.where(TicketStatusHistory.new_status == status)
         
         if start_date:
             start = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(TicketStatusHistory.changed_on >= start)
+            stmt = stmt.where(TicketStatusHistory.changed_on >= start)
         
         if end_date:
             end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(TicketStatusHistory.changed_on <= end)
+            stmt = stmt.where(TicketStatusHistory.changed_on <= end)
         
-        history = query.order_by(TicketStatusHistory.changed_on.desc()).limit(limit).all()
+        stmt = stmt.order_by(TicketStatusHistory.changed_on.desc()).limit(limit)
         
-        return [
-            {
-                "id": h.id,
-                "ticket_id": h.ticket_id,
-                "previous_status": h.previous_status,
-                "new_status": h.new_status,
-                "changed_on": h.changed_on.isoformat() if h.changed_on else None,
-                "current_assignee": h.current_assignee,
-                "qc_tester": h.qc_tester,
-                "duration_in_previous_status": h.duration_in_previous_status,
-                "source": h.source
-            }
-            for h in history
-        ]
-    finally:
+        # The session is closed by the stream once all rows have been sent
+        return StreamingResponse(
+            stream_json_array(db, stmt),
+            media_type="application/json"
+        )
+    except Exception:
         db.close()
+        raise
 
 
 @app.get("/status-history/tickets/moved-to")
 def get_tickets_moved_to_status(
     status: str = Query(..., description="Target status (e.g., 'BIS Testing')"),
     start_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(..., description="End date (YYYY-MM-DD)")
+    end_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
 ):
     """Get tickets that moved to a specific status during a date range"""
-    db: Session = SessionLocal()
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-        
-        # Find status changes to the target status within the date range
-        history = db.query(TicketStatusHistory).filter(
-            TicketStatusHistory.new_status == status,
-            TicketStatusHistory.changed_on >= start,
-            TicketStatusHistory.changed_on <= end
-        ).order_by(TicketStatusHistory.changed_on.desc()).all()
-        
-        # Get unique ticket IDs
-        ticket_ids = list(set(h.ticket_id for h in history))
-        
-        # Get ticket details
-        tickets = db.query(TicketTracking).filter(
-            TicketTracking.ticket_id.in_(ticket_ids)
-        ).all() if ticket_ids else []
-        
-        ticket_map = {t.ticket_id: t for t in tickets}
-        
-        result = []
-        for h in history:
-            ticket = ticket_map.get(h.ticket_id)
-            result.append({
-                "ticket_id": h.ticket_id,
-                "moved_from": h.previous_status,
-                "moved_to": h.new_status,
-                "moved_on": h.changed_on.isoformat() if h.changed_on else None,
-                "current_status": ticket.status if ticket else None,
-                "qc_tester": ticket.qc_tester if ticket else h.qc_tester,
-                "duration_in_previous_status_hours": h.duration_in_previous_status
-            })
-        
-        return {
-            "status": status,
-            "date_range": {"start": start_date, "end": end_date},
-            "total_count": len(ticket_ids),
-            "tickets": result
-        }
-    finally:
-        db.close()
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    
+    window = (
+        TicketStatusHistory.new_status == status,
+        TicketStatusHistory.changed_on >= start,
+        TicketStatusHistory.changed_on <= end
+    )
+    
+    # Find status changes to the target status within the date range, with ticket details
+    rows = db.query(TicketStatusHistory, TicketTracking).outerjoin(
+        TicketTracking, TicketTracking.ticket_id == TicketStatusHistory.ticket_id
+    ).filter(*window).order_by(TicketStatusHistory.changed_on.desc()).all()
+    
+    # Count unique tickets
+    total_count = db.query(
+        func.count(distinct(TicketStatusHistory.ticket_id))
+    ).filter(*window).scalar()
+    
+    result = []
+    for h, ticket in rows:
+        result.append({
+            "ticket_id": h.ticket_id,
+            "moved_from": h.previous_status,
+            "moved_to": h.new_status,
+            "moved_on": h.changed_on.isoformat() if h.changed_on else None,
+            "current_status": ticket.status if ticket else None,
+            "qc_tester": ticket.qc_tester if ticket else h.qc_tester,
+            "duration_in_previous_status_hours": h.duration_in_previous_status
+        })
+    
+    return {
+        "status": status,
+        "date_range": {"start": start_date, "end": end_date},
+        "total_count": total_count,
+        "tickets": result
+    }
 
 
-@app.get("/status-history/bugs")
+@app.get("/status-history/bugs", response_class=StreamingResponse)
 def get_bug_status_history(
     bug_id: Optional[int] = Query(None, description="Filter by specific bug ID"),
     ticket_id: Optional[int] = Query(None, description="Filter by ticket ID"),
@@ -5264,125 +5091,198 @@ def get_bug_status_history(
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(100, description="Maximum records to return")
 ):
-    """Get bug status change history"""
+    """Get bug status change history (streamed as a JSON array)"""
     db: Session = SessionLocal()
     try:
-        query = db.query(BugStatusHistory)
+        stmt = select(*BUG_STATUS_HISTORY_COLUMNS)
         
         if bug_id:
-            query = query.filter(BugStatusHistory.bug_id == bug_id)
+            stmt = stmt.where(BugStatusHistory.bug_id == bug_id)
         
         if ticket_id:
-            query = query.filter(BugStatusHistory.ticket_id == ticket_id)
+            stmt = stmt.where(BugStatusHistory.ticket_id == ticket_id)
         
         if status:
-            query = query.filter(BugStatusHistory.new_status == status)
+            stmt = stmt.where(BugStatusHistory.new_status == status)
         
         if start_date:
             start = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(BugStatusHistory.changed_on >= start)
+            stmt = stmt.where(BugStatusHistory.changed_on >= start)
         
         if end_date:
             end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(BugStatusHistory.changed_on <= end)
+            stmt = stmt.where(BugStatusHistory.changed_on <= end)
         
-        history = query.order_by(BugStatusHistory.changed_on.desc()).limit(limit).all()
+        stmt = stmt.order_by(BugStatusHistory.changed_on.desc()).limit(limit)
         
-        return [
-            {
-                "id": h.id,
-                "bug_id": h.bug_id,
-                "ticket_id": h.ticket_id,
-                "previous_status": h.previous_status,
-                "new_status": h.new_status,
-                "changed_on": h.changed_on.isoformat() if h.changed_on else None,
-                "assignee": h.assignee,
-                "duration_in_previous_status": h.duration_in_previous_status,
-                "source": h.source
-            }
-            for h in history
-        ]
-    finally:
+        # The session is closed by the stream once all rows have been sent
+        return StreamingResponse(
+            stream_json_array(db, stmt),
+            media_type="application/json"
+        )
+    except Exception:
         db.close()
+        raise
 
 
 @app.get("/status-history/summary")
 def get_status_history_summary(
     start_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(..., description="End date (YYYY-MM-DD)")
+    end_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
 ):
     """Get summary of status changes during a date range"""
-    db: Session = SessionLocal()
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-        
-        # Ticket status changes
-        ticket_changes = db.query(TicketStatusHistory).filter(
-            TicketStatusHistory.changed_on >= start,
-            TicketStatusHistory.changed_on <= end
-        ).all()
-        
-        # Bug status changes
-        bug_changes = db.query(BugStatusHistory).filter(
-            BugStatusHistory.changed_on >= start,
-            BugStatusHistory.changed_on <= end
-        ).all()
-        
-        # Aggregate ticket changes by status
-        ticket_moved_to = defaultdict(int)
-        ticket_moved_from = defaultdict(int)
-        for tc in ticket_changes:
-            if tc.new_status:
-                ticket_moved_to[tc.new_status] += 1
-            if tc.previous_status:
-                ticket_moved_from[tc.previous_status] += 1
-        
-        # Aggregate bug changes by status
-        bug_moved_to = defaultdict(int)
-        bug_moved_from = defaultdict(int)
-        for bc in bug_changes:
-            if bc.new_status:
-                bug_moved_to[bc.new_status] += 1
-            if bc.previous_status:
-                bug_moved_from[bc.previous_status] += 1
-        
-        return {
-            "date_range": {"start": start_date, "end": end_date},
-            "tickets": {
-                "total_changes": len(ticket_changes),
-                "unique_tickets": len(set(tc.ticket_id for tc in ticket_changes)),
-                "moved_to": dict(ticket_moved_to),
-                "moved_from": dict(ticket_moved_from)
-            },
-            "bugs": {
-                "total_changes": len(bug_changes),
-                "unique_bugs": len(set(bc.bug_id for bc in bug_changes)),
-                "moved_to": dict(bug_moved_to),
-                "moved_from": dict(bug_moved_from)
-            }
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    
+    ticket_window = (
+        TicketStatusHistory.changed_on >= start,
+        TicketStatusHistory.changed_on <= end
+    )
+    bug_window = (
+        BugStatusHistory.changed_on >= start,
+        BugStatusHistory.changed_on <= end
+    )
+    
+    def summarize(model, window):
+        """Count status changes per new/previous status from one (new, previous) grouping"""
+        rows = db.query(model.new_status, model.previous_status, func.count()).filter(
+            *window
+        ).group_by(model.new_status, model.previous_status).all()
+        
+        moved_to = Counter()
+        moved_from = Counter()
+        for new_status, previous_status, count in rows:
+            if new_status:
+                moved_to[new_status] += count
+            if previous_status:
+                moved_from[previous_status] += count
+        return sum(count for _, _, count in rows), dict(moved_to), dict(moved_from)
+    
+    # Ticket status changes
+    ticket_total, ticket_moved_to, ticket_moved_from = summarize(TicketStatusHistory, ticket_window)
+    ticket_unique = db.query(
+        func.count(distinct(TicketStatusHistory.ticket_id))
+    ).filter(*ticket_window).scalar()
+    
+    # Bug status changes
+    bug_total, bug_moved_to, bug_moved_from = summarize(BugStatusHistory, bug_window)
+    bug_unique = db.query(
+        func.count(distinct(BugStatusHistory.bug_id))
+    ).filter(*bug_window).scalar()
+    
+    return {
+        "date_range": {"start": start_date, "end": end_date},
+        "tickets": {
+            "total_changes": ticket_total,
+            "unique_tickets": ticket_unique,
+            "moved_to": ticket_moved_to,
+            "moved_from": ticket_moved_from
+        },
+        "bugs": {
+            "total_changes": bug_total,
+            "unique_bugs": bug_unique,
+            "moved_to": bug_moved_to,
+            "moved_from": bug_moved_from
         }
-    finally:
-        db.close()
+    }
 
 
 # ===== WEEKLY REPORT ENDPOINTS =====
 
+REPORTS_FOLDER = os.path.join(os.path.dirname(__file__), "reports")
+
+# PDF rendering is CPU-bound, so it runs in worker processes instead of the event loop/GIL
+REPORT_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def report_data_digest(data: dict, *extra) -> str:
+    """
+    Short content hash of the data a report is generated from. Generated PDFs are
+    named with it so an unchanged report is served from disk instead of re-rendered.
+    """
+    # The generation timestamp changes on every fetch without changing the report contents
+    content = {key: value for key, value in data.items() if key != 'generation_time'}
+    payload = orjson.dumps(
+        [content, extra],
+        default=str,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+
+# Report URLs are regenerated only when their data changes, so browsers may briefly reuse a download
+REPORT_CACHE_HEADERS = {"Cache-Control": "private, max-age=600"}
+# Superseded PDFs are kept this long after they were last served, so a response that has
+# returned the path but not yet opened the file never finds it deleted
+REPORT_STALE_SECONDS = 600
+
+
+def report_key_suffix(value: Optional[str]) -> str:
+    """Filename-safe form of a report parameter (e.g. the project name), prefixed with "_"."""
+    return f"_{re.sub(r'[^A-Za-z0-9]+', '_', value).strip('_')}" if value else ""
+
+
+async def render_report_pdf(render, data: dict, report_key: str, *extra) -> str:
+    """
+    Render a report PDF in REPORT_POOL and return its path in REPORTS_FOLDER.
+    The file is named report_key plus the data digest, and is reused if it already exists.
+    The PDF is written to a temporary file and moved into place atomically, so
+    concurrent requests for the same report never serve a partially written file.
+    Once a new one is in place, older PDFs for the same report_key that have not been
+    served for REPORT_STALE_SECONDS are deleted.
+    """
+    os.makedirs(REPORTS_FOLDER, exist_ok=True)
+    output_path = os.path.join(REPORTS_FOLDER, f"{report_key}_{report_data_digest(data, *extra)}.pdf")
+    if os.path.exists(output_path):
+        # Mark it as just served so a concurrent render does not sweep it
+        os.utime(output_path)
+        return output_path
+    
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp.pdf"
+    try:
+        await asyncio.get_running_loop().run_in_executor(REPORT_POOL, render, data, tmp_path, *extra)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    remove_stale_reports(report_key, output_path)
+    return output_path
+
+
+def remove_stale_reports(report_key: str, current_path: str):
+    """
+    Delete PDFs generated for report_key other than current_path that were last served
+    more than REPORT_STALE_SECONDS ago. Only exact "{report_key}_{digest}.pdf" names match,
+    so in-progress temporary files and reports with a longer key are left alone.
+    """
+    pattern = re.compile(re.escape(report_key) + r"_[0-9a-f]{24}\.pdf")
+    cutoff = datetime.now().timestamp() - REPORT_STALE_SECONDS
+    for entry in os.scandir(REPORTS_FOLDER):
+        if pattern.fullmatch(entry.name) and entry.path != current_path:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                # Already removed by a concurrent render
+                pass
+
+
 @app.get("/reports/weekly")
-def generate_weekly_report(
+async def generate_weekly_report(
     date: str = Query(None, description="Reference date (YYYY-MM-DD) for the week. Defaults to current week."),
     download: bool = Query(True, description="If true, returns the PDF file. If false, returns report data as JSON.")
 ):
     """Generate weekly QA report for the specified week"""
     from weekly_report import get_week_dates, get_weekly_data, generate_pdf_report
-    import os
     
     try:
         # Get week dates
         week_start, week_end = get_week_dates(date)
         
         # Fetch data
-        data = get_weekly_data(week_start, week_end)
+        data = await asyncio.to_thread(get_weekly_data, week_start, week_end)
         
         if not download:
             # Return JSON summary
@@ -5396,21 +5296,16 @@ def generate_weekly_report(
                 "next_week_plan_count": len(data['next_week_plan'])
             }
         
-        # Generate PDF
-        reports_folder = os.path.join(os.path.dirname(__file__), "reports")
-        os.makedirs(reports_folder, exist_ok=True)
-        
-        output_path = os.path.join(
-            reports_folder,
-            f"QA_Weekly_Report_{week_start.strftime('%Y%m%d')}_{week_end.strftime('%Y%m%d')}.pdf"
-        )
-        
-        generate_pdf_report(data, output_path)
+        # Generate PDF (reuse a previous one if the data hasn't changed)
+        report_key = f"QA_Weekly_Report_{week_start.strftime('%Y%m%d')}_{week_end.strftime('%Y%m%d')}"
+        filename = f"{report_key}.pdf"
+        output_path = await render_report_pdf(generate_pdf_report, data, report_key)
         
         return FileResponse(
             output_path,
             media_type="application/pdf",
-            filename=os.path.basename(output_path)
+            filename=filename,
+            headers=REPORT_CACHE_HEADERS
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -5441,33 +5336,25 @@ def preview_weekly_report(
 
 
 @app.get("/reports/ticket/{ticket_id}")
-def generate_ticket_report_endpoint(ticket_id: int):
+async def generate_ticket_report_endpoint(ticket_id: int):
     """Generate PDF report for a specific ticket with all its data"""
     from ticket_report import get_ticket_data, generate_ticket_pdf
-    import os
     
     try:
         # Fetch data
-        data = get_ticket_data(ticket_id)
+        data = await asyncio.to_thread(get_ticket_data, ticket_id)
         
         if not data:
             raise HTTPException(status_code=404, detail=f"Ticket #{ticket_id} not found")
         
-        # Generate PDF
-        reports_folder = os.path.join(os.path.dirname(__file__), "reports")
-        os.makedirs(reports_folder, exist_ok=True)
-        
-        output_path = os.path.join(
-            reports_folder,
-            f"Ticket_Report_{ticket_id}.pdf"
-        )
-        
-        generate_ticket_pdf(data, output_path)
+        # Generate PDF (reuse a previous one if the data hasn't changed)
+        output_path = await render_report_pdf(generate_ticket_pdf, data, f"Ticket_Report_{ticket_id}")
         
         return FileResponse(
             output_path,
             media_type="application/pdf",
-            filename=f"Ticket_Report_{ticket_id}.pdf"
+            filename=f"Ticket_Report_{ticket_id}.pdf",
+            headers=REPORT_CACHE_HEADERS
         )
     except HTTPException:
         raise
@@ -5476,37 +5363,32 @@ def generate_ticket_report_endpoint(ticket_id: int):
 
 
 @app.get("/reports/weekly-v2")
-def generate_weekly_report_v2(
+async def generate_weekly_report_v2(
     date: str = Query(None, description="Reference date (YYYY-MM-DD) for the week"),
     project: str = Query(None, description="Project/Client name for the cover page"),
     last7days: bool = Query(True, description="If true, show last 7 days. If false, show Mon-Fri week.")
 ):
     """Generate comprehensive multi-page QA weekly report (V2)"""
     from qa_weekly_report_v2 import get_week_dates, get_comprehensive_data, generate_comprehensive_report
-    import os
     
     try:
         # Get week dates - use last 7 days by default
         week_start, week_end = get_week_dates(date, use_last_7_days=last7days)
         
         # Fetch comprehensive data
-        data = get_comprehensive_data(week_start, week_end)
-        
-        # Generate PDF
-        reports_folder = os.path.join(os.path.dirname(__file__), "reports")
-        os.makedirs(reports_folder, exist_ok=True)
+        data = await asyncio.to_thread(get_comprehensive_data, week_start, week_end)
         
-        output_path = os.path.join(
-            reports_folder,
-            f"QA_Weekly_Report_V2_{week_start.strftime('%Y%m%d')}_{week_end.strftime('%Y%m%d')}.pdf"
-        )
-        
-        generate_comprehensive_report(data, output_path, project)
+        # Generate PDF (reuse a previous one if the data and project haven't changed)
+        filename = f"QA_Weekly_Report_V2_{week_start.strftime('%Y%m%d')}_{week_end.strftime('%Y%m%d')}.pdf"
+        # Each project's cover page makes a separate report, cached and swept on its own
+        report_key = f"QA_Weekly_Report_V2_{week_start.strftime('%Y%m%d')}_{week_end.strftime('%Y%m%d')}{report_key_suffix(project)}"
+        output_path = await render_report_pdf(generate_comprehensive_report, data, report_key, project)
         
         return FileResponse(
             output_path,
             media_type="application/pdf",
-            filename=os.path.basename(output_path)
+            filename=filename,
+            headers=REPORT_CACHE_HEADERS
         )
     except Exception as e:
         import traceback
@@ -5611,6 +5493,41 @@ class WeeklyPlanUpdate(BaseModel):
 
 # ===== GOOGLE SHEETS SYNC ENDPOINTS =====
 
+# Manual syncs are queued and run one at a time off the request path; job status is kept for a day
+SHEETS_SYNC_QUEUE: Optional[asyncio.Queue] = None
+SHEETS_SYNC_WORKER: Optional[asyncio.Task] = None
+SHEETS_SYNC_JOBS = TTLCache(maxsize=256, ttl=86400)
+
+
+def run_sheets_sync(team: Optional[str]) -> dict:
+    """
+    Sync one team, or all teams when team is None, from Google Sheets.
+    Runs under the scheduler's sync lock so it never overlaps a scheduled or push-triggered sync;
+    the scheduler's listeners clear the calendar caches afterwards.
+    """
+    return get_scheduler().trigger_manual_sync(teams=[team] if team else None)
+
+
+async def sheets_sync_worker():
+    """Drain SHEETS_SYNC_QUEUE, running each queued sync in a worker thread."""
+    while True:
+        job = await SHEETS_SYNC_QUEUE.get()
+        job["status"] = "running"
+        job["started_at"] = datetime.utcnow().isoformat()
+        try:
+            job["result"] = await asyncio.to_thread(run_sheets_sync, job["team"])
+            if job["result"]["success"]:
+                job["status"] = "completed"
+            else:
+                job["status"] = "failed"
+                job["error"] = job["result"].get("error") or "Sync failed"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            SHEETS_SYNC_QUEUE.task_done()
+
 @app.get("/sync/google-sheets/status")
 def get_google_sheets_status():
     """Get the current status of Google Sheets sync configuration and scheduler."""
@@ -5623,28 +5540,42 @@ def get_google_sheets_status():
         "scheduler": scheduler_status
     }
 
-@app.post("/sync/google-sheets")
-def trigger_google_sheets_sync(team: Optional[str] = Query(None, description="Team to sync: QA, DEV, or leave empty for all")):
-    """Trigger a manual sync from Google Sheets."""
-    try:
-        sync = GoogleSheetsSync()
-        if team:
-            result = sync.sync_team(team.upper())
-        else:
-            result = sync.sync_all()
-        return {"success": True, "result": result}
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
+@app.post("/sync/google-sheets", status_code=202)
+async def trigger_google_sheets_sync(team: Optional[str] = Query(None, description="Team to sync: QA, DEV, or leave empty for all")):
+    """
+    Queue a manual sync from Google Sheets.
+    Returns immediately with a job id; poll /sync/google-sheets/jobs/{job_id} for the outcome.
+    """
+    if team:
+        team = team.upper()
+        try:
+            get_sheet_id(team)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "team": team,
+        "status": "queued",
+        "queued_at": datetime.utcnow().isoformat()
+    }
+    SHEETS_SYNC_JOBS[job["job_id"]] = job
+    await SHEETS_SYNC_QUEUE.put(job)
+    return {"accepted": True, **job}
+
+@app.get("/sync/google-sheets/jobs/{job_id}")
+def get_google_sheets_sync_job(job_id: str):
+    """Get the status of a queued manual Google Sheets sync."""
+    job = SHEETS_SYNC_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
 
 @app.post("/sync/google-sheets/start")
 def start_auto_sync_endpoint(
     interval_minutes: Optional[int] = Query(None, description="Sync interval in minutes (ignored if realtime=true)"),
     teams: Optional[str] = Query(None, description="Comma-separated teams: QA,DEV"),
-    realtime: bool = Query(True, description="Enable real-time sync (2-minute intervals)")
+    realtime: bool = Query(True, description="Enable real-time sync (push notifications, or 2-minute intervals without a webhook URL)")
 ):
     """Start automatic syncing of Google Sheets."""
     try:
@@ -5652,7 +5583,12 @@ def start_auto_sync_endpoint(
         teams_list = [t.strip().upper() for t in teams.split(',')] if teams else None
         scheduler.start(sync_interval_minutes=interval_minutes, teams=teams_list, realtime=realtime)
         
-        mode = "real-time (2-minute intervals)" if realtime else f"{interval_minutes or 5} minute intervals"
+        if scheduler.push_mode:
+            mode = "real-time (push notifications)"
+        elif realtime:
+            mode = "real-time (2-minute intervals)"
+        else:
+            mode = f"{interval_minutes or 5} minute intervals"
         return {
             "success": True,
             "message": f"Auto-sync started in {mode}",
@@ -5661,6 +5597,19 @@ def start_auto_sync_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start auto-sync: {str(e)}")
 
+@app.post("/sync/google-sheets/webhook")
+def google_sheets_webhook(request: Request):
+    """
+    Receive Drive push notifications for the watched timesheet sheets.
+    Queues a background sync of the team whose sheet changed.
+    """
+    queued = get_scheduler().notify_change(
+        channel_id=request.headers.get("X-Goog-Channel-ID"),
+        token=request.headers.get("X-Goog-Channel-Token"),
+        resource_state=request.headers.get("X-Goog-Resource-State")
+    )
+    return {"queued": queued}
+
 @app.post("/sync/google-sheets/stop")
 def stop_auto_sync_endpoint():
     """Stop automatic syncing of Google Sheets."""
@@ -5690,7 +5639,125 @@ def trigger_scheduled_sync(teams: Optional[str] = Query(None, description="Comma
         raise HTTPException(status_code=500, detail=f"Failed to trigger sync: {str(e)}")
 
 
-# ===== CALENDAR API ENDPOINTS =====
+# ===== CALENDAR API ENDPOINTS =====
+
+# Serialized calendar responses as (content, etag); every write to the data behind them clears them,
+# and weekly/monthly views are kept for a few minutes and holiday lists for a day
+CALENDAR_CACHE = TTLCache(maxsize=256, ttl=300)
+HOLIDAY_CACHE = TTLCache(maxsize=16, ttl=86400)
+# Holiday rows per date range, shared by the period views
+HOLIDAY_ROWS_CACHE = TTLCache(maxsize=256, ttl=86400)
+# Views of periods that have already ended; kept for a day unless a write clears them
+CALENDAR_HISTORY_CACHE = TTLCache(maxsize=512, ttl=86400)
+# Planning comparison responses; cleared with the calendar views
+PLANNING_CACHE = TTLCache(maxsize=128, ttl=600)
+CALENDAR_CACHE_LOCK = threading.Lock()
+
+
+# Worker threads that run a request's independent SELECTs side by side, each on its own pooled connection
+QUERY_POOL = ThreadPoolExecutor(max_workers=16)
+
+
+def _fetch_rows(stmt, params: Optional[dict] = None) -> list:
+    with SessionLocal() as session:
+        return session.execute(stmt, params).all()
+
+
+def fetch_all_concurrently(*statements, params: Optional[dict] = None) -> list:
+    """
+    Execute independent SELECTs concurrently and return their row lists in order.
+    params supplies bound parameter values shared by all statements.
+    """
+    return list(QUERY_POOL.map(lambda stmt: _fetch_rows(stmt, params), statements))
+
+
+# Timesheet/planning team codes that are stored differently in Employee.team
+EMPLOYEE_TEAMS = {"DEV": "DEVELOPMENT"}
+
+
+def employee_team(team_code: str) -> str:
+    """Employee.team value for an upper-cased team code ("DEV" is stored as "DEVELOPMENT")."""
+    return EMPLOYEE_TEAMS.get(team_code, team_code)
+
+
+def normalize_employee_category(category: str) -> str:
+    """Canonical form of an employee category, matching Employee.category_norm."""
+    category = category.strip().upper()
+    return "UN-BILLED" if category == "UNBILLED" else category
+
+
+def clear_calendar_cache():
+    """Drop all cached calendar and holiday responses."""
+    clear_calendar_views()
+    with CALENDAR_CACHE_LOCK:
+        HOLIDAY_CACHE.clear()
+        HOLIDAY_ROWS_CACHE.clear()
+
+
+def clear_calendar_views():
+    """
+    Drop cached calendar and planning responses, keeping holiday lists.
+    Called after any write to timesheets, planned tasks, employees or name mappings.
+    """
+    with CALENDAR_CACHE_LOCK:
+        CALENDAR_CACHE.clear()
+        CALENDAR_HISTORY_CACHE.clear()
+        PLANNING_CACHE.clear()
+
+
+def calendar_cache_for(end_date: date) -> TTLCache:
+    """Response cache for a period: past periods are kept for a day, current ones for a few minutes."""
+    return CALENDAR_HISTORY_CACHE if end_date < date.today() else CALENDAR_CACHE
+
+
+def get_period_holidays(start_date: date, end_date: date) -> tuple:
+    """
+    Active holidays in a date range as (holiday_date, holiday_name, category, day_name) rows.
+    Holidays are only loaded by script, so a range is read from the database at most once a day.
+    """
+    cache_key = (start_date, end_date)
+    with CALENDAR_CACHE_LOCK:
+        holidays = HOLIDAY_ROWS_CACHE.get(cache_key)
+    if holidays is None:
+        with SessionLocal() as session:
+            holidays = tuple(session.execute(
+                select(Holiday.holiday_date, Holiday.holiday_name, Holiday.category, Holiday.day_name).where(
+                    Holiday.holiday_date >= start_date,
+                    Holiday.holiday_date <= end_date,
+                    Holiday.is_active == True
+                )
+            ).all())
+        with CALENDAR_CACHE_LOCK:
+            HOLIDAY_ROWS_CACHE[cache_key] = holidays
+    return holidays
+
+
+def cached_json_response(request: Request, cache: TTLCache, cache_key: tuple, build) -> Response:
+    """
+    Serve a JSON response from cache, building and caching it on a miss.
+    Builders may key dicts by date; orjson writes those keys as ISO strings.
+    Responses carry an ETag; a matching If-None-Match gets an empty 304.
+    """
+    with CALENDAR_CACHE_LOCK:
+        cached = cache.get(cache_key)
+    if cached is None:
+        cached = _cache_json(cache, cache_key, orjson.dumps(build(), option=orjson.OPT_NON_STR_KEYS))
+    return _cached_response(request, cached)
+
+
+def _cache_json(cache: TTLCache, cache_key: tuple, content: bytes) -> tuple:
+    cached = (content, f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"')
+    with CALENDAR_CACHE_LOCK:
+        cache[cache_key] = cached
+    return cached
+
+
+def _cached_response(request: Request, cached: tuple) -> Response:
+    content, etag = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
 
 def is_weekend(check_date: date) -> bool:
     """Check if a date is a weekend (Saturday or Sunday)."""
@@ -5729,869 +5796,967 @@ def is_working_day(check_date: date, db: Session, include_optional_holidays: boo
     return True
 
 
+def get_holiday_dates(db: Session, start_date: date, end_date: date, include_optional: bool = False) -> set:
+    """
+    Load the active holiday dates in a range with a single query.
+    If include_optional is False, only regular holidays are returned.
+    """
+    query = db.query(Holiday.holiday_date).filter(
+        Holiday.holiday_date >= start_date,
+        Holiday.holiday_date <= end_date,
+        Holiday.is_active == True
+    )
+    
+    if not include_optional:
+        query = query.filter(Holiday.category == 'Holiday')
+    
+    return {row.holiday_date for row in query}
+
+
 def get_working_days_in_range(start_date: date, end_date: date, db: Session, include_optional_holidays: bool = False) -> int:
-    """Count working days (excluding weekends and holidays) in a date range."""
-    working_days = 0
-    current_date = start_date
+    """
+    Count working days (excluding weekends and holidays) in a date range.
+    Callers that already fetched the holidays for the range should use count_working_days.
+    """
+    holiday_dates = get_holiday_dates(db, start_date, end_date, include_optional_holidays)
+    return count_working_days(start_date, end_date, holiday_dates)
+
+
+def count_working_days(start_date: date, end_date: date, holiday_dates: set) -> int:
+    """Count weekdays in a date range (inclusive) that are not in holiday_dates."""
+    if end_date < start_date:
+        return 0
+    
+    holidays_np = np.array(sorted(holiday_dates), dtype='datetime64[D]')
+    return int(np.busday_count(
+        np.datetime64(start_date, 'D'),
+        np.datetime64(end_date, 'D') + np.timedelta64(1, 'D'),
+        weekmask='1111100',
+        holidays=holidays_np
+    ))
+
+
+def get_month_bounds(month: Optional[str]) -> tuple:
+    """First and last day of a YYYY-MM month (defaults to the current month)."""
+    # Parse month
+    if month:
+        try:
+            year, mon = map(int, month.split("-"))
+            month_start = date(year, mon, 1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
+    else:
+        today = date.today()
+        month_start = date(today.year, today.month, 1)
+    
+    # Calculate month end
+    if month_start.month == 12:
+        month_end = date(month_start.year + 1, 1, 1) - timedelta(days=1)
+    else:
+        month_end = date(month_start.year, month_start.month + 1, 1) - timedelta(days=1)
+    
+    return month_start, month_end
+
+
+def get_period_bounds(period: str, date_str: Optional[str]) -> tuple:
+    """First and last day of the week (Monday to Sunday) or month containing date_str (defaults to today)."""
+    # Parse date
+    if date_str:
+        try:
+            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    else:
+        target_date = date.today()
     
-    while current_date <= end_date:
-        if is_working_day(current_date, db, include_optional_holidays):
-            working_days += 1
-        current_date += timedelta(days=1)
+    # Calculate period boundaries
+    if period == "week":
+        start_date = target_date - timedelta(days=target_date.weekday())
+        end_date = start_date + timedelta(days=6)
+    else:  # month
+        start_date, end_date = get_month_bounds(target_date.strftime("%Y-%m"))
     
-    return working_days
+    return start_date, end_date
 
 
-@app.get("/calendar/holidays")
+@app.get("/calendar/holidays", response_class=ORJSONResponse)
 def get_holidays(
+    request: Request,
     year: Optional[int] = Query(None, description="Year. Defaults to current year."),
-    category: Optional[str] = Query(None, description="Filter by category: 'Holiday' or 'Optional Holiday'")
+    category: Optional[str] = Query(None, description="Filter by category: 'Holiday' or 'Optional Holiday'"),
+    db: Session = Depends(get_db)
 ):
     """Get list of holidays for a given year."""
-    db = SessionLocal()
-    try:
-        if not year:
-            year = date.today().year
-        
-        query = db.query(Holiday).filter(
-            Holiday.year == year,
-            Holiday.is_active == True
-        )
-        
-        if category:
-            query = query.filter(Holiday.category == category)
-        
-        holidays = query.order_by(Holiday.holiday_date).all()
-        
-        return {
-            "year": year,
-            "holidays": [
-                {
-                    "id": h.id,
-                    "name": h.holiday_name,
-                    "date": h.holiday_date.isoformat(),
-                    "day_name": h.day_name,
-                    "category": h.category
-                }
-                for h in holidays
-            ]
-        }
-    finally:
-        db.close()
+    return cached_json_response(
+        request, HOLIDAY_CACHE, (year or date.today().year, category),
+        lambda: build_holiday_list(db, year, category)
+    )
 
 
-@app.get("/calendar/weekly")
+def build_holiday_list(db: Session, year: Optional[int], category: Optional[str]) -> dict:
+    """Build the /calendar/holidays response."""
+    if not year:
+        year = date.today().year
+    
+    query = db.query(Holiday).filter(
+        Holiday.year == year,
+        Holiday.is_active == True
+    )
+    
+    if category:
+        query = query.filter(Holiday.category == category)
+    
+    holidays = query.order_by(Holiday.holiday_date).all()
+    
+    return {
+        "year": year,
+        "holidays": [
+            {
+                "id": h.id,
+                "name": h.holiday_name,
+                "date": h.holiday_date,
+                "day_name": h.day_name,
+                "category": h.category
+            }
+            for h in holidays
+        ]
+    }
+
+
+@app.get("/calendar/weekly", response_class=ORJSONResponse)
 def get_weekly_calendar(
+    request: Request,
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
     date_str: str = Query(None, description="Any date in the week (YYYY-MM-DD). Defaults to current week."),
-    category: str = Query("ALL", description="Category: BILLED, UN-BILLED, or ALL")
+    category: str = Query("ALL", description="Category: BILLED, UN-BILLED, or ALL"),
+    db: Session = Depends(get_db)
 ):
     """
     Get weekly calendar view showing daily time entries per employee.
     Returns all employees with their daily entries for the week.
     """
-    db = SessionLocal()
-    try:
-        # Parse date and calculate week boundaries (Monday to Sunday)
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        else:
-            target_date = date.today()
-        
-        # Calculate week start (Monday) and end (Sunday)
-        week_start = target_date - timedelta(days=target_date.weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        # Get holidays for this week
-        week_holidays = {}
-        holidays_query = db.query(Holiday).filter(
-            Holiday.holiday_date >= week_start,
-            Holiday.holiday_date <= week_end,
-            Holiday.is_active == True
-        ).all()
-        
-        for holiday in holidays_query:
-            week_holidays[holiday.holiday_date.isoformat()] = {
-                "name": holiday.holiday_name,
-                "category": holiday.category,
-                "day_name": holiday.day_name
-            }
-        
-        # Get list of employees (filtered by team and category)
-        emp_query = db.query(Employee).filter(Employee.is_active == True)
-        if team.upper() != "ALL":
-            # Map "DEV" to "DEVELOPMENT" for Employee table (Employee.team uses "DEVELOPMENT", not "DEV")
-            employee_team_filter = team.upper()
-            if employee_team_filter == "DEV":
-                employee_team_filter = "DEVELOPMENT"
-            emp_query = emp_query.filter(Employee.team == employee_team_filter)
-        if category.upper() != "ALL":
-            # Use case-insensitive exact match for category
-            # Match both "BILLED" and "UN-BILLED" (with or without hyphen)
-            category_upper = category.upper()
-            if category_upper == "UN-BILLED" or category_upper == "UNBILLED":
-                emp_query = emp_query.filter(
-                    or_(
-                        func.upper(Employee.category) == "UN-BILLED",
-                        func.upper(Employee.category) == "UNBILLED"
-                    )
-                )
-            else:
-                emp_query = emp_query.filter(func.upper(Employee.category) == category_upper)
-        employees = emp_query.all()
-        
-        # Get employee names for filtering timesheet data
-        employee_names = [emp.name for emp in employees]
-        
-        # Query timesheet data
-        query = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.date >= week_start,
-            EnhancedTimesheet.date <= week_end
-        )
-        
-        if team.upper() != "ALL":
-            query = query.filter(EnhancedTimesheet.team == team.upper())
-        if category.upper() != "ALL" and employee_names:
-            query = query.filter(EnhancedTimesheet.employee_name.in_(employee_names))
-        
-        entries = query.order_by(
-            EnhancedTimesheet.employee_name,
-            EnhancedTimesheet.date
-        ).all()
-        
-        # Also get leave entries
-        leave_query = db.query(LeaveEntry).filter(
-            LeaveEntry.date >= week_start,
-            LeaveEntry.date <= week_end
-        )
-        if team.upper() != "ALL":
-            leave_query = leave_query.filter(LeaveEntry.team == team.upper())
-        if category.upper() != "ALL" and employee_names:
-            leave_query = leave_query.filter(LeaveEntry.employee_name.in_(employee_names))
-        leaves = leave_query.all()
-        
-        # Build employee calendar data
-        employee_data = {}
-        
-        # Initialize all employees
-        for emp in employees:
-            employee_data[emp.name] = {
-                "employee_id": emp.employee_id,
-                "employee_name": emp.name,
-                "team": emp.team,
-                "days": {}
+    return cached_json_response(
+        request, CALENDAR_CACHE, ("weekly", team, date_str or date.today().isoformat(), category),
+        lambda: build_weekly_calendar(db, team, date_str, category)
+    )
+
+
+def build_weekly_calendar(db: Session, team: str, date_str: Optional[str], category: str) -> dict:
+    """Build the /calendar/weekly response."""
+    team_code = team.upper()
+    # Parse date and calculate week boundaries (Monday to Sunday)
+    if date_str:
+        try:
+            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    else:
+        target_date = date.today()
+    
+    # Calculate week start (Monday) and end (Sunday)
+    week_start = target_date - timedelta(days=target_date.weekday())
+    week_end = week_start + timedelta(days=6)
+    
+    # Holidays for this week
+    holidays_query = get_period_holidays(week_start, week_end)
+    
+    # Get list of employees (filtered by team and category)
+    # Read-only calendar queries select plain columns; no ORM objects are needed
+    emp_query = db.query(Employee.name, Employee.employee_id, Employee.team).filter(Employee.is_active == True)
+    if team_code != "ALL":
+        # Employee.team uses "DEVELOPMENT", not "DEV"
+        emp_query = emp_query.filter(Employee.team == employee_team(team_code))
+    if category.upper() != "ALL":
+        # Case-insensitive match on the indexed normalized category ("UNBILLED" matches "UN-BILLED")
+        emp_query = emp_query.filter(Employee.category_norm == normalize_employee_category(category))
+    
+    # Filter timesheet/leave rows with the employee query as a subquery rather than binding every name;
+    # as before, rows are only narrowed when at least one employee matches the category
+    employee_names = emp_query.with_entities(Employee.name).statement
+    
+    # Query timesheet data
+    query = db.query(
+        EnhancedTimesheet.employee_id,
+        EnhancedTimesheet.employee_name,
+        EnhancedTimesheet.team,
+        EnhancedTimesheet.date,
+        EnhancedTimesheet.productive_hours,
+        EnhancedTimesheet.hours_logged,
+        EnhancedTimesheet.ticket_id,
+        EnhancedTimesheet.leave_type,
+        EnhancedTimesheet.task_description,
+        EnhancedTimesheet.project_name
+    ).filter(
+        EnhancedTimesheet.date >= week_start,
+        EnhancedTimesheet.date <= week_end
+    )
+    
+    if team_code != "ALL":
+        query = query.filter(EnhancedTimesheet.team == team_code)
+    if category.upper() != "ALL":
+        query = query.filter(or_(EnhancedTimesheet.employee_name.in_(employee_names), ~employee_names.exists()))
+    
+    query = query.order_by(
+        EnhancedTimesheet.employee_name,
+        EnhancedTimesheet.date
+    )
+    
+    # Also get leave entries
+    leave_query = db.query(LeaveEntry.employee_name, LeaveEntry.date, LeaveEntry.leave_type).filter(
+        LeaveEntry.date >= week_start,
+        LeaveEntry.date <= week_end
+    )
+    if team_code != "ALL":
+        leave_query = leave_query.filter(LeaveEntry.team == team_code)
+    if category.upper() != "ALL":
+        leave_query = leave_query.filter(or_(LeaveEntry.employee_name.in_(employee_names), ~employee_names.exists()))
+    
+    # The queries are independent, so run them side by side instead of one after another
+    employees, entries, leaves = fetch_all_concurrently(
+        emp_query.statement, query.statement, leave_query.statement
+    )
+    
+    week_holidays = {}
+    for holiday in holidays_query:
+        week_holidays[holiday.holiday_date] = {
+            "name": holiday.holiday_name,
+            "category": holiday.category,
+            "day_name": holiday.day_name
+        }
+    
+    # Day skeletons for the week, computed once and copied for each employee
+    week_days = [week_start + timedelta(days=i) for i in range(7)]
+    weekend_days = {d for d in week_days if d.weekday() > 4}
+    week_day_templates = {}
+    for day in week_days:
+        is_weekend_day = day in weekend_days
+        holiday_info = week_holidays.get(day)
+        
+        week_day_templates[day] = {
+            "date": day,
+            "total_hours": 0,
+            "productive_hours": 0,
+            "hours_logged": 0,
+            "leave_type": None,
+            "is_weekend": is_weekend_day,
+            "is_holiday": holiday_info is not None,
+            "holiday_name": holiday_info["name"] if holiday_info else None,
+            "holiday_category": holiday_info["category"] if holiday_info else None,
+            "is_working_day": not is_weekend_day and holiday_info is None
+        }
+    
+    # Build employee calendar data, initializing all employees
+    employee_data = {
+        emp.name: {
+            "employee_id": emp.employee_id,
+            "employee_name": emp.name,
+            "team": emp.team,
+            "days": {k: {**t, "entries": []} for k, t in week_day_templates.items()}
+        }
+        for emp in employees
+    }
+    
+    # Add timesheet entries (also handle employees not in master list)
+    for entry in entries:
+        name = entry.employee_name
+        if name not in employee_data:
+            employee_data[name] = {
+                "employee_id": entry.employee_id,
+                "employee_name": name,
+                "team": entry.team,
+                "days": {k: {**t, "entries": []} for k, t in week_day_templates.items()}
             }
-            # Initialize all days
-            for i in range(7):
-                day = week_start + timedelta(days=i)
-                day_key = day.isoformat()
-                is_weekend_day = is_weekend(day)
-                holiday_info = week_holidays.get(day_key)
-                
-                employee_data[emp.name]["days"][day_key] = {
-                    "date": day_key,
-                    "entries": [],
-                    "total_hours": 0,
-                    "productive_hours": 0,
-                    "hours_logged": 0,
-                    "leave_type": None,
-                    "is_weekend": is_weekend_day,
-                    "is_holiday": holiday_info is not None,
-                    "holiday_name": holiday_info["name"] if holiday_info else None,
-                    "holiday_category": holiday_info["category"] if holiday_info else None,
-                    "is_working_day": not is_weekend_day and holiday_info is None
-                }
         
-        # Add timesheet entries (also handle employees not in master list)
-        for entry in entries:
-            name = entry.employee_name
-            if name not in employee_data:
-                employee_data[name] = {
-                    "employee_id": entry.employee_id,
-                    "employee_name": name,
-                    "team": entry.team,
-                    "days": {}
-                }
-                for i in range(7):
-                    day = week_start + timedelta(days=i)
-                    day_key = day.isoformat()
-                    is_weekend_day = is_weekend(day)
-                    holiday_info = week_holidays.get(day_key)
-                    
-                    employee_data[name]["days"][day_key] = {
-                        "date": day_key,
-                        "entries": [],
-                        "total_hours": 0,
-                        "productive_hours": 0,
-                        "hours_logged": 0,
-                        "leave_type": None,
-                        "is_weekend": is_weekend_day,
-                        "is_holiday": holiday_info is not None,
-                        "holiday_name": holiday_info["name"] if holiday_info else None,
-                        "holiday_category": holiday_info["category"] if holiday_info else None,
-                        "is_working_day": not is_weekend_day and holiday_info is None
-                    }
+        day_key = entry.date
+        if day_key in employee_data[name]["days"]:
+            # Get hours - use productive_hours if available, otherwise hours_logged
+            productive = entry.productive_hours or 0
+            hours_logged = entry.hours_logged or 0
+            display_hours = productive if productive > 0 else hours_logged
             
-            day_key = entry.date.isoformat()
+            employee_data[name]["days"][day_key]["entries"].append({
+                "ticket_id": entry.ticket_id,
+                "hours": display_hours,
+                "productive_hours": productive,
+                "hours_logged": hours_logged,
+                "task_description": entry.task_description,
+                "project_name": entry.project_name
+            })
+            employee_data[name]["days"][day_key]["total_hours"] += display_hours
+            employee_data[name]["days"][day_key]["productive_hours"] += productive
+            employee_data[name]["days"][day_key]["hours_logged"] = employee_data[name]["days"][day_key].get("hours_logged", 0) + hours_logged
+            if entry.leave_type:
+                employee_data[name]["days"][day_key]["leave_type"] = entry.leave_type
+    
+    # Add leave entries
+    for leave in leaves:
+        name = leave.employee_name
+        if name in employee_data:
+            day_key = leave.date
             if day_key in employee_data[name]["days"]:
-                # Get hours - use productive_hours if available, otherwise hours_logged
-                productive = entry.productive_hours or 0
-                hours_logged = entry.hours_logged or 0
-                display_hours = productive if productive > 0 else hours_logged
-                
-                employee_data[name]["days"][day_key]["entries"].append({
-                    "ticket_id": entry.ticket_id,
-                    "hours": display_hours,
-                    "productive_hours": productive,
-                    "hours_logged": hours_logged,
-                    "task_description": entry.task_description,
-                    "project_name": entry.project_name
-                })
-                employee_data[name]["days"][day_key]["total_hours"] += display_hours
-                employee_data[name]["days"][day_key]["productive_hours"] += productive
-                employee_data[name]["days"][day_key]["hours_logged"] = employee_data[name]["days"][day_key].get("hours_logged", 0) + hours_logged
-                if entry.leave_type:
-                    employee_data[name]["days"][day_key]["leave_type"] = entry.leave_type
-        
-        # Add leave entries
-        for leave in leaves:
-            name = leave.employee_name
-            if name in employee_data:
-                day_key = leave.date.isoformat()
-                if day_key in employee_data[name]["days"]:
-                    employee_data[name]["days"][day_key]["leave_type"] = leave.leave_type
-        
-        # Calculate totals per employee
-        for name, data in employee_data.items():
-            total = sum(d["total_hours"] for d in data["days"].values())
-            productive = sum(d["productive_hours"] for d in data["days"].values())
-            data["weekly_total_hours"] = total
-            data["weekly_productive_hours"] = productive
-        
-        # Calculate working days in the week (excluding weekends and holidays)
-        working_days = get_working_days_in_range(week_start, week_end, db, include_optional_holidays=False)
-        
-        return {
-            "week_start": week_start.isoformat(),
-            "week_end": week_end.isoformat(),
-            "team": team,
-            "working_days": working_days,
-            "holidays": list(week_holidays.values()),
-            "employees": list(employee_data.values())
-        }
-    finally:
-        db.close()
+                employee_data[name]["days"][day_key]["leave_type"] = leave.leave_type
+    
+    # Weekly totals from the same day rows, so they always match the per-day figures
+    for data in employee_data.values():
+        days = data["days"].values()
+        data["weekly_total_hours"] = sum(day["total_hours"] for day in days)
+        data["weekly_productive_hours"] = sum(day["productive_hours"] for day in days)
+    
+    # Calculate working days in the week (excluding weekends and holidays)
+    working_days = count_working_days(
+        week_start, week_end, {h.holiday_date for h in holidays_query if h.category == 'Holiday'}
+    )
+    
+    return {
+        "week_start": week_start,
+        "week_end": week_end,
+        "team": team,
+        "working_days": working_days,
+        "holidays": list(week_holidays.values()),
+        "employees": list(employee_data.values())
+    }
 
 
-@app.get("/calendar/monthly")
+@app.get("/calendar/monthly", response_class=ORJSONResponse)
 def get_monthly_calendar(
+    request: Request,
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
     month: str = Query(None, description="Month (YYYY-MM). Defaults to current month."),
-    category: str = Query("ALL", description="Category: BILLED, UN-BILLED, or ALL")
+    category: str = Query("ALL", description="Category: BILLED, UN-BILLED, or ALL"),
+    db: Session = Depends(get_db)
 ):
     """
     Get monthly calendar view showing summary per employee.
     Returns condensed view with daily hours and leave indicators.
     """
-    db = SessionLocal()
-    try:
-        # Parse month
-        if month:
-            try:
-                year, mon = map(int, month.split("-"))
-                month_start = date(year, mon, 1)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
-        else:
-            today = date.today()
-            month_start = date(today.year, today.month, 1)
-        
-        # Calculate month end
-        if month_start.month == 12:
-            month_end = date(month_start.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date(month_start.year, month_start.month + 1, 1) - timedelta(days=1)
-        
-        # Get holidays for this month
-        month_holidays = {}
-        holidays_query = db.query(Holiday).filter(
-            Holiday.holiday_date >= month_start,
-            Holiday.holiday_date <= month_end,
-            Holiday.is_active == True
-        ).all()
-        
-        for holiday in holidays_query:
-            month_holidays[holiday.holiday_date.isoformat()] = {
-                "date": holiday.holiday_date.isoformat(),
-                "name": holiday.holiday_name,
-                "category": holiday.category,
-                "day_name": holiday.day_name
-            }
-        
-        # Get all active employees from the Employee master table (filtered by team and category)
-        emp_query = db.query(Employee).filter(Employee.is_active == True)
-        if team.upper() != "ALL":
-            # Map "DEV" to "DEVELOPMENT" for Employee table (Employee.team uses "DEVELOPMENT", not "DEV")
-            employee_team_filter = team.upper()
-            if employee_team_filter == "DEV":
-                employee_team_filter = "DEVELOPMENT"
-            emp_query = emp_query.filter(Employee.team == employee_team_filter)
-        if category.upper() != "ALL":
-            # Use case-insensitive exact match for category
-            # Match both "BILLED" and "UN-BILLED" (with or without hyphen)
-            category_upper = category.upper()
-            if category_upper == "UN-BILLED" or category_upper == "UNBILLED":
-                emp_query = emp_query.filter(
-                    or_(
-                        func.upper(Employee.category) == "UN-BILLED",
-                        func.upper(Employee.category) == "UNBILLED"
-                    )
-                )
-            else:
-                emp_query = emp_query.filter(func.upper(Employee.category) == category_upper)
-        all_employees = emp_query.all()
-        
-        # Get employee names for filtering timesheet data
-        employee_names = [emp.name for emp in all_employees]
-        
-        # Query timesheet data (filtered by employee names based on team/category)
-        query = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.date >= month_start,
-            EnhancedTimesheet.date <= month_end
-        )
-        if team.upper() != "ALL":
-            query = query.filter(EnhancedTimesheet.team == team.upper())
-        if category.upper() != "ALL" and employee_names:
-            query = query.filter(EnhancedTimesheet.employee_name.in_(employee_names))
-        entries = query.all()
-        
-        # Query leaves (filtered by employee names based on team/category)
-        leave_query = db.query(LeaveEntry).filter(
-            LeaveEntry.date >= month_start,
-            LeaveEntry.date <= month_end
-        )
-        if team.upper() != "ALL":
-            leave_query = leave_query.filter(LeaveEntry.team == team.upper())
-        if category.upper() != "ALL" and employee_names:
-            leave_query = leave_query.filter(LeaveEntry.employee_name.in_(employee_names))
-        leaves = leave_query.all()
-        
-        # Build employee data
-        employee_data = defaultdict(lambda: {
-            "days": defaultdict(lambda: {
-                "hours": 0, 
-                "productive_hours": 0,
-                "hours_logged": 0,
-                "leave_type": None, 
-                "entries": []
-            }),
-            "total_hours": 0,
-            "total_productive_hours": 0,
-            "total_leave_days": 0,
-            "working_days": 0
-        })
-        
-        # Initialize all active employees (even those with no entries)
-        for emp in all_employees:
-            employee_data[emp.name]["employee_id"] = emp.employee_id
-            employee_data[emp.name]["employee_name"] = emp.name
-            employee_data[emp.name]["team"] = emp.team
-        
-        for entry in entries:
-            name = entry.employee_name
-            day = entry.date.isoformat()
-            employee_data[name]["employee_id"] = entry.employee_id
-            employee_data[name]["employee_name"] = name
-            employee_data[name]["team"] = entry.team
-            
-            # Consolidate productive hours (preferred) or hours_logged (fallback) per day
-            productive = entry.productive_hours if entry.productive_hours is not None else None
-            time_spent = entry.hours_logged or 0
-            
-            # Use productive hours if available, otherwise use time spent
-            display_hours = productive if productive is not None else time_spent
-            
-            employee_data[name]["days"][day]["productive_hours"] += productive if productive is not None else 0
-            employee_data[name]["days"][day]["hours_logged"] += time_spent
-            employee_data[name]["days"][day]["hours"] = display_hours  # Display value
-            employee_data[name]["days"][day]["entries"].append(entry.ticket_id)
-            if entry.leave_type:
-                employee_data[name]["days"][day]["leave_type"] = entry.leave_type
-            employee_data[name]["total_hours"] += display_hours
-            employee_data[name]["total_productive_hours"] += productive if productive is not None else 0
-        
-        for leave in leaves:
-            name = leave.employee_name
-            day = leave.date.isoformat()
-            employee_data[name]["days"][day]["leave_type"] = leave.leave_type
-            employee_data[name]["total_leave_days"] += 1
-        
-        # Calculate working days and average productive hours
-        today = date.today()
-        for name, data in employee_data.items():
-            # Add holiday/weekend information to each day
-            for day_key in list(data["days"].keys()):
-                day_date = datetime.strptime(day_key, "%Y-%m-%d").date()
-                is_weekend_day = is_weekend(day_date)
-                holiday_info = month_holidays.get(day_key)
-                
-                data["days"][day_key]["is_weekend"] = is_weekend_day
-                data["days"][day_key]["is_holiday"] = holiday_info is not None
-                data["days"][day_key]["holiday_name"] = holiday_info["name"] if holiday_info else None
-                data["days"][day_key]["holiday_category"] = holiday_info["category"] if holiday_info else None
-                data["days"][day_key]["is_working_day"] = not is_weekend_day and holiday_info is None
-            
-            # Only count past working days (excluding weekends and holidays)
-            past_working_days = [
-                day_key for day_key, d in data["days"].items() 
-                if datetime.strptime(day_key, "%Y-%m-%d").date() <= today 
-                and d.get("is_working_day", True)
-            ]
-            data["working_days"] = len(past_working_days)
-            
-            # Calculate average productive hours (only for past working days, excluding leave days)
-            past_productive_days = [
-                d for day_key, d in data["days"].items() 
-                if datetime.strptime(day_key, "%Y-%m-%d").date() <= today 
-                and d.get("is_working_day", True)
-                and (d.get("productive_hours", 0) > 0 or d.get("hours_logged", 0) > 0) 
-                and not d.get("leave_type")  # Exclude leave days
-            ]
-            if past_productive_days:
-                total_productive = sum(d.get("productive_hours") or d.get("hours_logged", 0) for d in past_productive_days)
-                data["avg_productive_hours"] = round(total_productive / len(past_productive_days), 1)
-            else:
-                data["avg_productive_hours"] = 0
-            
-            # Convert defaultdict to regular dict for JSON serialization
-            data["days"] = dict(data["days"])
-            for day in data["days"]:
-                data["days"][day] = dict(data["days"][day])
-        
-        # Calculate total working days in the month
-        total_working_days = get_working_days_in_range(month_start, month_end, db, include_optional_holidays=False)
-        
-        return {
-            "month": month_start.strftime("%Y-%m"),
-            "month_start": month_start.isoformat(),
-            "month_end": month_end.isoformat(),
-            "team": team,
-            "working_days": total_working_days,
-            "holidays": list(month_holidays.values()),
-            "employees": [dict(v) for v in employee_data.values()]
+    # Keyed on today's date too: past-day working-day counts and averages depend on it
+    return cached_json_response(
+        request, CALENDAR_CACHE, ("monthly", team, month, category, date.today()),
+        lambda: build_monthly_calendar(db, team, month, category)
+    )
+
+
+# Skeletons for /calendar/monthly employee and day entries; copied per entry instead of built by defaultdict factories
+MONTHLY_EMPLOYEE_TEMPLATE = {
+    "total_hours": 0,
+    "total_productive_hours": 0,
+    "total_leave_days": 0,
+    "working_days": 0
+}
+MONTHLY_DAY_TEMPLATE = {
+    "hours": 0,
+    "productive_hours": 0,
+    "hours_logged": 0,
+    "leave_type": None
+}
+
+
+def build_monthly_calendar(db: Session, team: str, month: Optional[str], category: str) -> dict:
+    """Build the /calendar/monthly response."""
+    team_code = team.upper()
+    month_start, month_end = get_month_bounds(month)
+    
+    # Get holidays for this month
+    month_holidays = {}
+    holidays_query = get_period_holidays(month_start, month_end)
+    
+    for holiday in holidays_query:
+        month_holidays[holiday.holiday_date] = {
+            "date": holiday.holiday_date,
+            "name": holiday.holiday_name,
+            "category": holiday.category,
+            "day_name": holiday.day_name
         }
-    finally:
-        db.close()
+    
+    # Get all active employees from the Employee master table (filtered by team and category)
+    # Read-only calendar queries select plain columns; no ORM objects are needed
+    emp_query = db.query(Employee.name, Employee.employee_id, Employee.team).filter(Employee.is_active == True)
+    if team_code != "ALL":
+        # Employee.team uses "DEVELOPMENT", not "DEV"
+        emp_query = emp_query.filter(Employee.team == employee_team(team_code))
+    if category.upper() != "ALL":
+        # Case-insensitive match on the indexed normalized category ("UNBILLED" matches "UN-BILLED")
+        emp_query = emp_query.filter(Employee.category_norm == normalize_employee_category(category))
+    all_employees = emp_query.all()
+    
+    # Filter timesheet/leave rows with the employee query as a subquery rather than binding every name
+    employee_names = emp_query.with_entities(Employee.name).statement
+    
+    # Query timesheet data pre-summed per employee and day (filtered by employee names based on team/category)
+    # Productive hours are preferred for display, falling back to hours_logged when not recorded
+    query = db.query(
+        EnhancedTimesheet.employee_name,
+        EnhancedTimesheet.date,
+        func.max(EnhancedTimesheet.employee_id).label("employee_id"),
+        func.max(EnhancedTimesheet.team).label("team"),
+        func.sum(func.coalesce(EnhancedTimesheet.productive_hours, 0)).label("productive_hours"),
+        func.sum(func.coalesce(EnhancedTimesheet.hours_logged, 0)).label("hours_logged"),
+        func.sum(func.coalesce(EnhancedTimesheet.productive_hours, EnhancedTimesheet.hours_logged, 0)).label("display_hours"),
+        func.max(EnhancedTimesheet.leave_type).label("leave_type"),
+        func.array_agg(EnhancedTimesheet.ticket_id).label("tickets")
+    ).filter(
+        EnhancedTimesheet.date >= month_start,
+        EnhancedTimesheet.date <= month_end
+    )
+    if team_code != "ALL":
+        query = query.filter(EnhancedTimesheet.team == team_code)
+    if category.upper() != "ALL" and all_employees:
+        query = query.filter(EnhancedTimesheet.employee_name.in_(employee_names))
+    daily_totals = query.group_by(EnhancedTimesheet.employee_name, EnhancedTimesheet.date).all()
+    
+    # Query leaves (filtered by employee names based on team/category)
+    leave_query = db.query(LeaveEntry.employee_name, LeaveEntry.date, LeaveEntry.leave_type).filter(
+        LeaveEntry.date >= month_start,
+        LeaveEntry.date <= month_end
+    )
+    if team_code != "ALL":
+        leave_query = leave_query.filter(LeaveEntry.team == team_code)
+    if category.upper() != "ALL" and all_employees:
+        leave_query = leave_query.filter(LeaveEntry.employee_name.in_(employee_names))
+    leaves = leave_query.all()
+    
+    # Initialize all active employees (even those with no entries)
+    employee_data = {
+        emp.name: {
+            **MONTHLY_EMPLOYEE_TEMPLATE,
+            "days": {},
+            "employee_id": emp.employee_id,
+            "employee_name": emp.name,
+            "team": emp.team
+        }
+        for emp in all_employees
+    }
+    
+    # Timesheet rows may belong to people missing from the employee master; they get their own entry
+    for row in daily_totals:
+        name = row.employee_name
+        data = employee_data.get(name)
+        if data is None:
+            data = employee_data[name] = {**MONTHLY_EMPLOYEE_TEMPLATE, "days": {}}
+        data["employee_id"] = row.employee_id
+        data["employee_name"] = name
+        data["team"] = row.team
+        
+        data["days"][row.date] = {
+            **MONTHLY_DAY_TEMPLATE,
+            "productive_hours": row.productive_hours,
+            "hours_logged": row.hours_logged,
+            "hours": row.display_hours,  # Display value
+            "leave_type": row.leave_type,
+            "entries": list(row.tickets)
+        }
+    
+    # Monthly totals per employee, summed with numpy over all daily rows at once
+    if daily_totals:
+        names, employee_index = np.unique([row.employee_name for row in daily_totals], return_inverse=True)
+        total_hours = np.bincount(employee_index, weights=[row.display_hours for row in daily_totals])
+        total_productive = np.bincount(employee_index, weights=[row.productive_hours for row in daily_totals])
+        for name, hours, productive in zip(names.tolist(), total_hours.tolist(), total_productive.tolist()):
+            employee_data[name]["total_hours"] = hours
+            employee_data[name]["total_productive_hours"] = productive
+    
+    for leave in leaves:
+        name = leave.employee_name
+        data = employee_data.get(name)
+        if data is None:
+            data = employee_data[name] = {**MONTHLY_EMPLOYEE_TEMPLATE, "days": {}}
+        day = leave.date
+        day_data = data["days"].get(day)
+        if day_data is None:
+            day_data = data["days"][day] = {**MONTHLY_DAY_TEMPLATE, "entries": []}
+        day_data["leave_type"] = leave.leave_type
+        data["total_leave_days"] += 1
+    
+    # Holiday/weekend information for every day of the month, computed once and shared by all employees
+    today = date.today()
+    month_days = [month_start + timedelta(days=offset) for offset in range((month_end - month_start).days + 1)]
+    weekend_days = {d for d in month_days if d.weekday() > 4}
+    day_meta = {}
+    for day_date in month_days:
+        is_weekend_day = day_date in weekend_days
+        holiday_info = month_holidays.get(day_date)
+        
+        day_meta[day_date] = {
+            "is_weekend": is_weekend_day,
+            "is_holiday": holiday_info is not None,
+            "holiday_name": holiday_info["name"] if holiday_info else None,
+            "holiday_category": holiday_info["category"] if holiday_info else None,
+            "is_working_day": not is_weekend_day and holiday_info is None
+        }
+    
+    # Calculate working days and average productive hours
+    for name, data in employee_data.items():
+        # Add holiday/weekend information to each day
+        for day_key, d in data["days"].items():
+            d.update(day_meta[day_key])
+        
+        # Only count past working days (excluding weekends and holidays)
+        past_working_days = [
+            day_key for day_key, d in data["days"].items() 
+            if day_key <= today
+            and d["is_working_day"]
+        ]
+        data["working_days"] = len(past_working_days)
+        
+        # Calculate average productive hours (only for past working days, excluding leave days)
+        past_productive_days = [
+            d for day_key, d in data["days"].items() 
+            if day_key <= today
+            and d["is_working_day"]
+            and (d.get("productive_hours", 0) > 0 or d.get("hours_logged", 0) > 0) 
+            and not d.get("leave_type")  # Exclude leave days
+        ]
+        if past_productive_days:
+            total_productive = sum(d.get("productive_hours") or d.get("hours_logged", 0) for d in past_productive_days)
+            data["avg_productive_hours"] = round(total_productive / len(past_productive_days), 1)
+        else:
+            data["avg_productive_hours"] = 0
+    
+    # Calculate total working days in the month
+    total_working_days = count_working_days(
+        month_start, month_end, {h.holiday_date for h in holidays_query if h.category == 'Holiday'}
+    )
+    
+    return {
+        "month": month_start.strftime("%Y-%m"),
+        "month_start": month_start,
+        "month_end": month_end,
+        "team": team,
+        "working_days": total_working_days,
+        "holidays": list(month_holidays.values()),
+        "employees": list(employee_data.values())
+    }
 
 
-@app.get("/calendar/employee/{employee_id}")
+# Per-employee calendar queries, built once and executed with employee_name/start_date/end_date params
+EMPLOYEE_CALENDAR_ENTRIES_STMT = select(
+    EnhancedTimesheet.date,
+    EnhancedTimesheet.productive_hours,
+    EnhancedTimesheet.hours_logged,
+    EnhancedTimesheet.ticket_id,
+    EnhancedTimesheet.task_description,
+    EnhancedTimesheet.project_name
+).where(
+    EnhancedTimesheet.employee_name == bindparam("employee_name"),
+    EnhancedTimesheet.date >= bindparam("start_date"),
+    EnhancedTimesheet.date <= bindparam("end_date")
+).order_by(EnhancedTimesheet.date)
+EMPLOYEE_CALENDAR_LEAVES_STMT = select(LeaveEntry.date, LeaveEntry.leave_type).where(
+    LeaveEntry.employee_name == bindparam("employee_name"),
+    LeaveEntry.date >= bindparam("start_date"),
+    LeaveEntry.date <= bindparam("end_date")
+)
+EMPLOYEE_CALENDAR_PLANNED_STMT = select(
+    PlannedTask.id,
+    PlannedTask.ticket_id,
+    PlannedTask.task_title,
+    PlannedTask.planned_hours,
+    PlannedTask.priority,
+    PlannedTask.status,
+    PlannedTask.planned_date
+).where(
+    PlannedTask.employee_name == bindparam("employee_name"),
+    PlannedTask.planned_date >= bindparam("start_date"),
+    PlannedTask.planned_date <= bindparam("end_date")
+).order_by(PlannedTask.planned_date)
+
+
+@app.get("/calendar/employee/{employee_id}", response_class=ORJSONResponse)
 def get_employee_calendar(
+    request: Request,
     employee_id: str,
     period: str = Query("week", description="Period: week or month"),
-    date_str: str = Query(None, description="Reference date (YYYY-MM-DD)")
+    date_str: str = Query(None, description="Reference date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
 ):
     """
     Get calendar data for a specific employee.
     """
-    db = SessionLocal()
-    try:
-        # Find employee
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        if not employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
-        
-        # Parse date
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        else:
-            target_date = date.today()
-        
-        # Calculate period boundaries
-        if period == "week":
-            start_date = target_date - timedelta(days=target_date.weekday())
-            end_date = start_date + timedelta(days=6)
-        else:  # month
-            start_date = date(target_date.year, target_date.month, 1)
-            if start_date.month == 12:
-                end_date = date(start_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = date(start_date.year, start_date.month + 1, 1) - timedelta(days=1)
-        
-        # Get holidays for this period
-        period_holidays = {}
-        holidays_query = db.query(Holiday).filter(
-            Holiday.holiday_date >= start_date,
-            Holiday.holiday_date <= end_date,
-            Holiday.is_active == True
-        ).all()
-        
-        for holiday in holidays_query:
-            period_holidays[holiday.holiday_date.isoformat()] = {
-                "name": holiday.holiday_name,
-                "category": holiday.category,
-                "day_name": holiday.day_name
-            }
-        
-        # Query timesheet entries
-        entries = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.employee_name == employee.name,
-            EnhancedTimesheet.date >= start_date,
-            EnhancedTimesheet.date <= end_date
-        ).order_by(EnhancedTimesheet.date).all()
-        
-        # Query leaves
-        leaves = db.query(LeaveEntry).filter(
-            LeaveEntry.employee_name == employee.name,
-            LeaveEntry.date >= start_date,
-            LeaveEntry.date <= end_date
-        ).all()
-        leave_map = {l.date.isoformat(): l.leave_type for l in leaves}
-        
-        # Query planned tasks
-        planned = db.query(PlannedTask).filter(
-            PlannedTask.employee_name == employee.name,
-            PlannedTask.planned_date >= start_date,
-            PlannedTask.planned_date <= end_date
-        ).order_by(PlannedTask.planned_date).all()
-        
-        # Build day-by-day data
-        days = {}
-        current = start_date
-        while current <= end_date:
-            day_key = current.isoformat()
-            is_weekend_day = is_weekend(current)
-            holiday_info = period_holidays.get(day_key)
-            
-            days[day_key] = {
-                "date": day_key,
-                "actual_entries": [],
-                "planned_tasks": [],
-                "total_actual_hours": 0,
-                "total_productive_hours": 0,
-                "hours_logged": 0,
-                "total_planned_hours": 0,
-                "leave_type": leave_map.get(day_key),
-                "is_weekend": is_weekend_day,
-                "is_holiday": holiday_info is not None,
-                "holiday_name": holiday_info["name"] if holiday_info else None,
-                "holiday_category": holiday_info["category"] if holiday_info else None,
-                "is_working_day": not is_weekend_day and holiday_info is None
-            }
-            current += timedelta(days=1)
-        
-        # Add actual entries - use productive_hours if available, otherwise hours_logged
-        for entry in entries:
-            day_key = entry.date.isoformat()
-            if day_key in days:
-                productive = entry.productive_hours or 0
-                hours_logged = entry.hours_logged or 0
-                display_hours = productive if productive > 0 else hours_logged
-                
-                days[day_key]["actual_entries"].append({
-                    "ticket_id": entry.ticket_id,
-                    "hours": display_hours,
-                    "productive_hours": productive,
-                    "hours_logged": hours_logged,
-                    "task_description": entry.task_description,
-                    "project_name": entry.project_name
-                })
-                days[day_key]["total_actual_hours"] += display_hours
-                days[day_key]["total_productive_hours"] += productive
-                days[day_key]["hours_logged"] += hours_logged
-        
-        # Add planned tasks
-        for task in planned:
-            day_key = task.planned_date.isoformat()
-            if day_key in days:
-                days[day_key]["planned_tasks"].append({
-                    "id": task.id,
-                    "ticket_id": task.ticket_id,
-                    "task_title": task.task_title,
-                    "planned_hours": task.planned_hours,
-                    "priority": task.priority,
-                    "status": task.status
-                })
-                days[day_key]["total_planned_hours"] += task.planned_hours or 0
-        
-        # Calculate working days
-        working_days = get_working_days_in_range(start_date, end_date, db, include_optional_holidays=False)
-        
-        # Calculate summary
-        total_actual = sum(d["total_actual_hours"] for d in days.values())
-        total_productive = sum(d["total_productive_hours"] for d in days.values())
-        total_hours_logged = sum(d["hours_logged"] for d in days.values())
-        
-        return {
-            "employee_id": employee.employee_id,
-            "employee_name": employee.name,
-            "team": employee.team,
-            "period": period,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "working_days": working_days,
-            "holidays": list(period_holidays.values()),
-            "days": days,
-            "summary": {
-                "total_actual_hours": total_actual,
-                "total_productive_hours": total_productive,
-                "total_hours_logged": total_hours_logged,
-                "total_planned_hours": sum(d["total_planned_hours"] for d in days.values()),
-                "leave_days": len([d for d in days.values() if d["leave_type"]]),
-                "working_days": working_days
-            }
+    start_date, end_date = get_period_bounds(period, date_str)
+    return cached_json_response(
+        request, calendar_cache_for(end_date), ("employee", employee_id, period, start_date, end_date),
+        lambda: build_employee_calendar(db, employee_id, period, start_date, end_date)
+    )
+
+
+def build_employee_calendar(db: Session, employee_id: str, period: str, start_date: date, end_date: date) -> dict:
+    """Build the /calendar/employee/{employee_id} response."""
+    # Find employee
+    employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    # Holidays, timesheet entries, leaves and planned tasks for this period
+    holidays_query = get_period_holidays(start_date, end_date)
+    
+    # The three queries are independent, so run them side by side instead of one after another
+    entries, leaves, planned = fetch_all_concurrently(
+        EMPLOYEE_CALENDAR_ENTRIES_STMT, EMPLOYEE_CALENDAR_LEAVES_STMT, EMPLOYEE_CALENDAR_PLANNED_STMT,
+        params={"employee_name": employee.name, "start_date": start_date, "end_date": end_date}
+    )
+    
+    period_holidays = {}
+    for holiday in holidays_query:
+        period_holidays[holiday.holiday_date] = {
+            "name": holiday.holiday_name,
+            "category": holiday.category,
+            "day_name": holiday.day_name
+        }
+    leave_map = {l.date: l.leave_type for l in leaves}
+    
+    # Build day-by-day data keyed by date (serialized as ISO strings); dates and weekend flags
+    # for the whole period are computed as arrays
+    period_dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + np.timedelta64(1, 'D'))
+    day_keys = period_dates.tolist()
+    weekend_flags = (~np.is_busday(period_dates, weekmask='1111100')).tolist()
+    days = {}
+    for day_key, is_weekend_day in zip(day_keys, weekend_flags):
+        holiday_info = period_holidays.get(day_key)
+        
+        days[day_key] = {
+            "date": day_key,
+            "actual_entries": [],
+            "planned_tasks": [],
+            "total_actual_hours": 0,
+            "total_productive_hours": 0,
+            "hours_logged": 0,
+            "total_planned_hours": 0,
+            "leave_type": leave_map.get(day_key),
+            "is_weekend": is_weekend_day,
+            "is_holiday": holiday_info is not None,
+            "holiday_name": holiday_info["name"] if holiday_info else None,
+            "holiday_category": holiday_info["category"] if holiday_info else None,
+            "is_working_day": not is_weekend_day and holiday_info is None
+        }
+    
+    # Period totals are kept up to date while the entries and tasks are added
+    total_actual = total_productive = total_hours_logged = total_planned = 0
+    
+    # Add actual entries - use productive_hours if available, otherwise hours_logged
+    # (entries and planned tasks are queried within the period, so every date has a day)
+    for entry in entries:
+        day_key = entry.date
+        productive = entry.productive_hours or 0
+        hours_logged = entry.hours_logged or 0
+        display_hours = productive if productive > 0 else hours_logged
+        
+        days[day_key]["actual_entries"].append({
+            "ticket_id": entry.ticket_id,
+            "hours": display_hours,
+            "productive_hours": productive,
+            "hours_logged": hours_logged,
+            "task_description": entry.task_description,
+            "project_name": entry.project_name
+        })
+        days[day_key]["total_actual_hours"] += display_hours
+        days[day_key]["total_productive_hours"] += productive
+        days[day_key]["hours_logged"] += hours_logged
+        total_actual += display_hours
+        total_productive += productive
+        total_hours_logged += hours_logged
+    
+    # Add planned tasks
+    for task in planned:
+        day_key = task.planned_date
+        days[day_key]["planned_tasks"].append({
+            "id": task.id,
+            "ticket_id": task.ticket_id,
+            "task_title": task.task_title,
+            "planned_hours": task.planned_hours,
+            "priority": task.priority,
+            "status": task.status
+        })
+        days[day_key]["total_planned_hours"] += task.planned_hours or 0
+        total_planned += task.planned_hours or 0
+    
+    # Calculate working days
+    working_days = count_working_days(
+        start_date, end_date, {h.holiday_date for h in holidays_query if h.category == 'Holiday'}
+    )
+    
+    # Leave days: one per date in the period with a leave type
+    leave_days = sum(1 for leave_type in leave_map.values() if leave_type)
+    
+    return {
+        "employee_id": employee.employee_id,
+        "employee_name": employee.name,
+        "team": employee.team,
+        "period": period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "working_days": working_days,
+        "holidays": list(period_holidays.values()),
+        "days": days,
+        "summary": {
+            "total_actual_hours": total_actual,
+            "total_productive_hours": total_productive,
+            "total_hours_logged": total_hours_logged,
+            "total_planned_hours": total_planned,
+            "leave_days": leave_days,
+            "working_days": working_days
         }
-    finally:
-        db.close()
+    }
 
 
-@app.get("/calendar/ticket/{ticket_id}/timesheet")
-def get_ticket_timesheet_entries(ticket_id: str):
+@app.get("/calendar/ticket/{ticket_id}/timesheet", response_class=ORJSONResponse)
+def get_ticket_timesheet_entries(request: Request, ticket_id: str, db: Session = Depends(get_db)):
     """
     Get all timesheet entries for a specific ticket.
     Returns entries from all employees who worked on this ticket.
     """
-    db = SessionLocal()
-    try:
-        # Query timesheet entries for this ticket
-        entries = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.ticket_id == ticket_id
-        ).order_by(
-            EnhancedTimesheet.date.desc(),
-            EnhancedTimesheet.employee_name
-        ).all()
-        
-        # Calculate summary
-        total_hours = sum(e.hours_logged or 0 for e in entries)
-        unique_employees = set(e.employee_name for e in entries)
-        unique_dates = set(e.date for e in entries)
-        
-        return {
-            "ticket_id": ticket_id,
-            "entries": [
-                {
-                    "id": entry.id,
-                    "date": entry.date.isoformat(),
-                    "employee_id": entry.employee_id,
-                    "employee_name": entry.employee_name,
-                    "team": entry.team,
-                    "hours_logged": entry.hours_logged,
-                    "task_description": entry.task_description,
-                    "project_name": entry.project_name,
-                    "leave_type": entry.leave_type
-                }
-                for entry in entries
-            ],
-            "summary": {
-                "total_hours": total_hours,
-                "total_entries": len(entries),
-                "unique_contributors": len(unique_employees),
-                "days_worked": len(unique_dates),
-                "contributors": list(unique_employees)
+    return cached_json_response(
+        request, CALENDAR_CACHE, ("ticket", ticket_id), lambda: build_ticket_timesheet(db, ticket_id)
+    )
+
+
+def build_ticket_timesheet(db: Session, ticket_id: str) -> dict:
+    """Build the /calendar/ticket/{ticket_id}/timesheet response."""
+    # Query timesheet entries for this ticket
+    entries_query = db.query(
+        EnhancedTimesheet.id,
+        EnhancedTimesheet.date,
+        EnhancedTimesheet.employee_id,
+        EnhancedTimesheet.employee_name,
+        EnhancedTimesheet.team,
+        EnhancedTimesheet.hours_logged,
+        EnhancedTimesheet.task_description,
+        EnhancedTimesheet.project_name,
+        EnhancedTimesheet.leave_type
+    ).filter(
+        EnhancedTimesheet.ticket_id == ticket_id
+    ).order_by(
+        EnhancedTimesheet.date.desc(),
+        EnhancedTimesheet.employee_name
+    )
+    
+    entries = entries_query.all()
+    
+    # Summary figures come from the same rows as the entry list, so they always agree with it
+    contributors = list(dict.fromkeys(entry.employee_name for entry in entries))
+    
+    return {
+        "ticket_id": ticket_id,
+        "entries": [
+            {
+                "id": entry.id,
+                "date": entry.date,
+                "employee_id": entry.employee_id,
+                "employee_name": entry.employee_name,
+                "team": entry.team,
+                "hours_logged": entry.hours_logged,
+                "task_description": entry.task_description,
+                "project_name": entry.project_name,
+                "leave_type": entry.leave_type
             }
+            for entry in entries
+        ],
+        "summary": {
+            "total_hours": sum(entry.hours_logged or 0 for entry in entries),
+            "total_entries": len(entries),
+            "unique_contributors": len(contributors),
+            "days_worked": len({entry.date for entry in entries}),
+            "contributors": contributors
         }
-    finally:
-        db.close()
+    }
 
 
-@app.get("/calendar/leaves")
+@app.get("/calendar/leaves", response_class=ORJSONResponse)
 def get_team_leaves(
+    request: Request,
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
-    month: str = Query(None, description="Month (YYYY-MM). Defaults to current month.")
+    month: str = Query(None, description="Month (YYYY-MM). Defaults to current month."),
+    db: Session = Depends(get_db)
 ):
     """
     Get leave entries for a team in a given month.
     """
-    db = SessionLocal()
-    try:
-        # Parse month
-        if month:
-            try:
-                year, mon = map(int, month.split("-"))
-                month_start = date(year, mon, 1)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
-        else:
-            today = date.today()
-            month_start = date(today.year, today.month, 1)
-        
-        # Calculate month end
-        if month_start.month == 12:
-            month_end = date(month_start.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date(month_start.year, month_start.month + 1, 1) - timedelta(days=1)
+    month_start, month_end = get_month_bounds(month)
+    return cached_json_response(
+        request, calendar_cache_for(month_end), ("leaves", team, month_start),
+        lambda: build_team_leaves(db, team, month_start, month_end)
+    )
 
-        # Query leaves
-        query = db.query(LeaveEntry).filter(
-            LeaveEntry.date >= month_start,
-            LeaveEntry.date <= month_end
-        )
-        if team.upper() != "ALL":
-            query = query.filter(LeaveEntry.team == team.upper())
-        
-        leaves = query.order_by(LeaveEntry.date, LeaveEntry.employee_name).all()
-        
-        return {
-            "month": month_start.strftime("%Y-%m"),
-            "team": team,
-            "leaves": [
-                {
-                    "id": l.id,
-                    "employee_id": l.employee_id,
-                    "employee_name": l.employee_name,
-                    "date": l.date.isoformat(),
-                    "leave_type": l.leave_type,
-                    "hours": l.hours,
-                    "status": l.status
-                }
-                for l in leaves
-            ],
-            "summary": {
-                "total_leave_entries": len(leaves),
-                "by_type": dict(defaultdict(int, {l.leave_type: sum(1 for x in leaves if x.leave_type == l.leave_type) for l in leaves}))
+
+def build_team_leaves(db: Session, team: str, month_start: date, month_end: date) -> dict:
+    """Build the /calendar/leaves response."""
+    # Query leaves
+    query = db.query(
+        LeaveEntry.id,
+        LeaveEntry.employee_id,
+        LeaveEntry.employee_name,
+        LeaveEntry.date,
+        LeaveEntry.leave_type,
+        LeaveEntry.hours,
+        LeaveEntry.status
+    ).filter(
+        LeaveEntry.date >= month_start,
+        LeaveEntry.date <= month_end
+    )
+    if team.upper() != "ALL":
+        query = query.filter(LeaveEntry.team == team.upper())
+    
+    leaves = query.order_by(LeaveEntry.date, LeaveEntry.employee_name).all()
+    
+    return {
+        "month": month_start.strftime("%Y-%m"),
+        "team": team,
+        "leaves": [
+            {
+                "id": l.id,
+                "employee_id": l.employee_id,
+                "employee_name": l.employee_name,
+                "date": l.date,
+                "leave_type": l.leave_type,
+                "hours": l.hours,
+                "status": l.status
             }
+            for l in leaves
+        ],
+        "summary": {
+            "total_leave_entries": len(leaves),
+            "by_type": dict(Counter(l.leave_type for l in leaves))
         }
-    finally:
-        db.close()
+    }
 
 
 # ===== TASK PLANNING API ENDPOINTS =====
 
-@app.get("/planning/weekly")
+@app.get("/planning/weekly", response_class=ORJSONResponse)
 def get_weekly_plan(
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
-    week_start: str = Query(None, description="Week start date (YYYY-MM-DD). Defaults to current week.")
+    week_start: str = Query(None, description="Week start date (YYYY-MM-DD). Defaults to current week."),
+    db: Session = Depends(get_db)
 ):
     """
     Get weekly task planning for a team.
     Returns planned tasks for each employee in the week.
     """
-    db = SessionLocal()
-    try:
-        # Parse week start
-        if week_start:
-            try:
-                start_date = datetime.strptime(week_start, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        else:
-            today = date.today()
-            start_date = today - timedelta(days=today.weekday())
-        
-        week_end = start_date + timedelta(days=6)
-        
-        # Query weekly plans
-        plan_query = db.query(WeeklyPlan).filter(
-            WeeklyPlan.week_start == start_date
-        )
-        if team.upper() != "ALL":
-            plan_query = plan_query.filter(WeeklyPlan.team == team.upper())
-        weekly_plans = plan_query.all()
-        
-        # Query individual planned tasks
-        task_query = db.query(PlannedTask).filter(
-            PlannedTask.planned_date >= start_date,
-            PlannedTask.planned_date <= week_end
-        )
-        if team.upper() != "ALL":
-            task_query = task_query.filter(PlannedTask.team == team.upper())
-        tasks = task_query.order_by(PlannedTask.employee_name, PlannedTask.planned_date).all()
-        
-        # Get employees
-        emp_query = db.query(Employee).filter(Employee.is_active == True)
-        if team.upper() != "ALL":
-            # Map "DEV" to "DEVELOPMENT" for Employee table (Employee.team uses "DEVELOPMENT", not "DEV")
-            employee_team_filter = team.upper()
-            if employee_team_filter == "DEV":
-                employee_team_filter = "DEVELOPMENT"
-            emp_query = emp_query.filter(Employee.team == employee_team_filter)
-        employees = emp_query.all()
-        
-        # Build response
-        employee_plans = {}
-        
-        for emp in employees:
-            employee_plans[emp.name] = {
-                "employee_id": emp.employee_id,
-                "employee_name": emp.name,
-                "team": emp.team,
+    team_code = team.upper()
+    # Parse week start
+    if week_start:
+        try:
+            start_date = datetime.strptime(week_start, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    else:
+        today = date.today()
+        start_date = today - timedelta(days=today.weekday())
+    
+    week_end = start_date + timedelta(days=6)
+    
+    # Query weekly plans
+    plan_query = db.query(
+        WeeklyPlan.id,
+        WeeklyPlan.employee_name,
+        WeeklyPlan.assigned_tickets,
+        WeeklyPlan.total_planned_hours,
+        WeeklyPlan.notes,
+        WeeklyPlan.status
+    ).filter(
+        WeeklyPlan.week_start == start_date
+    )
+    if team_code != "ALL":
+        plan_query = plan_query.filter(WeeklyPlan.team == team_code)
+    
+    # Query individual planned tasks
+    task_query = db.query(
+        PlannedTask.id,
+        PlannedTask.employee_id,
+        PlannedTask.employee_name,
+        PlannedTask.team,
+        PlannedTask.ticket_id,
+        PlannedTask.task_title,
+        PlannedTask.planned_date,
+        PlannedTask.planned_hours,
+        PlannedTask.priority,
+        PlannedTask.status,
+        PlannedTask.project_name
+    ).filter(
+        PlannedTask.planned_date >= start_date,
+        PlannedTask.planned_date <= week_end
+    )
+    if team_code != "ALL":
+        task_query = task_query.filter(PlannedTask.team == team_code)
+    task_query = task_query.order_by(PlannedTask.employee_name, PlannedTask.planned_date)
+    
+    # Get employees
+    emp_query = db.query(Employee.name, Employee.employee_id, Employee.team).filter(Employee.is_active == True)
+    if team_code != "ALL":
+        # Employee.team uses "DEVELOPMENT", not "DEV"
+        emp_query = emp_query.filter(Employee.team == employee_team(team_code))
+    
+    # The three queries are independent, so run them side by side instead of one after another
+    weekly_plans, tasks, employees = fetch_all_concurrently(
+        plan_query.statement, task_query.statement, emp_query.statement
+    )
+    
+    # Build response; every employee gets an empty task list for each day of the week,
+    # keyed by date and serialized as ISO strings
+    week_day_keys = [start_date + timedelta(days=i) for i in range(7)]
+    employee_plans = {}
+    
+    for emp in employees:
+        employee_plans[emp.name] = {
+            "employee_id": emp.employee_id,
+            "employee_name": emp.name,
+            "team": emp.team,
+            "weekly_plan": None,
+            "daily_tasks": {day_key: [] for day_key in week_day_keys}
+        }
+    
+    # Add weekly plans
+    for plan in weekly_plans:
+        name = plan.employee_name
+        if name in employee_plans:
+            employee_plans[name]["weekly_plan"] = {
+                "id": plan.id,
+                "assigned_tickets": plan.assigned_tickets,
+                "total_planned_hours": plan.total_planned_hours,
+                "notes": plan.notes,
+                "status": plan.status
+            }
+    
+    # Add daily tasks
+    for task in tasks:
+        name = task.employee_name
+        if name not in employee_plans:
+            employee_plans[name] = {
+                "employee_id": task.employee_id,
+                "employee_name": name,
+                "team": task.team,
                 "weekly_plan": None,
-                "daily_tasks": {}
+                "daily_tasks": {day_key: [] for day_key in week_day_keys}
             }
-            # Initialize days
-            for i in range(7):
-                day = start_date + timedelta(days=i)
-                employee_plans[emp.name]["daily_tasks"][day.isoformat()] = []
-        
-        # Add weekly plans
-        for plan in weekly_plans:
-            name = plan.employee_name
-            if name in employee_plans:
-                employee_plans[name]["weekly_plan"] = {
-                    "id": plan.id,
-                    "assigned_tickets": plan.assigned_tickets,
-                    "total_planned_hours": plan.total_planned_hours,
-                    "notes": plan.notes,
-                    "status": plan.status
-                }
-        
-        # Add daily tasks
-        for task in tasks:
-            name = task.employee_name
-            if name not in employee_plans:
-                employee_plans[name] = {
-                    "employee_id": task.employee_id,
-                    "employee_name": name,
-                    "team": task.team,
-                    "weekly_plan": None,
-                    "daily_tasks": {}
-                }
-                for i in range(7):
-                    day = start_date + timedelta(days=i)
-                    employee_plans[name]["daily_tasks"][day.isoformat()] = []
-            
-            day_key = task.planned_date.isoformat()
-            if day_key in employee_plans[name]["daily_tasks"]:
-                employee_plans[name]["daily_tasks"][day_key].append({
-                    "id": task.id,
-                    "ticket_id": task.ticket_id,
-                    "task_title": task.task_title,
-                    "planned_hours": task.planned_hours,
-                    "priority": task.priority,
-                    "status": task.status,
-                    "project_name": task.project_name
-                })
         
-        return {
-            "week_start": start_date.isoformat(),
-            "week_end": week_end.isoformat(),
-            "team": team,
-            "employees": list(employee_plans.values())
-        }
-    finally:
-        db.close()
+        # Tasks are queried within the week, so the day always exists
+        employee_plans[name]["daily_tasks"][task.planned_date].append({
+            "id": task.id,
+            "ticket_id": task.ticket_id,
+            "task_title": task.task_title,
+            "planned_hours": task.planned_hours,
+            "priority": task.priority,
+            "status": task.status,
+            "project_name": task.project_name
+        })
+    
+    return ORJSONResponse({
+        "week_start": start_date,
+        "week_end": week_end,
+        "team": team,
+        "employees": list(employee_plans.values())
+    })
 
 
 @app.post("/planning/task")
-def create_planned_task(task: PlannedTaskCreate):
+def create_planned_task(task: PlannedTaskCreate, db: Session = Depends(get_db)):
     """
     Create a new planned task for an employee.
     """
-    db = SessionLocal()
     try:
         # Look up employee ID if not provided
         employee_id = task.employee_id
         if not employee_id:
-            employee = db.query(Employee).filter(
-                Employee.name.ilike(f"%{task.employee_name}%")
-            ).first()
-            if employee:
-                employee_id = employee.employee_id
+            employee_id = find_employee_id_by_name(db, task.employee_name)
 
         new_task = PlannedTask(
             employee_id=employee_id,
@@ -6610,6 +6775,7 @@ def create_planned_task(task: PlannedTaskCreate):
         
         db.add(new_task)
         db.commit()
+        clear_calendar_views()
         db.refresh(new_task)
         
         return {
@@ -6628,16 +6794,13 @@ def create_planned_task(task: PlannedTaskCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.put("/planning/task/{task_id}")
-def update_planned_task(task_id: int, updates: PlannedTaskUpdate):
+def update_planned_task(task_id: int, updates: PlannedTaskUpdate, db: Session = Depends(get_db)):
     """
     Update an existing planned task.
     """
-    db = SessionLocal()
     try:
         task = db.query(PlannedTask).filter(PlannedTask.id == task_id).first()
         if not task:
@@ -6659,6 +6822,7 @@ def update_planned_task(task_id: int, updates: PlannedTaskUpdate):
             task.actual_hours = updates.actual_hours
         
         db.commit()
+        clear_calendar_views()
         db.refresh(task)
         
         return {
@@ -6680,16 +6844,13 @@ def update_planned_task(task_id: int, updates: PlannedTaskUpdate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.delete("/planning/task/{task_id}")
-def delete_planned_task(task_id: int):
+def delete_planned_task(task_id: int, db: Session = Depends(get_db)):
     """
     Delete a planned task.
     """
-    db = SessionLocal()
     try:
         task = db.query(PlannedTask).filter(PlannedTask.id == task_id).first()
         if not task:
@@ -6697,6 +6858,7 @@ def delete_planned_task(task_id: int):
         
         db.delete(task)
         db.commit()
+        clear_calendar_views()
         
         return {"success": True, "message": f"Task {task_id} deleted"}
     except HTTPException:
@@ -6704,16 +6866,13 @@ def delete_planned_task(task_id: int):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.post("/planning/weekly-plan")
-def create_weekly_plan(plan: WeeklyPlanCreate):
+def create_weekly_plan(plan: WeeklyPlanCreate, db: Session = Depends(get_db)):
     """
     Create or update a weekly plan for an employee.
     """
-    db = SessionLocal()
     try:
         # Calculate week details
         week_start = plan.week_start
@@ -6727,11 +6886,7 @@ def create_weekly_plan(plan: WeeklyPlanCreate):
         # Look up employee ID if not provided
         employee_id = plan.employee_id
         if not employee_id:
-            employee = db.query(Employee).filter(
-                Employee.name.ilike(f"%{plan.employee_name}%")
-            ).first()
-            if employee:
-                employee_id = employee.employee_id
+            employee_id = find_employee_id_by_name(db, plan.employee_name)
         
         # Calculate total planned hours from tickets
         total_hours = sum(t.get('estimated_hours', 0) for t in plan.assigned_tickets)
@@ -6785,16 +6940,13 @@ def create_weekly_plan(plan: WeeklyPlanCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.put("/planning/weekly-plan/{plan_id}")
-def update_weekly_plan(plan_id: int, updates: WeeklyPlanUpdate):
+def update_weekly_plan(plan_id: int, updates: WeeklyPlanUpdate, db: Session = Depends(get_db)):
     """
     Update a weekly plan.
     """
-    db = SessionLocal()
     try:
         plan = db.query(WeeklyPlan).filter(WeeklyPlan.id == plan_id).first()
         if not plan:
@@ -6827,88 +6979,117 @@ def update_weekly_plan(plan_id: int, updates: WeeklyPlanUpdate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 # ===== PLAN VS ACTUAL COMPARISON API =====
 
-@app.get("/planning/comparison")
+@dataclass(slots=True)
+class PlanVsActualTotals:
+    """Per-employee accumulator for /planning/comparison."""
+    employee_id: Optional[str] = None
+    employee_name: Optional[str] = None
+    team: Optional[str] = None
+    planned_hours: float = 0
+    actual_hours: float = 0
+    by_ticket: dict = field(default_factory=dict)
+
+
+@app.get("/planning/comparison", response_class=ORJSONResponse)
 def get_plan_vs_actual(
     employee_id: str = Query(None, description="Employee ID (optional, for individual comparison)"),
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
     period: str = Query("week", description="Period: week or month"),
-    date_str: str = Query(None, description="Reference date (YYYY-MM-DD)")
+    date_str: str = Query(None, description="Reference date (YYYY-MM-DD)"),
+    details: bool = Query(True, description="Include each employee's planned task and timesheet entry lists"),
+    db: Session = Depends(get_db)
 ):
     """
     Get plan vs actual comparison showing planned tasks against actual timesheet entries.
     Returns variance analysis and metrics.
     """
-    db = SessionLocal()
-    try:
-        # Parse date
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    # Parse date
+    if date_str:
+        try:
+            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    else:
+        target_date = date.today()
+    
+    # Calculate period boundaries
+    if period == "week":
+        start_date = target_date - timedelta(days=target_date.weekday())
+        end_date = start_date + timedelta(days=6)
+    else:  # month
+        start_date = date(target_date.year, target_date.month, 1)
+        if start_date.month == 12:
+            end_date = date(start_date.year + 1, 1, 1) - timedelta(days=1)
         else:
-            target_date = date.today()
-        
-        # Calculate period boundaries
-        if period == "week":
-            start_date = target_date - timedelta(days=target_date.weekday())
-            end_date = start_date + timedelta(days=6)
-        else:  # month
-            start_date = date(target_date.year, target_date.month, 1)
-            if start_date.month == 12:
-                end_date = date(start_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = date(start_date.year, start_date.month + 1, 1) - timedelta(days=1)
-        
-        # Build base queries
-        planned_query = db.query(PlannedTask).filter(
-            PlannedTask.planned_date >= start_date,
-            PlannedTask.planned_date <= end_date
-        )
-        actual_query = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.date >= start_date,
-            EnhancedTimesheet.date <= end_date
-        )
-        
-        # Filter by employee if specified
-        if employee_id:
-            employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-            if not employee:
-                raise HTTPException(status_code=404, detail="Employee not found")
-            planned_query = planned_query.filter(PlannedTask.employee_name == employee.name)
-            actual_query = actual_query.filter(EnhancedTimesheet.employee_name == employee.name)
-        elif team.upper() != "ALL":
-            planned_query = planned_query.filter(PlannedTask.team == team.upper())
-            actual_query = actual_query.filter(EnhancedTimesheet.team == team.upper())
-        
-        planned_tasks = planned_query.all()
-        actual_entries = actual_query.all()
-        
-        # Build comparison data by employee
-        employee_comparison = defaultdict(lambda: {
-            "planned_hours": 0,
-            "actual_hours": 0,
-            "variance": 0,
-            "variance_percent": 0,
-            "planned_tasks": [],
-            "actual_entries": [],
-            "by_ticket": {}
-        })
+            end_date = date(start_date.year, start_date.month + 1, 1) - timedelta(days=1)
+    
+    # Build base filters
+    planned_filters = [
+        PlannedTask.planned_date >= start_date,
+        PlannedTask.planned_date <= end_date
+    ]
+    actual_filters = [
+        EnhancedTimesheet.date >= start_date,
+        EnhancedTimesheet.date <= end_date
+    ]
+    
+    # Filter by employee if specified
+    if employee_id:
+        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+        if not employee:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        planned_filters.append(PlannedTask.employee_name == employee.name)
+        actual_filters.append(EnhancedTimesheet.employee_name == employee.name)
+    elif team.upper() != "ALL":
+        planned_filters.append(PlannedTask.team == team.upper())
+        actual_filters.append(EnhancedTimesheet.team == team.upper())
+    
+    # Planned and actual hours summed per employee and ticket by the database
+    planned_totals_query = db.query(
+        PlannedTask.employee_name,
+        PlannedTask.ticket_id,
+        func.max(PlannedTask.employee_id).label("employee_id"),
+        func.max(PlannedTask.team).label("team"),
+        func.sum(func.coalesce(PlannedTask.planned_hours, 0)).label("hours")
+    ).filter(*planned_filters).group_by(PlannedTask.employee_name, PlannedTask.ticket_id)
+    actual_totals_query = db.query(
+        EnhancedTimesheet.employee_name,
+        EnhancedTimesheet.ticket_id,
+        func.max(EnhancedTimesheet.employee_id).label("employee_id"),
+        func.max(EnhancedTimesheet.team).label("team"),
+        func.sum(func.coalesce(EnhancedTimesheet.hours_logged, 0)).label("hours")
+    ).filter(*actual_filters).group_by(EnhancedTimesheet.employee_name, EnhancedTimesheet.ticket_id)
+    
+    # The individual rows (only loaded when the lists are requested) are streamed in batches
+    # and turned into response items as they arrive, never held as a full result
+    planned_by_employee = defaultdict(list)
+    actual_by_employee = defaultdict(list)
+    if details:
+        planned_query = db.query(
+            PlannedTask.id,
+            PlannedTask.employee_name,
+            PlannedTask.ticket_id,
+            PlannedTask.task_title,
+            PlannedTask.planned_hours,
+            PlannedTask.actual_hours,
+            PlannedTask.priority,
+            PlannedTask.status,
+            PlannedTask.planned_date
+        ).filter(*planned_filters)
+        actual_query = db.query(
+            EnhancedTimesheet.employee_name,
+            EnhancedTimesheet.ticket_id,
+            EnhancedTimesheet.hours_logged,
+            EnhancedTimesheet.task_description,
+            EnhancedTimesheet.date
+        ).filter(*actual_filters)
         
-        # Process planned tasks
-        for task in planned_tasks:
-            name = task.employee_name
-            employee_comparison[name]["employee_id"] = task.employee_id
-            employee_comparison[name]["employee_name"] = name
-            employee_comparison[name]["team"] = task.team
-            employee_comparison[name]["planned_hours"] += task.planned_hours or 0
-            employee_comparison[name]["planned_tasks"].append({
+        for task in db.execute(planned_query.statement.execution_options(yield_per=1000)):
+            planned_by_employee[task.employee_name].append({
                 "id": task.id,
                 "ticket_id": task.ticket_id,
                 "task_title": task.task_title,
@@ -6916,236 +7097,268 @@ def get_plan_vs_actual(
                 "actual_hours": task.actual_hours,
                 "priority": task.priority,
                 "status": task.status,
-                "date": task.planned_date.isoformat()
+                "date": task.planned_date
             })
-            
-            # Track by ticket
-            ticket = task.ticket_id
-            if ticket not in employee_comparison[name]["by_ticket"]:
-                employee_comparison[name]["by_ticket"][ticket] = {
-                    "planned_hours": 0,
-                    "actual_hours": 0
-                }
-            employee_comparison[name]["by_ticket"][ticket]["planned_hours"] += task.planned_hours or 0
-        
-        # Process actual entries
-        for entry in actual_entries:
-            name = entry.employee_name
-            if name not in employee_comparison:
-                employee_comparison[name]["employee_id"] = entry.employee_id
-                employee_comparison[name]["employee_name"] = name
-                employee_comparison[name]["team"] = entry.team
-            
-            employee_comparison[name]["actual_hours"] += entry.hours_logged or 0
-            employee_comparison[name]["actual_entries"].append({
+        for entry in db.execute(actual_query.statement.execution_options(yield_per=1000)):
+            actual_by_employee[entry.employee_name].append({
                 "ticket_id": entry.ticket_id,
                 "hours": entry.hours_logged,
                 "task_description": entry.task_description,
-                "date": entry.date.isoformat()
+                "date": entry.date
             })
-            
-            # Track by ticket
-            ticket = entry.ticket_id
-            if ticket not in employee_comparison[name]["by_ticket"]:
-                employee_comparison[name]["by_ticket"][ticket] = {
-                    "planned_hours": 0,
-                    "actual_hours": 0
-                }
-            employee_comparison[name]["by_ticket"][ticket]["actual_hours"] += entry.hours_logged or 0
-        
-        # Calculate variances
-        total_planned = 0
-        total_actual = 0
-        
-        for name, data in employee_comparison.items():
-            planned = data["planned_hours"]
-            actual = data["actual_hours"]
-            variance = actual - planned
-            variance_percent = (variance / planned * 100) if planned > 0 else 0
-            
-            data["variance"] = round(variance, 2)
-            data["variance_percent"] = round(variance_percent, 1)
-            data["estimation_accuracy"] = round(100 - abs(variance_percent), 1) if planned > 0 else None
-            
-            # Calculate ticket-level variance
-            for ticket, ticket_data in data["by_ticket"].items():
-                ticket_planned = ticket_data["planned_hours"]
-                ticket_actual = ticket_data["actual_hours"]
-                ticket_data["variance"] = round(ticket_actual - ticket_planned, 2)
-            
-            data["by_ticket"] = dict(data["by_ticket"])
-            
-            total_planned += planned
-            total_actual += actual
-        
-        # Calculate overall metrics
-        overall_variance = total_actual - total_planned
-        overall_variance_percent = (overall_variance / total_planned * 100) if total_planned > 0 else 0
+    
+    # Totals run on the request session too, in the same transaction as the lists above
+    planned_totals = planned_totals_query.all()
+    actual_totals = actual_totals_query.all()
+    
+    # Build comparison data by employee
+    employee_comparison = {}
+    
+    # Process planned hours per ticket
+    for row in planned_totals:
+        data = employee_comparison.get(row.employee_name)
+        if data is None:
+            data = employee_comparison[row.employee_name] = PlanVsActualTotals(employee_name=row.employee_name)
+        data.employee_id = row.employee_id
+        data.team = row.team
+        data.planned_hours += row.hours
+        data.by_ticket[row.ticket_id] = {
+            "planned_hours": row.hours,
+            "actual_hours": 0
+        }
+    
+    # Process actual hours per ticket
+    for row in actual_totals:
+        name = row.employee_name
+        data = employee_comparison.get(name)
+        if data is None:
+            data = employee_comparison[name] = PlanVsActualTotals(row.employee_id, name, row.team)
+        
+        data.actual_hours += row.hours
+        ticket_data = data.by_ticket.setdefault(row.ticket_id, {"planned_hours": 0})
+        ticket_data["actual_hours"] = row.hours
+    
+    # Calculate variances
+    total_planned = 0
+    total_actual = 0
+    employees = []
+    
+    for data in employee_comparison.values():
+        planned = data.planned_hours
+        actual = data.actual_hours
+        variance = actual - planned
+        variance_percent = (variance / planned * 100) if planned > 0 else 0
+        
+        # Calculate ticket-level variance
+        for ticket_data in data.by_ticket.values():
+            ticket_data["variance"] = round(ticket_data["actual_hours"] - ticket_data["planned_hours"], 2)
+        
+        employees.append({
+            "planned_hours": planned,
+            "actual_hours": actual,
+            "variance": round(variance, 2),
+            "variance_percent": round(variance_percent, 1),
+            "planned_tasks": planned_by_employee.get(data.employee_name, []),
+            "actual_entries": actual_by_employee.get(data.employee_name, []),
+            "by_ticket": data.by_ticket,
+            "employee_id": data.employee_id,
+            "employee_name": data.employee_name,
+            "team": data.team,
+            "estimation_accuracy": round(100 - abs(variance_percent), 1) if planned > 0 else None
+        })
         
-        return {
-            "period": period,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "team": team,
-            "employee_id": employee_id,
-            "employees": [dict(v) for v in employee_comparison.values()],
-            "summary": {
-                "total_planned_hours": round(total_planned, 2),
-                "total_actual_hours": round(total_actual, 2),
-                "total_variance": round(overall_variance, 2),
-                "variance_percent": round(overall_variance_percent, 1),
-                "estimation_accuracy": round(100 - abs(overall_variance_percent), 1) if total_planned > 0 else None,
-                "over_estimation": overall_variance < 0,
-                "employee_count": len(employee_comparison)
-            }
+        total_planned += planned
+        total_actual += actual
+    
+    # Calculate overall metrics
+    overall_variance = total_actual - total_planned
+    overall_variance_percent = (overall_variance / total_planned * 100) if total_planned > 0 else 0
+    
+    return ORJSONResponse({
+        "period": period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "team": team,
+        "employee_id": employee_id,
+        "employees": employees,
+        "summary": {
+            "total_planned_hours": round(total_planned, 2),
+            "total_actual_hours": round(total_actual, 2),
+            "total_variance": round(overall_variance, 2),
+            "variance_percent": round(overall_variance_percent, 1),
+            "estimation_accuracy": round(100 - abs(overall_variance_percent), 1) if total_planned > 0 else None,
+            "over_estimation": overall_variance < 0,
+            "employee_count": len(employee_comparison)
         }
-    finally:
-        db.close()
+    })
 
 
-@app.get("/planning/comparison/trends")
+@app.get("/planning/comparison/trends", response_class=ORJSONResponse)
 def get_comparison_trends(
+    request: Request,
     team: str = Query("ALL", description="Team: QA, DEV, or ALL"),
-    weeks: int = Query(4, description="Number of weeks to analyze")
+    weeks: int = Query(4, description="Number of weeks to analyze"),
+    db: Session = Depends(get_db)
 ):
     """
     Get historical trends for plan vs actual comparison.
     Shows estimation accuracy over time.
     """
-    db = SessionLocal()
-    try:
-        today = date.today()
-        trends = []
-        
-        for i in range(weeks):
-            # Calculate week boundaries
-            week_start = today - timedelta(days=today.weekday() + (i * 7))
-            week_end = week_start + timedelta(days=6)
-            
-            # Query planned tasks for this week
-            planned_query = db.query(func.sum(PlannedTask.planned_hours)).filter(
-                PlannedTask.planned_date >= week_start,
-                PlannedTask.planned_date <= week_end
-            )
-            
-            # Query actual entries for this week
-            actual_query = db.query(func.sum(EnhancedTimesheet.hours_logged)).filter(
-                EnhancedTimesheet.date >= week_start,
-                EnhancedTimesheet.date <= week_end
-            )
-            
-            if team.upper() != "ALL":
-                planned_query = planned_query.filter(PlannedTask.team == team.upper())
-                actual_query = actual_query.filter(EnhancedTimesheet.team == team.upper())
-            
-            planned_hours = planned_query.scalar() or 0
-            actual_hours = actual_query.scalar() or 0
-            
-            variance = actual_hours - planned_hours
-            variance_percent = (variance / planned_hours * 100) if planned_hours > 0 else 0
-            accuracy = 100 - abs(variance_percent) if planned_hours > 0 else None
-            
-            trends.append({
-                "week_start": week_start.isoformat(),
-                "week_end": week_end.isoformat(),
-                "week_number": week_start.isocalendar()[1],
-                "planned_hours": round(float(planned_hours), 2),
-                "actual_hours": round(float(actual_hours), 2),
-                "variance": round(float(variance), 2),
-                "variance_percent": round(float(variance_percent), 1),
-                "estimation_accuracy": round(accuracy, 1) if accuracy else None
-            })
-        
-        # Reverse to show oldest first
-        trends.reverse()
-        
-        # Calculate average accuracy
-        accuracies = [t["estimation_accuracy"] for t in trends if t["estimation_accuracy"] is not None]
-        avg_accuracy = sum(accuracies) / len(accuracies) if accuracies else None
-        
-        return {
-            "team": team,
-            "weeks_analyzed": weeks,
-            "trends": trends,
-            "summary": {
-                "average_accuracy": round(avg_accuracy, 1) if avg_accuracy else None,
-                "best_week": max(trends, key=lambda x: x["estimation_accuracy"] or 0) if trends else None,
-                "worst_week": min(trends, key=lambda x: x["estimation_accuracy"] or 100) if trends else None
-            }
+    today = date.today()
+    return cached_json_response(
+        request, PLANNING_CACHE, ("trends", team, weeks, today),
+        lambda: build_comparison_trends(db, team, weeks, today)
+    )
+
+
+def build_comparison_trends(db: Session, team: str, weeks: int, today: date) -> dict:
+    """Build the /planning/comparison/trends response."""
+    trends = []
+    
+    # Daily planned/actual sums over the whole range in one query per table, bucketed into weeks below;
+    # days whose hours are all NULL come back as 0.0
+    current_week_start = today - timedelta(days=today.weekday())
+    range_start = current_week_start - timedelta(days=(weeks - 1) * 7)
+    range_end = current_week_start + timedelta(days=6)
+    
+    planned_query = db.query(
+        PlannedTask.planned_date.label("day"),
+        func.coalesce(func.sum(PlannedTask.planned_hours), 0.0).label("hours")
+    ).filter(
+        PlannedTask.planned_date >= range_start,
+        PlannedTask.planned_date <= range_end
+    )
+    actual_query = db.query(
+        EnhancedTimesheet.date.label("day"),
+        func.coalesce(func.sum(EnhancedTimesheet.hours_logged), 0.0).label("hours")
+    ).filter(
+        EnhancedTimesheet.date >= range_start,
+        EnhancedTimesheet.date <= range_end
+    )
+    
+    if team.upper() != "ALL":
+        planned_query = planned_query.filter(PlannedTask.team == team.upper())
+        actual_query = actual_query.filter(EnhancedTimesheet.team == team.upper())
+    
+    planned_days, actual_days = fetch_all_concurrently(
+        planned_query.group_by(PlannedTask.planned_date).statement,
+        actual_query.group_by(EnhancedTimesheet.date).statement
+    )
+    # Week boundaries, oldest first; each day's sum goes to the week at index (day - range_start) // 7
+    week_starts = [range_start + timedelta(days=i * 7) for i in range(weeks)]
+    week_length = timedelta(days=6)
+    planned_by_week = [0.0] * len(week_starts)
+    for row in planned_days:
+        planned_by_week[(row.day - range_start).days // 7] += row.hours
+    actual_by_week = [0.0] * len(week_starts)
+    for row in actual_days:
+        actual_by_week[(row.day - range_start).days // 7] += row.hours
+    
+    # Weeks are walked oldest first, and the summary is accumulated in the same pass
+    accuracy_total = 0.0
+    accuracy_count = 0
+    best_week = worst_week = None
+    best_accuracy = worst_accuracy = None
+    
+    for week_start, planned_hours, actual_hours in zip(week_starts, planned_by_week, actual_by_week):
+        week_end = week_start + week_length
+        
+        variance = actual_hours - planned_hours
+        variance_percent = (variance / planned_hours * 100) if planned_hours > 0 else 0
+        accuracy = 100 - abs(variance_percent) if planned_hours > 0 else None
+        estimation_accuracy = round(accuracy, 1) if accuracy else None
+        
+        # Dates are serialized as ISO strings by orjson
+        week = {
+            "week_start": week_start,
+            "week_end": week_end,
+            "week_number": week_start.isocalendar().week,
+            "planned_hours": round(float(planned_hours), 2),
+            "actual_hours": round(float(actual_hours), 2),
+            "variance": round(float(variance), 2),
+            "variance_percent": round(float(variance_percent), 1),
+            "estimation_accuracy": estimation_accuracy
         }
-    finally:
-        db.close()
+        trends.append(week)
+        
+        if estimation_accuracy is not None:
+            accuracy_total += estimation_accuracy
+            accuracy_count += 1
+        # Weeks without an accuracy rank as 0 for best and 100 for worst; ties keep the earliest week
+        if best_week is None or (estimation_accuracy or 0) > best_accuracy:
+            best_week, best_accuracy = week, estimation_accuracy or 0
+        if worst_week is None or (estimation_accuracy or 100) < worst_accuracy:
+            worst_week, worst_accuracy = week, estimation_accuracy or 100
+    
+    avg_accuracy = accuracy_total / accuracy_count if accuracy_count else None
+    
+    return {
+        "team": team,
+        "weeks_analyzed": weeks,
+        "trends": trends,
+        "summary": {
+            "average_accuracy": round(avg_accuracy, 1) if avg_accuracy else None,
+            "best_week": best_week,
+            "worst_week": worst_week
+        }
+    }
 
 
 # ===== EMPLOYEE NAME MAPPING ENDPOINTS =====
 
-@app.get("/employee-mappings")
+@app.get("/employee-mappings", response_class=StreamingResponse)
 def get_employee_name_mappings():
-    """Get all employee name mappings."""
-    db = SessionLocal()
+    """Get all employee name mappings (streamed)."""
+    db: Session = SessionLocal()
     try:
-        mappings = db.query(EmployeeNameMapping).filter(
-            EmployeeNameMapping.is_active == True
-        ).all()
-        
-        return {
-            "mappings": [
-                {
-                    "id": m.id,
-                    "alternate_name": m.alternate_name,
-                    "canonical_name": m.canonical_name,
-                    "employee_id": m.employee_id,
-                    "source": m.source,
-                    "notes": m.notes
-                }
-                for m in mappings
-            ]
-        }
-    finally:
+        stmt = select(
+            EmployeeNameMapping.id,
+            EmployeeNameMapping.alternate_name,
+            EmployeeNameMapping.canonical_name,
+            EmployeeNameMapping.employee_id,
+            EmployeeNameMapping.source,
+            EmployeeNameMapping.notes
+        ).where(EmployeeNameMapping.is_active == True)
+        
+        # The session is closed by the stream once all rows have been sent
+        return StreamingResponse(
+            stream_json_array(db, stmt, key="mappings"),
+            media_type="application/json"
+        )
+    except Exception:
         db.close()
+        raise
 
 
-@app.get("/employee-mappings/unmatched")
-def get_unmatched_employee_names():
+@app.get("/employee-mappings/unmatched", response_class=ORJSONResponse)
+def get_unmatched_employee_names(db: Session = Depends(get_db)):
     """Get names in timesheets that don't have a matching Employee record."""
-    db = SessionLocal()
-    try:
-        from sqlalchemy import func
-        
-        # Get all employee names
-        employees = db.query(Employee.name).all()
-        emp_names = set(e[0] for e in employees)
-        
-        # Get all timesheet names with counts
-        ts_names = db.query(
-            EnhancedTimesheet.employee_name,
-            func.count(EnhancedTimesheet.id).label('entry_count'),
-            func.min(EnhancedTimesheet.date).label('min_date'),
-            func.max(EnhancedTimesheet.date).label('max_date')
-        ).group_by(EnhancedTimesheet.employee_name).all()
-        
-        # Find unmatched
-        unmatched = []
-        for name, count, min_date, max_date in ts_names:
-            if name not in emp_names:
-                # Get team info
-                sample = db.query(EnhancedTimesheet.team).filter(
-                    EnhancedTimesheet.employee_name == name
-                ).first()
-                
-                unmatched.append({
-                    "name": name,
-                    "entry_count": count,
-                    "date_range": f"{min_date} to {max_date}",
-                    "team": sample[0] if sample else None
-                })
-        
-        return {
-            "unmatched_count": len(unmatched),
-            "unmatched": sorted(unmatched, key=lambda x: x["name"])
+    # Timesheet names with no Employee of the same name; Employee.name is not unique, so this
+    # is an anti-join rather than an outer join that could multiply the counts
+    ts_names = db.query(
+        EnhancedTimesheet.employee_name,
+        func.count().label('entry_count'),
+        func.min(EnhancedTimesheet.date).label('min_date'),
+        func.max(EnhancedTimesheet.date).label('max_date'),
+        func.max(EnhancedTimesheet.team).label('team')
+    ).filter(
+        ~select(Employee.id).where(Employee.name == EnhancedTimesheet.employee_name).exists()
+    ).group_by(EnhancedTimesheet.employee_name).all()
+    
+    unmatched = [
+        {
+            "name": name,
+            "entry_count": count,
+            "date_range": f"{min_date} to {max_date}",
+            "team": team
         }
-    finally:
-        db.close()
+        for name, count, min_date, max_date, team in ts_names
+    ]
+    
+    return {
+        "unmatched_count": len(unmatched),
+        "unmatched": sorted(unmatched, key=lambda x: x["name"])
+    }
 
 
 class NameMappingCreate(BaseModel):
@@ -7156,51 +7369,47 @@ class NameMappingCreate(BaseModel):
 
 
 @app.post("/employee-mappings")
-def create_employee_name_mapping(mapping: NameMappingCreate):
+def create_employee_name_mapping(mapping: NameMappingCreate, db: Session = Depends(get_db)):
     """Create a new employee name mapping and update existing records."""
-    db = SessionLocal()
     try:
-        # Check if mapping already exists
-        existing = db.query(EmployeeNameMapping).filter(
-            EmployeeNameMapping.alternate_name == mapping.alternate_name
-        ).first()
-        
-        if existing:
-            raise HTTPException(status_code=400, detail="Mapping already exists for this name")
-        
         # Find employee ID if not provided
         emp_id = mapping.employee_id
         if not emp_id:
-            emp = db.query(Employee).filter(Employee.name == mapping.canonical_name).first()
-            emp_id = emp.employee_id if emp else None
-        
-        # Create mapping
-        new_mapping = EmployeeNameMapping(
-            alternate_name=mapping.alternate_name,
-            canonical_name=mapping.canonical_name,
-            employee_id=emp_id,
-            source='api',
-            notes=mapping.notes
-        )
-        db.add(new_mapping)
+            emp_id = db.query(Employee.employee_id).filter(
+                Employee.name == mapping.canonical_name
+            ).limit(1).scalar()
+        
+        # Create mapping; alternate_name is unique, so an existing mapping makes this a no-op
+        created = db.execute(
+            pg_insert(EmployeeNameMapping).values(
+                alternate_name=mapping.alternate_name,
+                canonical_name=mapping.canonical_name,
+                employee_id=emp_id,
+                source='api',
+                notes=mapping.notes
+            ).on_conflict_do_nothing(index_elements=['alternate_name']).returning(EmployeeNameMapping.id)
+        ).first()
         
-        # Update existing timesheet entries
-        ts_count = db.query(EnhancedTimesheet).filter(
-            EnhancedTimesheet.employee_name == mapping.alternate_name
-        ).update({
-            'employee_name': mapping.canonical_name,
-            'employee_id': emp_id
-        }, synchronize_session=False)
+        if created is None:
+            raise HTTPException(status_code=400, detail="Mapping already exists for this name")
         
-        # Update leave entries
-        leave_count = db.query(LeaveEntry).filter(
+        # Re-point existing timesheet and leave entries in a single statement: both UPDATEs run as
+        # data-modifying CTEs and the outer SELECT counts the rows each one touched
+        # updated_on is set explicitly since onupdate defaults cannot be rendered inside a CTE
+        renamed = {'employee_name': mapping.canonical_name, 'employee_id': emp_id, 'updated_on': datetime.utcnow()}
+        ts_updated = update(EnhancedTimesheet).where(
+            EnhancedTimesheet.employee_name == mapping.alternate_name
+        ).values(renamed).returning(EnhancedTimesheet.id).cte("ts_updated")
+        leaves_updated = update(LeaveEntry).where(
             LeaveEntry.employee_name == mapping.alternate_name
-        ).update({
-            'employee_name': mapping.canonical_name,
-            'employee_id': emp_id
-        }, synchronize_session=False)
+        ).values(renamed).returning(LeaveEntry.id).cte("leaves_updated")
+        ts_count, leave_count = db.execute(select(
+            select(func.count()).select_from(ts_updated).scalar_subquery(),
+            select(func.count()).select_from(leaves_updated).scalar_subquery()
+        )).one()
         
         db.commit()
+        clear_calendar_views()
         
         return {
             "success": True,
@@ -7216,25 +7425,23 @@ def create_employee_name_mapping(mapping: NameMappingCreate):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.delete("/employee-mappings/{mapping_id}")
-def delete_employee_name_mapping(mapping_id: int):
+def delete_employee_name_mapping(mapping_id: int, db: Session = Depends(get_db)):
     """Deactivate an employee name mapping."""
-    db = SessionLocal()
-    try:
-        mapping = db.query(EmployeeNameMapping).filter(
+    # Deactivate and check existence in one statement; repeating it for a mapping that is
+    # already inactive still succeeds
+    mapping = db.execute(
+        update(EmployeeNameMapping).where(
             EmployeeNameMapping.id == mapping_id
-        ).first()
-        
-        if not mapping:
-            raise HTTPException(status_code=404, detail="Mapping not found")
-        
-        mapping.is_active = False
-        db.commit()
-        
-        return {"success": True, "message": "Mapping deactivated"}
-    finally:
-        db.close()
\ No newline at end of file
+        ).values(is_active=False).returning(EmployeeNameMapping.id)
+    ).first()
+    
+    if not mapping:
+        raise HTTPException(status_code=404, detail="Mapping not found")
+    
+    db.commit()
+    clear_calendar_views()
+    
+    return {"success": True, "message": "Mapping deactivated"}
@@ -1,10 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, Date, Time, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, Date, Time, UniqueConstraint, Computed, Index, text
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
+import sys
 
 Base = declarative_base()
 
+
+class InternedString(TypeDecorator):
+    """
+    VARCHAR whose loaded values are interned, for low-cardinality labels (status, team, ...)
+    repeated across many rows: every row then shares one str object per distinct value.
+    """
+    impl = String
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return sys.intern(value) if value is not None else None
+
+
 class Bug(Base):
     __tablename__ = "bugs"
 
@@ -14,25 +30,25 @@ class Bug(Base):
     ticket_id = Column(Integer, index=True)             # PM Tracker ID
     parent_task_id = Column(Integer, index=True)        # Redmine task ID
 
-    tracker = Column(String(50))
-    status = Column(String(50), index=True)
-    priority = Column(String(50))
-    severity = Column(String(50), index=True)
-    environment = Column(String(50), index=True)
+    tracker = Column(InternedString(50))
+    status = Column(InternedString(50), index=True)
+    priority = Column(InternedString(50))
+    severity = Column(InternedString(50), index=True)
+    environment = Column(InternedString(50), index=True)
 
     subject = Column(String(500))
     description = Column(Text, nullable=True)           # Bug description/details
     assignee = Column(String(100), index=True)
     author = Column(String(100))
 
-    module = Column(String(100), index=True)
+    module = Column(InternedString(100), index=True)
     feature = Column(String(150))
 
-    platform = Column(String(50))
-    browser = Column(String(50))
-    os = Column(String(50))
+    platform = Column(InternedString(50))
+    browser = Column(InternedString(50))
+    os = Column(InternedString(50))
 
-    project = Column(String(100), index=True)
+    project = Column(InternedString(100), index=True)
     
     # Time tracking fields
     start_date = Column(DateTime, nullable=True)
@@ -45,10 +61,22 @@ class Bug(Base):
     updated_on = Column(DateTime)
     closed_on = Column(DateTime, nullable=True)
     
-    # Store ALL raw Redmine data as JSON (captures everything including custom fields)
-    raw_data = Column(JSONB, nullable=True)
+    # Store ALL raw Redmine data as JSON (captures everything including custom fields).
+    # JSONB columns here and on the TestRail/employee models are write-and-echo only and carry no
+    # GIN index, which would slow every sync write; a field that needs filtering is copied into its
+    # own indexed column at sync time (severity, environment, module, ...), or gets a B-tree
+    # expression index on the exact path, e.g. Index(..., text("(raw_data->>'tracker_id')")).
+    # Deferred: the full payload is only loaded when accessed or undeferred (the Redmine sync does).
+    raw_data = deferred(Column(JSONB, nullable=True))
     custom_fields = Column(JSONB, nullable=True)        # Custom fields only for quick access
 
+    __table_args__ = (
+        # BRIN index for created_on range filters; bugs are imported roughly in creation order
+        Index('ix_bugs_created_brin', 'created_on', postgresql_using='brin', postgresql_with={'pages_per_range': 32}),
+        # Open bugs only (predicate must match OPEN_BUG_STATUSES in main.py for the planner to use it)
+        Index('ix_bugs_open_ticket', 'ticket_id', postgresql_where=text("status IN ('New', 'Reopened', 'Fixed', 'Assigned to Dev')")),
+    )
+
 
 class TestPlan(Base):
     __tablename__ = "test_plans"
@@ -62,6 +90,12 @@ class TestPlan(Base):
     updated_on = Column(DateTime)
     custom_fields = Column(JSONB, nullable=True)       # Store all custom fields as JSON
 
+    # The TestRail tables are linked by TestRail IDs without FK constraints, so these joins are
+    # declared explicitly. lazy="raise" makes callers opt in with selectinload() instead of
+    # falling into a query per row.
+    runs = relationship("TestRun", primaryjoin="TestPlan.plan_id == foreign(TestRun.plan_id)",
+                        viewonly=True, lazy="raise")
+
 
 class TestRun(Base):
     __tablename__ = "test_runs"
@@ -75,7 +109,12 @@ class TestRun(Base):
     created_on = Column(DateTime)
     updated_on = Column(DateTime)
     status = Column(String(50), nullable=True)
-    custom_fields = Column(JSONB, nullable=True)       # Store all custom fields as JSON
+    custom_fields = deferred(Column(JSONB, nullable=True))  # Store all custom fields as JSON (deferred)
+
+    cases = relationship("TestCase", primaryjoin="TestRun.run_id == foreign(TestCase.run_id)",
+                         viewonly=True, lazy="raise")
+    results = relationship("TestResult", primaryjoin="TestRun.run_id == foreign(TestResult.run_id)",
+                           viewonly=True, lazy="raise")
 
 
 class TestCase(Base):
@@ -89,7 +128,10 @@ class TestCase(Base):
     section = Column(String(200), nullable=True)
     priority = Column(String(50), nullable=True)
     type = Column(String(50), nullable=True)
-    custom_fields = Column(JSONB, nullable=True)        # Store all custom fields as JSON
+    custom_fields = deferred(Column(JSONB, nullable=True))  # Store all custom fields as JSON (deferred)
+
+    results = relationship("TestResult", primaryjoin="TestCase.case_id == foreign(TestResult.case_id)",
+                           viewonly=True, lazy="raise")
 
 
 class TestResult(Base):
@@ -101,11 +143,18 @@ class TestResult(Base):
     case_id = Column(Integer, index=True)               # Links to TestCase
     ticket_id = Column(Integer, index=True)             # PM Tracker ID (for direct access)
     status_id = Column(Integer)                         # TestRail status ID (1=Passed, 2=Blocked, etc.)
-    status_name = Column(String(50), index=True)        # Passed, Failed, Blocked, Retest, Untested
+    status_name = Column(InternedString(50))  # Passed, Failed, Blocked, Retest, Untested
     assigned_to = Column(String(100), nullable=True)
     created_on = Column(DateTime)
     custom_fields = Column(JSONB, nullable=True)       # Store all custom fields as JSON
 
+    __table_args__ = (
+        # Per-run status counts; status_name is never filtered on its own
+        Index('ix_test_results_run_status', 'run_id', 'status_name'),
+        # BRIN index for created_on range filters on this append-only table
+        Index('ix_test_results_created_brin', 'created_on', postgresql_using='brin', postgresql_with={'pages_per_range': 32}),
+    )
+
 
 class TicketTracking(Base):
     """Ticket tracking data imported from Excel exports"""
@@ -142,6 +191,11 @@ class Employee(Base):
     date_of_joining = Column(DateTime)
     team = Column(String(50), index=True)  # DEVELOPMENT, QA
     category = Column(String(50))  # BILLED, UN-BILLED
+    # Canonical upper-case category ('UNBILLED' folded into 'UN-BILLED') for indexed filtering
+    category_norm = Column(String(50), Computed(
+        "CASE WHEN upper(trim(category)) = 'UNBILLED' THEN 'UN-BILLED' ELSE upper(trim(category)) END",
+        persisted=True
+    ))
     employment_status = Column(String(50), default='Ongoing Employee', index=True)  # Ongoing Employee, Resigned
     lead = Column(String(100), index=True)  # Reporting manager name
     manager = Column(String(100), index=True)  # Manager name (can be different from lead)
@@ -153,6 +207,11 @@ class Employee(Base):
     mapping_data = Column(JSONB, nullable=True)  # Additional mapping columns from Excel (Column 1-5, Notes, etc.)
     created_on = Column(DateTime, default=datetime.utcnow)
     updated_on = Column(DateTime, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Calendar views filter active employees by team and category
+        Index('ix_employees_team_category_active', 'team', 'category_norm', postgresql_where=text('is_active')),
+    )
 
 
 class Timesheet(Base):
@@ -163,8 +222,7 @@ class Timesheet(Base):
     employee_name = Column(String(100), index=True)
     ticket_id = Column(Integer, index=True)
     date = Column(Date, index=True)
-    time_logged = Column(String(20))  # HH:MM:SS as string
-    time_logged_minutes = Column(Integer)  # For easier aggregation
+    time_logged_minutes = Column(Integer)  # Time logged; the sheet's HH:MM:SS is converted to minutes on import
     team = Column(String(50))
     created_on = Column(DateTime, default=datetime.utcnow)
     
@@ -235,11 +293,19 @@ class KPI(Base):
     description = Column(Text, nullable=True)
     role = Column(String(100), index=True)  # Role this KPI applies to (e.g., "SOFTWARE ENGINEER", "ASSOCIATE SOFTWARE ENGINEER")
     team = Column(String(50), index=True)  # DEVELOPMENT, QA, or NULL for all teams
+    # Normalized (upper/trimmed) role and team maintained by the database for indexed lookups
+    role_norm = Column(String(100), Computed("upper(trim(role))", persisted=True), index=True)
+    team_norm = Column(String(50), Computed("upper(trim(team))", persisted=True), index=True)
     category = Column(String(100), nullable=True)  # Technical, Communication, Quality, etc.
     weight = Column(Float, default=1.0)  # Weight for calculating overall score
     is_active = Column(Boolean, default=True)
     created_on = Column(DateTime, default=datetime.utcnow)
     updated_on = Column(DateTime, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Index for finding active KPIs for a role; partial, since only active KPIs are ever looked up
+        Index('ix_kpi_role_active', 'role_norm', postgresql_where=text('is_active')),
+    )
 
 
 class KPIRating(Base):
@@ -280,6 +346,8 @@ class KPIRating(Base):
     # Unique constraint: one rating per employee-KPI-quarter
     __table_args__ = (
         UniqueConstraint('employee_id', 'kpi_id', 'quarter', name='uq_kpi_rating'),
+        # Index for loading an employee's ratings for a quarter
+        Index('ix_rating_emp_quarter', 'employee_id', 'quarter'),
     )
 
 
@@ -317,8 +385,11 @@ class TicketStatusHistory(Base):
     
     # Indexes for efficient querying
     __table_args__ = (
-        # Index for finding status changes in date range
+        # Index for finding status changes in date range (changed_on is indexed above)
         # Index for finding when tickets entered a specific status
+        Index('ix_tshist_status_changed', 'new_status', 'changed_on'),
+        # Index for a ticket's history in date order
+        Index('ix_tshist_ticket_changed', 'ticket_id', 'changed_on'),
     )
 
 
@@ -350,6 +421,12 @@ class BugStatusHistory(Base):
     source = Column(String(50), default='sync')  # 'sync', 'manual', 'api'
     
     created_on = Column(DateTime, default=datetime.utcnow)
+    
+    # Indexes for efficient querying
+    __table_args__ = (
+        # Index for finding when bugs entered a specific status
+        Index('ix_bshist_status_changed', 'new_status', 'changed_on'),
+    )
 
 
 # ===== CALENDAR AND TASK PLANNING MODELS =====
@@ -376,7 +453,7 @@ class EnhancedTimesheet(Base):
     project_name = Column(String(150), nullable=True)
     
     # Team and source tracking
-    team = Column(String(50), index=True)  # QA, DEV
+    team = Column(InternedString(50), index=True)  # QA, DEV
     source = Column(String(50), default='google_sheets')  # google_sheets, manual, excel
     
     # Sync metadata
@@ -388,6 +465,13 @@ class EnhancedTimesheet(Base):
     
     __table_args__ = (
         UniqueConstraint('employee_name', 'ticket_id', 'date', 'team', name='uq_enhanced_timesheet_entry'),
+        # Index for loading an employee's entries over a date range
+        Index('ix_ets_emp_date', 'employee_name', 'date'),
+        # Index for listing a ticket's entries, newest first
+        Index('ix_ets_ticket_date', 'ticket_id', 'date'),
+        # Covering indexes for the per-name aggregate and the date-range hour sums (index-only scans)
+        Index('ix_ets_name_cover', 'employee_name', postgresql_include=['date', 'team']),
+        Index('ix_ets_date_cover', 'date', postgresql_include=['team', 'hours_logged']),
     )
 
 
@@ -459,6 +543,10 @@ class PlannedTask(Base):
     
     __table_args__ = (
         UniqueConstraint('employee_name', 'ticket_id', 'planned_date', name='uq_planned_task'),
+        # Index for loading planned tasks in a date range, per employee
+        Index('ix_planned_date_emp', 'planned_date', 'employee_name'),
+        # Covering index for the date-range planned hour sums (index-only scans)
+        Index('ix_planned_date_cover', 'planned_date', postgresql_include=['team', 'planned_hours']),
     )
 
 
@@ -15,6 +15,7 @@ Usage:
     python qa_weekly_report_v2.py                    # Current week
     python qa_weekly_report_v2.py --date 2026-01-20  # Specific week
     python qa_weekly_report_v2.py --project "Client Name"
+    python qa_weekly_report_v2.py --refresh-rollup   # Nightly: rebuild qa_weekly_rollup
 """
 
 import os
@@ -22,6 +23,7 @@ import sys
 import argparse
 from datetime import datetime, timedelta
 from collections import defaultdict
+from functools import lru_cache
 
 # Fix Unicode output on Windows
 if sys.platform == 'win32':
@@ -42,7 +44,7 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics import renderPDF
 
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, distinct, text
 from database import SessionLocal
 from models import Bug, TicketTracking, TestResult, TestCase, TestRun, TicketStatusHistory
 
@@ -104,6 +106,14 @@ CLOSED_STATUSES = ['Closed', 'Done', 'Completed', 'Resolved', 'Moved to Live']
 # Development statuses
 IN_PROGRESS_STATUSES = ['In Progress', 'Development', 'In Development', 'Code Review', 'Start Code Review']
 
+# Redmine bug statuses (lower-cased) counted as fixed / deferred in ticket metrics; anything else is open
+BUG_CLOSED_STATUSES = ['closed', 'resolved', 'verified', 'fixed']
+BUG_DEFERRED_STATUSES = ['deferred', 'wont fix', 'duplicate']
+
+# Materialized view of per-week status transition counts, refreshed nightly with --refresh-rollup.
+# Only Monday-Friday changes are rolled up so a row matches the report's week window exactly.
+WEEKLY_ROLLUP_VIEW = "qa_weekly_rollup"
+
 # ============================================================================
 # DATA COLLECTION
 # ============================================================================
@@ -120,7 +130,7 @@ def get_week_dates(reference_date=None, use_last_7_days=False):
     if reference_date is None:
         reference_date = datetime.now()
     elif isinstance(reference_date, str):
-        reference_date = datetime.strptime(reference_date, "%Y-%m-%d")
+        return _get_week_dates_for_str(reference_date, use_last_7_days)
     
     if use_last_7_days:
         # Last 7 days: from 7 days ago to today
@@ -137,6 +147,74 @@ def get_week_dates(reference_date=None, use_last_7_days=False):
     return week_start, week_end
 
 
+@lru_cache(maxsize=256)
+def _get_week_dates_for_str(reference_date, use_last_7_days):
+    """Cached get_week_dates for a YYYY-MM-DD reference date string"""
+    return get_week_dates(datetime.strptime(reference_date, "%Y-%m-%d"), use_last_7_days)
+
+
+def _sql_in_list(statuses):
+    """Render a status list as a SQL literal list (DDL can't take bind parameters)"""
+    return ", ".join("'" + status.replace("'", "''") + "'" for status in statuses)
+
+
+def refresh_weekly_rollup():
+    """Create the qa_weekly_rollup materialized view if missing, otherwise refresh it"""
+    db = SessionLocal()
+    
+    try:
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": WEEKLY_ROLLUP_VIEW}).scalar()
+        if exists is None:
+            db.execute(text(f"""
+                CREATE MATERIALIZED VIEW {WEEKLY_ROLLUP_VIEW} AS
+                SELECT
+                    date_trunc('week', changed_on)::date AS week_start,
+                    COUNT(DISTINCT ticket_id) FILTER (WHERE new_status IN ({_sql_in_list(QA_TEAM_STATUSES)})) AS qa_team_count,
+                    COUNT(DISTINCT ticket_id) FILTER (WHERE new_status IN ({_sql_in_list(BIS_TESTING_STATUSES)})) AS bis_testing_count,
+                    COUNT(DISTINCT ticket_id) FILTER (WHERE new_status IN ({_sql_in_list(CLOSED_STATUSES)})) AS closed_count,
+                    AVG(duration_in_previous_status) FILTER (WHERE new_status IN ({_sql_in_list(BIS_TESTING_STATUSES)})) AS avg_hours_to_bis_testing,
+                    AVG(duration_in_previous_status) FILTER (WHERE new_status IN ({_sql_in_list(CLOSED_STATUSES)})) AS avg_hours_to_closed
+                FROM ticket_status_history
+                WHERE EXTRACT(ISODOW FROM changed_on) <= 5
+                GROUP BY 1
+            """))
+            # REFRESH ... CONCURRENTLY requires a unique index
+            db.execute(text(f"CREATE UNIQUE INDEX ux_{WEEKLY_ROLLUP_VIEW}_week ON {WEEKLY_ROLLUP_VIEW} (week_start)"))
+            print(f"[OK] Created materialized view {WEEKLY_ROLLUP_VIEW}")
+        else:
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {WEEKLY_ROLLUP_VIEW}"))
+            print(f"[OK] Refreshed materialized view {WEEKLY_ROLLUP_VIEW}")
+        db.commit()
+        
+    finally:
+        db.close()
+
+
+def get_weekly_rollup(db, week_start, week_end):
+    """
+    Fetch the qa_weekly_rollup row for a Monday-Friday week.
+    Returns None when the window isn't a whole Monday-Friday week, the view
+    hasn't been created, or the week has no status changes.
+    """
+    is_weekday_window = (
+        week_start.weekday() == 0
+        and week_start == week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        and week_end == week_start + timedelta(days=5) - timedelta(microseconds=1)
+    )
+    if not is_weekday_window:
+        return None
+    
+    try:
+        return db.execute(
+            text(f"SELECT * FROM {WEEKLY_ROLLUP_VIEW} WHERE week_start = :ws"),
+            {"ws": week_start.date()}
+        ).first()
+    except Exception:
+        # View not created yet - fall back to querying the history directly
+        db.rollback()
+        return None
+
+
 def get_comprehensive_data(week_start, week_end):
     """Fetch all data needed for the comprehensive report"""
     db = SessionLocal()
@@ -216,8 +294,9 @@ def get_comprehensive_data(week_start, week_end):
             TicketTracking.status.in_(QA_TEAM_STATUSES)
         ).all()
         
+        metrics = get_ticket_metrics(db, [t.ticket_id for t in all_qa_tickets])
         for ticket in all_qa_tickets:
-            ticket_data = get_enriched_ticket_data(db, ticket)
+            ticket_data = get_enriched_ticket_data(ticket, metrics[ticket.ticket_id])
             data['current_week']['qa_tickets'].append(ticket_data)
             
             # Update QA pending breakdown by status
@@ -250,8 +329,9 @@ def get_comprehensive_data(week_start, week_end):
                 TicketTracking.updated_on <= week_end
             ).order_by(TicketTracking.updated_on.desc()).all()
         
+        metrics = get_ticket_metrics(db, [t.ticket_id for t in bis_testing_tickets], include_full_details=True)
         for ticket in bis_testing_tickets:
-            ticket_data = get_enriched_ticket_data(db, ticket, include_full_details=True)
+            ticket_data = get_enriched_ticket_data(ticket, metrics[ticket.ticket_id], include_full_details=True)
             # Add moved_on date from history if available
             for h in bis_history:
                 if h.ticket_id == ticket.ticket_id:
@@ -286,34 +366,42 @@ def get_comprehensive_data(week_start, week_end):
                 TicketTracking.updated_on <= week_end
             ).order_by(TicketTracking.updated_on.desc()).all()
         
+        # Only include tickets where QA team was responsible (has QC tester assigned)
+        closed_tickets = [t for t in closed_tickets if t.qc_tester]
+        metrics = get_ticket_metrics(db, [t.ticket_id for t in closed_tickets])
         for ticket in closed_tickets:
-            # Only include tickets where QA team was responsible (has QC tester assigned)
-            if ticket.qc_tester:
-                ticket_data = get_enriched_ticket_data(db, ticket, include_full_details=False)
-                data['current_week']['closed_moved'].append(ticket_data)
+            ticket_data = get_enriched_ticket_data(ticket, metrics[ticket.ticket_id], include_full_details=False)
+            data['current_week']['closed_moved'].append(ticket_data)
         
         # ===== CURRENT WEEK: In Progress tickets =====
         in_progress_tickets = db.query(TicketTracking).filter(
             TicketTracking.status.in_(IN_PROGRESS_STATUSES)
         ).all()
         
+        metrics = get_ticket_metrics(db, [t.ticket_id for t in in_progress_tickets])
         for ticket in in_progress_tickets:
-            ticket_data = get_enriched_ticket_data(db, ticket)
+            ticket_data = get_enriched_ticket_data(ticket, metrics[ticket.ticket_id])
             data['current_week']['in_progress'].append(ticket_data)
         
         # ===== PREVIOUS PERIOD: Counts for comparison =====
-        # Use status history if available for more accurate counts
-        prev_bis_history = db.query(TicketStatusHistory).filter(
-            TicketStatusHistory.new_status.in_(BIS_TESTING_STATUSES),
-            TicketStatusHistory.changed_on >= prev_week_start,
-            TicketStatusHistory.changed_on <= prev_week_end
-        ).all()
-        
-        prev_closed_history = db.query(TicketStatusHistory).filter(
-            TicketStatusHistory.new_status.in_(CLOSED_STATUSES),
-            TicketStatusHistory.changed_on >= prev_week_start,
-            TicketStatusHistory.changed_on <= prev_week_end
-        ).all()
+        # Use status history if available for more accurate counts; a past week is
+        # static, so read it from the nightly rollup when one covers this window
+        rollup = get_weekly_rollup(db, prev_week_start, prev_week_end)
+        if rollup is not None:
+            prev_bis_history_count = rollup.bis_testing_count
+            prev_closed_history_count = rollup.closed_count
+        else:
+            prev_bis_history_count = db.query(func.count(distinct(TicketStatusHistory.ticket_id))).filter(
+                TicketStatusHistory.new_status.in_(BIS_TESTING_STATUSES),
+                TicketStatusHistory.changed_on >= prev_week_start,
+                TicketStatusHistory.changed_on <= prev_week_end
+            ).scalar()
+            
+            prev_closed_history_count = db.query(func.count(distinct(TicketStatusHistory.ticket_id))).filter(
+                TicketStatusHistory.new_status.in_(CLOSED_STATUSES),
+                TicketStatusHistory.changed_on >= prev_week_start,
+                TicketStatusHistory.changed_on <= prev_week_end
+            ).scalar()
         
         # Current QA count (snapshot)
         prev_qa_count = db.query(TicketTracking).filter(
@@ -321,8 +409,8 @@ def get_comprehensive_data(week_start, week_end):
         ).count()
         
         # Use history count if available, otherwise fallback
-        if prev_bis_history:
-            prev_bis_count = len(set(h.ticket_id for h in prev_bis_history))
+        if prev_bis_history_count:
+            prev_bis_count = prev_bis_history_count
         else:
             prev_bis_count = db.query(TicketTracking).filter(
                 TicketTracking.status.in_(BIS_TESTING_STATUSES),
@@ -330,8 +418,8 @@ def get_comprehensive_data(week_start, week_end):
                 TicketTracking.updated_on <= prev_week_end
             ).count()
         
-        if prev_closed_history:
-            prev_closed_count = len(set(h.ticket_id for h in prev_closed_history))
+        if prev_closed_history_count:
+            prev_closed_count = prev_closed_history_count
         else:
             prev_closed_count = db.query(TicketTracking).filter(
                 TicketTracking.status.in_(CLOSED_STATUSES),
@@ -350,8 +438,9 @@ def get_comprehensive_data(week_start, week_end):
             ~TicketTracking.status.in_(CLOSED_STATUSES)
         ).order_by(TicketTracking.eta.asc()).all()
         
+        metrics = get_ticket_metrics(db, [t.ticket_id for t in planned_tickets])
         for ticket in planned_tickets:
-            ticket_data = get_enriched_ticket_data(db, ticket)
+            ticket_data = get_enriched_ticket_data(ticket, metrics[ticket.ticket_id])
             data['next_week_plan'].append(ticket_data)
         
         # ===== AGGREGATE METRICS =====
@@ -377,52 +466,135 @@ def get_comprehensive_data(week_start, week_end):
         db.close()
 
 
-def get_enriched_ticket_data(db, ticket, include_full_details=False):
-    """Get comprehensive data for a single ticket"""
-    ticket_id = ticket.ticket_id
+def get_ticket_metrics(db, ticket_ids, include_full_details=False):
+    """
+    Bug and test result metrics for a list of tickets, keyed by ticket ID.
+    Counts are aggregated in SQL with one GROUP BY per table, so no bug or
+    test result rows are loaded just to be counted. With include_full_details
+    the bug/test detail rows for all tickets are fetched in one query per table.
+    """
+    metrics = {
+        ticket_id: {
+            'title': None,
+            'module': None,
+            'feature': None,
+            'bugs_total': 0,
+            'bugs_open': 0,
+            'bugs_closed': 0,
+            'bugs_deferred': 0,
+            'bugs_by_severity': defaultdict(int),
+            'bugs_by_environment': defaultdict(int),
+            'tests_total': 0,
+            'tests_passed': 0,
+            'tests_failed': 0,
+            'tests_blocked': 0,
+            'tests_untested': 0,
+            'bug_details': [],
+            'test_details': [],
+        }
+        for ticket_id in ticket_ids
+    }
+    if not metrics:
+        return metrics
+    
+    # Bug counts per (ticket, severity, environment); the totals are summed over the groups
+    bug_status = func.lower(func.coalesce(Bug.status, ''))
+    severity = func.coalesce(func.nullif(Bug.severity, ''), 'Unknown')
+    environment = func.coalesce(func.nullif(Bug.environment, ''), 'Unknown')
+    bug_rows = db.query(
+        Bug.ticket_id,
+        severity,
+        environment,
+        func.count(),
+        func.count().filter(bug_status.in_(BUG_CLOSED_STATUSES)),
+        func.count().filter(bug_status.in_(BUG_DEFERRED_STATUSES)),
+    ).filter(
+        Bug.ticket_id.in_(metrics)
+    ).group_by(Bug.ticket_id, severity, environment).order_by(Bug.ticket_id, severity, environment).all()
+    
+    for ticket_id, bug_severity, bug_environment, total, closed, deferred in bug_rows:
+        m = metrics[ticket_id]
+        m['bugs_total'] += total
+        m['bugs_closed'] += closed
+        m['bugs_deferred'] += deferred
+        m['bugs_open'] += total - closed - deferred
+        m['bugs_by_severity'][bug_severity] += total
+        m['bugs_by_environment'][bug_environment] += total
+    
+    # Ticket title, module and feature come from the ticket's first bug
+    first_bug_ids = db.query(func.min(Bug.id)).filter(
+        Bug.ticket_id.in_(metrics)
+    ).group_by(Bug.ticket_id)
+    first_bugs = db.query(
+        Bug.ticket_id, Bug.subject, Bug.module, Bug.feature
+    ).filter(Bug.id.in_(first_bug_ids)).all()
+    
+    for ticket_id, subject, module, feature in first_bugs:
+        m = metrics[ticket_id]
+        if subject:
+            m['title'] = subject.split(" - ")[0]
+        m['module'] = module
+        m['feature'] = feature
+    
+    result_status = func.lower(TestResult.status_name)
+    test_rows = db.query(
+        TestResult.ticket_id,
+        func.count(),
+        func.count().filter(result_status == 'passed'),
+        func.count().filter(result_status == 'failed'),
+        func.count().filter(result_status == 'blocked'),
+        func.count().filter(result_status == 'untested'),
+    ).filter(
+        TestResult.ticket_id.in_(metrics)
+    ).group_by(TestResult.ticket_id).all()
+    
+    for ticket_id, total, passed, failed, blocked, untested in test_rows:
+        metrics[ticket_id].update(
+            tests_total=total,
+            tests_passed=passed,
+            tests_failed=failed,
+            tests_blocked=blocked,
+            tests_untested=untested,
+        )
     
-    # Get bugs from Redmine
-    bugs = db.query(Bug).filter(Bug.ticket_id == ticket_id).all()
-    
-    bugs_open = []
-    bugs_closed = []
-    bugs_deferred = []
-    severity_counts = defaultdict(int)
-    environment_counts = defaultdict(int)
-    
-    for bug in bugs:
-        status_lower = (bug.status or '').lower()
-        if status_lower in ['closed', 'resolved', 'verified', 'fixed']:
-            bugs_closed.append(bug)
-        elif status_lower in ['deferred', 'wont fix', 'duplicate']:
-            bugs_deferred.append(bug)
-        else:
-            bugs_open.append(bug)
+    if include_full_details:
+        # Number the rows within each ticket so one query returns the first 15 bugs / 20 tests of every ticket
+        bug_rank = func.row_number().over(partition_by=Bug.ticket_id, order_by=Bug.id).label('rank')
+        ranked_bugs = db.query(
+            Bug.ticket_id, Bug.bug_id, Bug.subject, Bug.status, Bug.severity, Bug.priority,
+            Bug.environment, Bug.assignee, Bug.created_on, bug_rank
+        ).filter(Bug.ticket_id.in_(metrics)).subquery()
         
-        severity_counts[bug.severity or 'Unknown'] += 1
-        environment_counts[bug.environment or 'Unknown'] += 1
-    
-    # Get test results
-    test_results = db.query(TestResult).filter(TestResult.ticket_id == ticket_id).all()
-    tests_passed = len([t for t in test_results if t.status_name and t.status_name.lower() == 'passed'])
-    tests_failed = len([t for t in test_results if t.status_name and t.status_name.lower() == 'failed'])
-    tests_blocked = len([t for t in test_results if t.status_name and t.status_name.lower() == 'blocked'])
-    tests_untested = len([t for t in test_results if t.status_name and t.status_name.lower() == 'untested'])
-    
-    # Get ticket title from first bug
-    ticket_title = f"Ticket #{ticket_id}"
-    if bugs:
-        first_bug = bugs[0]
-        if first_bug.subject:
-            parts = first_bug.subject.split(" - ")
-            ticket_title = parts[0] if parts else first_bug.subject
-    
-    # Get module and feature from bugs
-    module = None
-    feature = None
-    if bugs:
-        module = bugs[0].module
-        feature = bugs[0].feature
+        for b in db.query(ranked_bugs).filter(ranked_bugs.c.rank <= 15).order_by(ranked_bugs.c.ticket_id, ranked_bugs.c.rank):
+            metrics[b.ticket_id]['bug_details'].append({
+                'id': b.bug_id,
+                'subject': b.subject or 'No Subject',
+                'status': b.status or 'Unknown',
+                'severity': b.severity or 'Unknown',
+                'priority': b.priority or 'Unknown',
+                'environment': b.environment or 'Unknown',
+                'assignee': b.assignee or 'Unassigned',
+                'created_on': b.created_on.strftime('%Y-%m-%d') if b.created_on else 'Unknown'
+            })
+        
+        test_rank = func.row_number().over(partition_by=TestResult.ticket_id, order_by=TestResult.id).label('rank')
+        ranked_tests = db.query(
+            TestResult.ticket_id, TestResult.case_id, TestResult.status_name, TestResult.assigned_to, test_rank
+        ).filter(TestResult.ticket_id.in_(metrics)).subquery()
+        
+        for t in db.query(ranked_tests).filter(ranked_tests.c.rank <= 20).order_by(ranked_tests.c.ticket_id, ranked_tests.c.rank):
+            metrics[t.ticket_id]['test_details'].append({
+                'case_id': t.case_id,
+                'status': t.status_name or 'Unknown',
+                'assigned_to': t.assigned_to or 'Unassigned'
+            })
+    
+    return metrics
+
+
+def get_enriched_ticket_data(ticket, metrics, include_full_details=False):
+    """Get comprehensive data for a single ticket, given its get_ticket_metrics entry"""
+    ticket_id = ticket.ticket_id
     
     # Team members
     developers = []
@@ -434,12 +606,12 @@ def get_enriched_ticket_data(db, ticket, include_full_details=False):
     
     result = {
         'ticket_id': ticket_id,
-        'title': ticket_title,
+        'title': metrics['title'] or f"Ticket #{ticket_id}",
         'status': ticket.status or 'Unknown',
         'eta': ticket.eta,
         'eta_str': ticket.eta.strftime('%Y-%m-%d') if ticket.eta else 'Not Set',
-        'module': module or 'N/A',
-        'feature': feature or 'N/A',
+        'module': metrics['module'] or 'N/A',
+        'feature': metrics['feature'] or 'N/A',
         'developers': developers,
         'developers_str': ', '.join(developers) if developers else 'Not Assigned',
         'qa_tester': ticket.qc_tester or 'Not Assigned',
@@ -451,40 +623,26 @@ def get_enriched_ticket_data(db, ticket, include_full_details=False):
         'updated_on': ticket.updated_on,
         
         # Bug metrics
-        'bugs_total': len(bugs),
-        'bugs_open': len(bugs_open),
-        'bugs_closed': len(bugs_closed),
-        'bugs_deferred': len(bugs_deferred),
-        'bugs_by_severity': dict(severity_counts),
-        'bugs_by_environment': dict(environment_counts),
+        'bugs_total': metrics['bugs_total'],
+        'bugs_open': metrics['bugs_open'],
+        'bugs_closed': metrics['bugs_closed'],
+        'bugs_deferred': metrics['bugs_deferred'],
+        'bugs_by_severity': dict(metrics['bugs_by_severity']),
+        'bugs_by_environment': dict(metrics['bugs_by_environment']),
         
         # Test metrics
-        'tests_total': len(test_results),
-        'tests_passed': tests_passed,
-        'tests_failed': tests_failed,
-        'tests_blocked': tests_blocked,
-        'tests_untested': tests_untested,
-        'pass_rate': round((tests_passed / len(test_results) * 100), 1) if test_results else 0,
+        'tests_total': metrics['tests_total'],
+        'tests_passed': metrics['tests_passed'],
+        'tests_failed': metrics['tests_failed'],
+        'tests_blocked': metrics['tests_blocked'],
+        'tests_untested': metrics['tests_untested'],
+        'pass_rate': round((metrics['tests_passed'] / metrics['tests_total'] * 100), 1) if metrics['tests_total'] else 0,
     }
     
     # Include full bug and test details for detailed pages
     if include_full_details:
-        result['bug_details'] = [{
-            'id': b.bug_id,
-            'subject': b.subject or 'No Subject',
-            'status': b.status or 'Unknown',
-            'severity': b.severity or 'Unknown',
-            'priority': b.priority or 'Unknown',
-            'environment': b.environment or 'Unknown',
-            'assignee': b.assignee or 'Unassigned',
-            'created_on': b.created_on.strftime('%Y-%m-%d') if b.created_on else 'Unknown'
-        } for b in bugs[:15]]  # Limit to 15 bugs
-        
-        result['test_details'] = [{
-            'case_id': t.case_id,
-            'status': t.status_name or 'Unknown',
-            'assigned_to': t.assigned_to or 'Unassigned'
-        } for t in test_results[:20]]  # Limit to 20 tests
+        result['bug_details'] = metrics['bug_details']
+        result['test_details'] = metrics['test_details']
     
     return result
 
@@ -1635,14 +1793,20 @@ Examples:
     python qa_weekly_report_v2.py                           # Current week
     python qa_weekly_report_v2.py --date 2026-01-20         # Specific week
     python qa_weekly_report_v2.py --project "Client XYZ"    # With project name
+    python qa_weekly_report_v2.py --refresh-rollup          # Nightly rollup refresh
         """
     )
     parser.add_argument('--date', '-d', type=str, help="Reference date (YYYY-MM-DD)")
     parser.add_argument('--output', '-o', type=str, help="Output PDF filename")
     parser.add_argument('--project', '-p', type=str, help="Project/Client name for cover page")
+    parser.add_argument('--refresh-rollup', action='store_true', help="Create/refresh the qa_weekly_rollup view and exit")
     
     args = parser.parse_args()
     
+    if args.refresh_rollup:
+        refresh_weekly_rollup()
+        return None
+    
     # Get week dates
     week_start, week_end = get_week_dates(args.date)
     
@@ -6,7 +6,11 @@ Uses APScheduler to run sync jobs in the background.
 """
 
 import logging
-from datetime import datetime
+import queue
+import secrets
+import threading
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -29,6 +33,19 @@ class SheetsSyncScheduler:
         self.last_sync_status = None
         self.is_running = False
         self.realtime_mode = False
+        self.push_mode = False
+        self.sync_listeners = []
+        self.watch_channels = {}  # team -> {'id', 'resource_id', 'token', 'expiration'}
+        self.sync_queue = queue.Queue()
+        self._queued_teams = set()
+        self._queue_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._worker = None
+    
+    def add_sync_listener(self, callback):
+        """Register a callback to run after every sync job (e.g. to invalidate caches)."""
+        if callback not in self.sync_listeners:
+            self.sync_listeners.append(callback)
     
     def start(self, sync_interval_minutes: Optional[int] = None, teams: list = None, realtime: bool = False):
         """
@@ -37,14 +54,23 @@ class SheetsSyncScheduler:
         Args:
             sync_interval_minutes: Sync interval in minutes. Defaults to config value.
             teams: List of teams to sync (['QA', 'DEV']). Defaults to both.
-            realtime: If True, uses 2-minute interval for real-time sync. Overrides sync_interval_minutes.
+            realtime: If True, syncs a team as soon as its sheet changes (Drive push notifications,
+                      when a webhook URL is configured) or every 2 minutes otherwise.
+                      Overrides sync_interval_minutes.
         """
         if self.is_running:
             logger.warning("Scheduler is already running")
             return
         
-        # Real-time mode uses 2-minute intervals
-        if realtime:
+        webhook_url = GOOGLE_SHEETS_CONFIG.get('webhook_url')
+        push_mode = realtime and bool(webhook_url)
+        
+        if push_mode:
+            # Changes arrive through the webhook; polling is only a safety net
+            interval = GOOGLE_SHEETS_CONFIG.get('fallback_sync_interval_minutes', 60)
+            logger.info(f"Starting in REAL-TIME mode (push notifications, {interval}-minute fallback sync)")
+        elif realtime:
+            # Without a webhook URL real-time mode falls back to 2-minute polling
             interval = 2
             logger.info("Starting in REAL-TIME mode (2-minute intervals)")
         else:
@@ -56,6 +82,9 @@ class SheetsSyncScheduler:
         self.scheduler = BackgroundScheduler()
         self.scheduler.start()
         
+        self._worker = threading.Thread(target=self._drain_sync_queue, name='sheets-sync-worker', daemon=True)
+        self._worker.start()
+        
         # Add sync job - use seconds for intervals less than 1 minute
         if interval < 1:
             trigger = IntervalTrigger(seconds=int(interval * 60))
@@ -65,7 +94,7 @@ class SheetsSyncScheduler:
             interval_display = f"{interval} minutes"
         
         self.scheduler.add_job(
-            func=self._sync_job,
+            func=self._fallback_sync_job if push_mode else self._sync_job,
             trigger=trigger,
             id='google_sheets_sync',
             name='Google Sheets Auto Sync',
@@ -79,6 +108,11 @@ class SheetsSyncScheduler:
         
         self.is_running = True
         self.realtime_mode = realtime
+        self.push_mode = push_mode
+        
+        if push_mode:
+            self._renew_watch_channels(teams_to_sync)
+            self._update_poll_interval(teams_to_sync)
         logger.info(f"Google Sheets auto-sync started. Interval: {interval_display}. Teams: {teams_to_sync}")
         
         # Run initial sync
@@ -88,18 +122,136 @@ class SheetsSyncScheduler:
         """Stop the scheduler."""
         if self.scheduler and self.is_running:
             self.scheduler.shutdown(wait=True)
+            for team in list(self.watch_channels):
+                self._stop_watch_channel(team)
+            self.sync_queue.put(None)
+            self._worker.join()
             self.is_running = False
+            self.push_mode = False
             logger.info("Google Sheets auto-sync stopped")
     
-    def _sync_job(self, teams: list):
-        """Internal sync job that runs on schedule."""
+    def notify_change(self, channel_id: Optional[str], token: Optional[str], resource_state: Optional[str]) -> bool:
+        """
+        Handle a Drive push notification. Queues a sync of the team whose sheet changed
+        and returns True, or False for unknown channels and the initial 'sync' handshake.
+        """
+        for team, channel in list(self.watch_channels.items()):
+            if channel['id'] == channel_id and secrets.compare_digest(channel['token'], token or ''):
+                break
+        else:
+            logger.warning(f"Ignoring notification for unknown channel: {channel_id}")
+            return False
+        
+        if resource_state == 'sync':
+            return False
+        
+        self.enqueue_sync(team)
+        return True
+    
+    def enqueue_sync(self, team: str):
+        """Queue a background sync for a team unless one is already pending."""
+        with self._queue_lock:
+            if team in self._queued_teams:
+                return
+            self._queued_teams.add(team)
+        self.sync_queue.put(team)
+    
+    def _drain_sync_queue(self):
+        """Worker loop that syncs queued teams one at a time until stopped."""
+        while True:
+            team = self.sync_queue.get()
+            if team is None:
+                break
+            with self._queue_lock:
+                self._queued_teams.discard(team)
+            self._sync_job([team])
+    
+    def _renew_watch_channels(self, teams: list):
+        """Register push channels for teams that have none or whose channel expires before the next fallback run."""
+        renew_before = datetime.utcnow() + timedelta(
+            minutes=2 * GOOGLE_SHEETS_CONFIG.get('fallback_sync_interval_minutes', 60)
+        )
+        for team in teams:
+            channel = self.watch_channels.get(team)
+            if channel and channel['expiration'] > renew_before:
+                continue
+            
+            channel_id = str(uuid.uuid4())
+            token = secrets.token_urlsafe(32)
+            try:
+                response = self.sync_service.watch_sheet(
+                    team, channel_id, GOOGLE_SHEETS_CONFIG['webhook_url'], token
+                )
+            except Exception as e:
+                logger.error(f"Failed to register push channel for {team}: {e}", exc_info=True)
+                continue
+            
+            # Register the replacement before stopping the old channel so no change goes unnoticed
+            if channel:
+                self._stop_watch_channel(team)
+            self.watch_channels[team] = {
+                'id': channel_id,
+                'resource_id': response['resourceId'],
+                'token': token,
+                # Drive reports expiration as milliseconds since the epoch
+                'expiration': datetime.utcfromtimestamp(int(response['expiration']) / 1000)
+            }
+            logger.info(f"Push channel registered for {team} until {self.watch_channels[team]['expiration']}")
+    
+    def _stop_watch_channel(self, team: str):
+        """Stop and forget a team's push channel."""
+        channel = self.watch_channels.pop(team)
+        try:
+            self.sync_service.stop_watch(channel['id'], channel['resource_id'])
+        except Exception as e:
+            logger.warning(f"Failed to stop push channel for {team}: {e}")
+    
+    def _update_poll_interval(self, teams: list):
+        """
+        Poll every 2 minutes while any team has no live push channel, and only at the
+        fallback interval once every team has one; push_mode reflects which applies.
+        """
+        now = datetime.utcnow()
+        missing = [
+            team for team in teams
+            if team not in self.watch_channels or self.watch_channels[team]['expiration'] <= now
+        ]
+        push_mode = not missing
+        if push_mode == self.push_mode:
+            return
+        
+        self.push_mode = push_mode
+        if push_mode:
+            interval = GOOGLE_SHEETS_CONFIG.get('fallback_sync_interval_minutes', 60)
+            logger.info(f"Push channels registered for all teams; fallback sync every {interval} minutes")
+        else:
+            interval = 2
+            logger.warning(f"No push channel for {', '.join(missing)}; syncing every 2 minutes instead")
+        self.scheduler.reschedule_job('google_sheets_sync', trigger=IntervalTrigger(minutes=interval))
+    
+    def _fallback_sync_job(self, teams: list):
+        """Safety-net sync in push mode; also keeps the push channels from expiring."""
+        self._renew_watch_channels(teams)
+        self._update_poll_interval(teams)
+        self._sync_job(teams)
+    
+    def _sync_job(self, teams: list) -> dict:
+        """Internal sync job that runs on schedule. Returns this run's sync status."""
+        # Scheduled, queued and manual syncs must not write the same team concurrently
+        with self._sync_lock:
+            return self._run_sync(teams)
+    
+    def _run_sync(self, teams: list) -> dict:
+        """Sync the given teams, record the outcome and return it."""
         try:
             logger.info(f"Starting scheduled sync for teams: {teams}")
             results = {}
             
+            # Read every team's sheet up front: one batchGet per spreadsheet
+            values_by_team = self.sync_service.fetch_sheet_values(teams)
             for team in teams:
                 try:
-                    result = self.sync_service.sync_team(team)
+                    result = self.sync_service.sync_team(team, values=values_by_team.get(team, []))
                     results[team] = result
                     logger.info(f"Sync completed for {team}: {result.get('timesheets_added', 0)} added, "
                               f"{result.get('timesheets_updated', 0)} updated, "
@@ -109,11 +261,14 @@ class SheetsSyncScheduler:
                     results[team] = {'error': str(e)}
             
             self.last_sync_time = datetime.utcnow()
+            failed = {team: result['error'] for team, result in results.items() if 'error' in result}
             self.last_sync_status = {
-                'success': True,
+                'success': not failed,
                 'results': results,
                 'synced_at': self.last_sync_time.isoformat()
             }
+            if failed:
+                self.last_sync_status['error'] = '; '.join(f"{team}: {error}" for team, error in failed.items())
             
         except Exception as e:
             logger.error(f"Scheduled sync job failed: {e}", exc_info=True)
@@ -123,6 +278,14 @@ class SheetsSyncScheduler:
                 'error': str(e),
                 'synced_at': self.last_sync_time.isoformat()
             }
+        
+        for callback in self.sync_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Sync listener failed: {e}", exc_info=True)
+        
+        return self.last_sync_status
     
     def _on_job_executed(self, event):
         """Handle job execution events."""
@@ -151,6 +314,10 @@ class SheetsSyncScheduler:
         return {
             'running': self.is_running,
             'realtime_mode': self.realtime_mode,
+            'push_mode': self.push_mode,
+            'watch_channels': {
+                team: channel['expiration'].isoformat() for team, channel in self.watch_channels.items()
+            },
             'last_sync': self.last_sync_time.isoformat() if self.last_sync_time else None,
             'last_sync_status': self.last_sync_status,
             'next_sync': next_run,
@@ -162,8 +329,9 @@ class SheetsSyncScheduler:
         """Manually trigger a sync (runs immediately)."""
         teams_to_sync = teams or ['QA', 'DEV']
         logger.info(f"Manual sync triggered for teams: {teams_to_sync}")
-        self._sync_job(teams_to_sync)
-        return self.last_sync_status or {'success': False, 'error': 'Sync not completed'}
+        if self.sync_service is None:
+            self.sync_service = GoogleSheetsSync()
+        return self._sync_job(teams_to_sync)
 
 
 # Global scheduler instance
@@ -182,7 +350,7 @@ def start_auto_sync():
     """Start auto-sync if enabled in config. Uses real-time mode by default."""
     if GOOGLE_SHEETS_CONFIG.get('auto_sync_enabled', False):
         scheduler = get_scheduler()
-        # Use real-time mode (2-minute intervals) by default
+        # Use real-time mode (push notifications or 2-minute intervals) by default
         realtime = GOOGLE_SHEETS_CONFIG.get('realtime_sync', True)
         scheduler.start(realtime=realtime)
         return True
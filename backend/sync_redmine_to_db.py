@@ -12,7 +12,7 @@ Usage:
 import requests
 import json
 import argparse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from database import SessionLocal
 from models import Bug, BugStatusHistory
 from datetime import datetime
@@ -115,7 +115,8 @@ def sync_redmine_bugs(full_refresh=False):
 
             for issue in issues:
                 bug_id = issue.get("id")
-                existing_bug = db.query(Bug).filter(Bug.bug_id == bug_id).first()
+                # raw_data is loaded so an unchanged payload isn't rewritten on update
+                existing_bug = db.query(Bug).options(undefer(Bug.raw_data)).filter(Bug.bug_id == bug_id).first()
 
                 # Extract Ticket ID from custom fields
                 ticket_id_value = get_custom_field(issue, "Ticket ID")
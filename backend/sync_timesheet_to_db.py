@@ -24,11 +24,19 @@ if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
 from openpyxl import load_workbook
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import insert
 
-from database import SessionLocal
+from database import SessionLocal, copy_rows
 from models import Timesheet
 
+# Batches larger than this are loaded with COPY instead of per-row ORM upserts
+COPY_THRESHOLD = 100
+
+# Rows buffered per process_batch call. Full batches always go through COPY, which has no
+# bind parameter limit, so this only bounds the rows and CSV buffer held in memory at once
+BATCH_SIZE = 5000
+
 # Configuration
 IMPORTS_FOLDER = os.getenv("IMPORTS_FOLDER", os.path.join(os.path.dirname(__file__), "imports"))
 
@@ -194,7 +202,6 @@ def import_timesheet(filepath):
         
         try:
             batch = []
-            batch_size = 500
             
             for row_idx, row in enumerate(ws.iter_rows(min_row=header_row_idx + 1, values_only=True), start=header_row_idx + 1):
                 # Extract values
@@ -211,7 +218,6 @@ def import_timesheet(filepath):
                     elif db_field == 'date':
                         record_data[db_field] = parse_date(value)
                     elif db_field == 'time_logged':
-                        record_data[db_field] = parse_string(value)
                         record_data['time_logged_minutes'] = parse_time_to_minutes(value)
                     elif db_field == 'team':
                         record_data[db_field] = parse_string(value)
@@ -225,7 +231,7 @@ def import_timesheet(filepath):
                 batch.append(record_data)
                 
                 # Process batch
-                if len(batch) >= batch_size:
+                if len(batch) >= BATCH_SIZE:
                     result = process_batch(db, batch)
                     imported += result['inserted']
                     updated += result['updated']
@@ -265,6 +271,9 @@ def import_timesheet(filepath):
 
 def process_batch(db, batch):
     """Process a batch of timesheet entries using upsert"""
+    if len(batch) > COPY_THRESHOLD:
+        return copy_batch(db, batch)
+    
     inserted = 0
     updated = 0
     
@@ -278,7 +287,6 @@ def process_batch(db, batch):
         
         if existing:
             # Update existing
-            existing.time_logged = record_data.get('time_logged')
             existing.time_logged_minutes = record_data.get('time_logged_minutes', 0)
             existing.team = record_data.get('team')
             updated += 1
@@ -288,7 +296,6 @@ def process_batch(db, batch):
                 employee_name=record_data['employee_name'],
                 ticket_id=record_data['ticket_id'],
                 date=record_data['date'],
-                time_logged=record_data.get('time_logged'),
                 time_logged_minutes=record_data.get('time_logged_minutes', 0),
                 team=record_data.get('team'),
                 created_on=datetime.utcnow()
@@ -300,6 +307,48 @@ def process_batch(db, batch):
     return {'inserted': inserted, 'updated': updated}
 
 
+STAGING_COLUMNS = ('employee_name', 'ticket_id', 'date', 'time_logged_minutes', 'team', 'created_on')
+
+
+def copy_batch(db, batch):
+    """
+    Upsert a large batch by COPYing it into a temporary staging table and merging
+    it into timesheets with a single INSERT ... ON CONFLICT.
+    """
+    # Within a batch a later row for the same entry wins, as with the per-row upsert
+    rows = {}
+    for record_data in batch:
+        rows[(record_data['employee_name'], record_data['ticket_id'], record_data['date'])] = (
+            record_data['employee_name'],
+            record_data['ticket_id'],
+            record_data['date'],
+            record_data.get('time_logged_minutes', 0),
+            record_data.get('team'),
+            record_data['created_on']
+        )
+    
+    db.flush()
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS timesheet_staging ON COMMIT DROP AS "
+        f"SELECT {', '.join(STAGING_COLUMNS)} FROM timesheets WITH NO DATA"
+    ))
+    db.execute(text("TRUNCATE timesheet_staging"))
+    copy_rows(db, 'timesheet_staging', STAGING_COLUMNS, rows.values())
+    
+    # xmax is 0 only for freshly inserted rows, which separates inserts from updates
+    inserted_flags = db.execute(text(f"""
+        INSERT INTO timesheets ({', '.join(STAGING_COLUMNS)})
+        SELECT {', '.join(STAGING_COLUMNS)} FROM timesheet_staging
+        ON CONFLICT (employee_name, ticket_id, date) DO UPDATE SET
+            time_logged_minutes = EXCLUDED.time_logged_minutes,
+            team = EXCLUDED.team
+        RETURNING (xmax = 0)
+    """)).scalars().all()
+    
+    inserted = sum(inserted_flags)
+    return {'inserted': inserted, 'updated': len(batch) - inserted}
+
+
 def import_latest_from_downloads():
     """Find and import the most recent PmTimeTracker file from Downloads"""
     if not os.path.exists(DOWNLOADS_FOLDER):
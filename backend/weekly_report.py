@@ -17,6 +17,7 @@ import os
 import sys
 import argparse
 from datetime import datetime, timedelta
+from functools import lru_cache
 from io import BytesIO
 
 # Fix Unicode output on Windows
@@ -51,7 +52,7 @@ def get_week_dates(reference_date=None):
     if reference_date is None:
         reference_date = datetime.now()
     elif isinstance(reference_date, str):
-        reference_date = datetime.strptime(reference_date, "%Y-%m-%d")
+        return _get_week_dates_for_str(reference_date)
     
     # Find Monday of the week
     monday = reference_date - timedelta(days=reference_date.weekday())
@@ -64,6 +65,12 @@ def get_week_dates(reference_date=None):
     return week_start, week_end
 
 
+@lru_cache(maxsize=256)
+def _get_week_dates_for_str(reference_date):
+    """Cached get_week_dates for a YYYY-MM-DD reference date string"""
+    return get_week_dates(datetime.strptime(reference_date, "%Y-%m-%d"))
+
+
 def get_weekly_data(week_start, week_end):
     """Fetch all data needed for the weekly report"""
     db = SessionLocal()
@@ -119,6 +119,20 @@ function CalendarModule() {
         const error = await response.json();
         throw new Error(error.detail || 'Sync failed');
       }
+      // The sync runs in the background; poll the job until it finishes
+      const { job_id } = await response.json();
+      let job;
+      do {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const jobResponse = await fetch(`${API_BASE}/sync/google-sheets/jobs/${job_id}`);
+        if (!jobResponse.ok) {
+          throw new Error('Sync status unavailable');
+        }
+        job = await jobResponse.json();
+      } while (job.status === 'queued' || job.status === 'running');
+      if (job.status === 'failed') {
+        throw new Error(`Sync failed: ${job.error}`);
+      }
       await fetchCalendarData();
       await fetchSyncStatus(); // Refresh status
     } catch (err) {